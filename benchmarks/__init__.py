@@ -0,0 +1 @@
+# Бенчмарки MB25 Registration Bot
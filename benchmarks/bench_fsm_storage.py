@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк размера состояния диалога в Redis: JSON (RedisStorage по умолчанию)
+против msgpack (create_storage).
+
+Для каждого из --dialogs пользователей сохраняется то, что aiogram-dialog хранит
+во время регистрации: стек, контекст диалога с dialog_data и состояние FSM.
+Печатается размер сериализованных данных и MEMORY USAGE в Redis на один
+активный диалог.
+
+Запуск (из корня проекта, нужен Redis из .env; ключи bench:* удаляются после замера):
+    python -m benchmarks.bench_fsm_storage --dialogs 2000
+Без Redis (только размер сериализованных данных):
+    python -m benchmarks.bench_fsm_storage --offline
+"""
+import argparse
+import asyncio
+import json
+import secrets
+from typing import Any, Dict, List, Tuple
+
+from aiogram.fsm.storage.base import DefaultKeyBuilder, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+from redis.asyncio import Redis
+
+from bot.redis_client import create_redis
+from bot.storage import InstrumentedMsgpackRedisStorage, memory_report, pack_data
+from config.config import load_config
+
+BOT_ID = 123456
+FIRST_NAMES = ["Александр", "Екатерина", "Михаил", "Анастасия", "Дмитрий"]
+
+
+def dialog_records(user_id: int) -> List[Tuple[StorageKey, str, Dict[str, Any]]]:
+    """Записи одного активного диалога регистрации (формат StorageProxy из aiogram-dialog)"""
+    intent_id = secrets.token_urlsafe(6)
+    context = {
+        "_intent_id": intent_id,
+        "_stack_id": "",
+        "state": "RegistrationSG:participated_before",
+        "start_data": None,
+        "dialog_data": {
+            "package_type": "full",
+            "first_name": FIRST_NAMES[user_id % len(FIRST_NAMES)],
+            "last_name": "Константинопольская",
+        },
+        "widget_data": {},
+        "access_settings": {"user_ids": [user_id]},
+    }
+    stack = {
+        "_id": "",
+        "intents": [intent_id],
+        "last_message_id": 100000 + user_id,
+        "last_reply_keyboard": False,
+        "last_media_id": None,
+        "last_media_unique_id": None,
+        "last_income_media_group_id": None,
+    }
+
+    def key(destiny: str) -> StorageKey:
+        return StorageKey(bot_id=BOT_ID, chat_id=user_id, user_id=user_id, destiny=destiny)
+
+    return [
+        (key(f"aiogd:context:{intent_id}"), "data", context),
+        (key("aiogd:stack:"), "data", stack),
+        (key("default"), "state", "RegistrationSG:participated_before"),
+    ]
+
+
+def payload_sizes(dialogs: int) -> Dict[str, float]:
+    """Средний размер сериализованных данных одного диалога, байт"""
+    sizes = {"json": 0, "msgpack": 0}
+    for user_id in range(1, dialogs + 1):
+        for _, part, value in dialog_records(user_id):
+            if part == "state":
+                sizes["json"] += len(value.encode())
+                sizes["msgpack"] += len(value.encode())
+            else:
+                sizes["json"] += len(json.dumps(value).encode())
+                sizes["msgpack"] += len(pack_data(value))
+    return {name: total / dialogs for name, total in sizes.items()}
+
+
+async def redis_usage(redis: Redis, dialogs: int) -> Dict[str, float]:
+    """Средний MEMORY USAGE одного диалога, байт"""
+    storages = {
+        "json": RedisStorage(redis, key_builder=DefaultKeyBuilder(prefix="bench:json", with_bot_id=True, with_destiny=True)),
+        "msgpack": InstrumentedMsgpackRedisStorage(
+            redis, key_builder=DefaultKeyBuilder(prefix="bench:msgpack", with_bot_id=True, with_destiny=True)
+        ),
+    }
+    usage = {}
+    try:
+        for name, storage in storages.items():
+            for user_id in range(1, dialogs + 1):
+                for key, part, value in dialog_records(user_id):
+                    if part == "state":
+                        await storage.set_state(key, value)
+                    else:
+                        await storage.set_data(key, value)
+            report = await memory_report(redis, match=f"bench:{name}:*")
+            usage[name] = sum(item.bytes for item in report.types.values()) / dialogs
+    finally:
+        for name in storages:
+            keys = [key async for key in redis.scan_iter(match=f"bench:{name}:*", count=1000)]
+            for start in range(0, len(keys), 1000):
+                await redis.delete(*keys[start:start + 1000])
+    return usage
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Размер состояния диалога в Redis: JSON против msgpack")
+    parser.add_argument("--dialogs", type=int, default=2000, help="Количество активных диалогов")
+    parser.add_argument("--offline", action="store_true", help="Не подключаться к Redis")
+    args = parser.parse_args()
+
+    results = {"Сериализованные данные": payload_sizes(args.dialogs)}
+    if not args.offline:
+        config = load_config()
+        redis = create_redis(config.redis)
+        try:
+            results["MEMORY USAGE в Redis"] = await redis_usage(redis, args.dialogs)
+        finally:
+            await redis.aclose()
+
+    print(f"Диалогов: {args.dialogs}\n")
+    print(f"{'Байт на активный диалог':<28} {'JSON':>10} {'msgpack':>10} {'Экономия':>10}")
+    print("-" * 62)
+    for name, sizes in results.items():
+        saving = (1 - sizes["msgpack"] / sizes["json"]) * 100
+        print(f"{name:<28} {sizes['json']:>10.0f} {sizes['msgpack']:>10.0f} {saving:>9.0f}%")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк подготовки сообщения рассылки: сборка текста, клавиатуры
+и полей запроса sendMessage для одного получателя.
+
+Старый путь: str.format + новая InlineKeyboardMarkup + SendMessage(...) с валидацией
+и сериализацией клавиатуры при каждой отправке. Новый путь: готовое сообщение из
+TemplateRegistry и SendMessage.model_construct с уже сериализованной клавиатурой.
+В обоих случаях замер включает сборку полей формы сессией aiogram (build_form_data),
+сеть не используется.
+
+Запуск (из корня проекта, внешние сервисы не нужны):
+    python -m benchmarks.bench_message_prep --messages 20000 --repeat 5
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.enums import ParseMode
+from aiogram.methods import SendMessage
+
+from benchmarks.fake_telegram import FAKE_TOKEN
+from bot.templates import broadcast_keyboard, build_broadcast_registry, render_broadcast_text
+
+
+def legacy_prepare(session: AiohttpSession, bot: Bot) -> Callable[[int, int], Dict[str, str]]:
+    def prepare(chat_id: int, package_id: int) -> Dict[str, str]:
+        method = SendMessage(
+            chat_id=chat_id,
+            text=render_broadcast_text(package_id),
+            reply_markup=broadcast_keyboard()
+        )
+        return form_fields(session, bot, method)
+    return prepare
+
+
+def prepared_prepare(session: AiohttpSession, bot: Bot) -> Callable[[int, int], Dict[str, str]]:
+    registry = build_broadcast_registry()
+
+    def prepare(chat_id: int, package_id: int) -> Dict[str, str]:
+        return form_fields(session, bot, registry.broadcast(package_id).build(chat_id))
+    return prepare
+
+
+def form_fields(session: AiohttpSession, bot: Bot, method: SendMessage) -> Dict[str, str]:
+    """Поля формы запроса в том виде, в котором они уходят в Bot API"""
+    form = session.build_form_data(bot, method)
+    return {options["name"]: value for options, _, value in form._fields}
+
+
+def measure(prepare: Callable[[int, int], Dict[str, str]], messages: int, repeat: int) -> List[float]:
+    """Время подготовки одного сообщения в микросекундах для каждого повтора"""
+    results = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for i in range(messages):
+            prepare(i, i % 3 + 1)
+        results.append((time.perf_counter() - started) / messages * 1_000_000)
+    return results
+
+
+def check_same_payload(legacy, prepared):
+    """Оба пути должны отправлять одинаковый запрос"""
+    for package_id in (1, 2, 3):
+        old = legacy(42, package_id)
+        new = prepared(42, package_id)
+        assert old.keys() == new.keys(), (old.keys(), new.keys())
+        assert old["text"] == new["text"]
+        assert json.loads(old["reply_markup"]) == json.loads(new["reply_markup"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Стоимость подготовки сообщения рассылки")
+    parser.add_argument("--messages", type=int, default=20000, help="Сообщений в одном повторе")
+    parser.add_argument("--repeat", type=int, default=5, help="Количество повторов")
+    args = parser.parse_args()
+
+    bot = Bot(token=FAKE_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    session = AiohttpSession()
+    legacy = legacy_prepare(session, bot)
+    prepared = prepared_prepare(session, bot)
+    check_same_payload(legacy, prepared)
+
+    print(f"Сообщений: {args.messages} x {args.repeat} повторов\n")
+    print(f"{'Сценарий':<32} {'мкс/сообщ. (медиана)':>22} {'мин':>10} {'сообщ./с':>12}")
+    print("-" * 80)
+    for name, prepare in (("format + keyboard + SendMessage", legacy), ("TemplateRegistry", prepared)):
+        results = measure(prepare, args.messages, args.repeat)
+        median = statistics.median(results)
+        print(f"{name:<32} {median:>22.2f} {min(results):>10.2f} {1_000_000 / median:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
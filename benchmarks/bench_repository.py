@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Набор бенчмарков UserRepository на разных размерах таблицы и настройках движка.
+
+Для каждого профиля движка (пул / NullPool, prepared statements) и размера
+таблицы замеряются:
+- get_user_by_telegram_id (существующий и отсутствующий пользователь);
+- create_user: вставка нового пользователя и повторная регистрация существующего;
+- update_user.
+
+Кэш пользователей в Redis не используется - замеряется только БД.
+Результаты (p50/p95/p99, ops/s) печатаются таблицей и сохраняются в JSON
+benchmarks/results/repository-<время>-<коммит>.json. С --compare текущий
+прогон сравнивается с сохранённым, замедления выше --threshold отмечаются.
+
+Запуск (из корня проекта, нужна БД из .env):
+    python -m benchmarks.bench_repository
+    python -m benchmarks.bench_repository --sizes 1000,100000,1000000 --concurrency 1,32 --profiles pool,nullpool
+    python -m benchmarks.bench_repository --compare benchmarks/results/repository-<...>.json --fail-on-regression
+
+Тестовые пользователи создаются с отрицательными telegram_id (как в bench_upsert)
+и удаляются после замеров (кроме --keep-data).
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import psycopg
+import sqlalchemy
+from sqlalchemy import delete, func, select, text
+
+from benchmarks.bench_upsert import BENCH_ID_BASE, cleanup, make_user_data
+from benchmarks.common import print_results_table, run_concurrent
+from bot.database import Database, UserRepository
+from bot.models import User
+from config.config import Config, load_config
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Профили движка: изменения относительно DatabaseConfig из .env
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "pool": {"pool_enabled": True},
+    "nullpool": {"pool_enabled": False},
+    "pool-no-prepare": {"pool_enabled": True, "prepare_threshold": None},
+    "pool-prepare-now": {"pool_enabled": True, "prepare_threshold": 0},
+}
+
+# Заполнение таблицы одним запросом на стороне сервера
+SEED_SQL = text("""
+    INSERT INTO users (
+        telegram_id, username, first_name, last_name, package_type,
+        participated_before, participation_year, is_vsm_graduate, graduation_year,
+        created_at, updated_at
+    )
+    SELECT
+        :base - g, 'bench_' || g, 'Бенч', 'Пользователь' || g,
+        (ARRAY['business', 'gala', 'full'])[1 + g % 3],
+        g % 2 = 0, CASE WHEN g % 2 = 0 THEN '2023' END,
+        g % 3 = 0, CASE WHEN g % 3 = 0 THEN '2020' END,
+        now() - g * interval '1 second', now()
+    FROM generate_series(:start, :stop) AS g
+    ON CONFLICT (telegram_id) DO NOTHING
+""")
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _parse_list(value: str) -> List[int]:
+    return [int(item.replace("_", "")) for item in value.split(",") if item.strip()]
+
+
+def _profile_config(config: Config, profile: str) -> Config:
+    return replace(config, db=replace(config.db, **PROFILES[profile]))
+
+
+async def seed(db: Database, rows: int, seeded: int) -> int:
+    """Дозаполнение тестовыми пользователями до rows строк (id 0..rows-1)"""
+    async with db.engine.begin() as conn:
+        for start in range(seeded, rows, 100_000):
+            stop = min(start + 100_000, rows) - 1
+            await conn.execute(SEED_SQL, {"base": BENCH_ID_BASE, "start": start, "stop": stop})
+        await conn.execute(text("ANALYZE users"))
+    return rows
+
+
+async def delete_inserted(db: Database, rows: int):
+    """Удаление пользователей, созданных сценарием вставки (за пределами заполненных rows)"""
+    async with db.engine.begin() as conn:
+        await conn.execute(delete(User).where(User.telegram_id < BENCH_ID_BASE - rows + 1))
+
+
+async def bench_profile(
+    config: Config,
+    profile: str,
+    rows: int,
+    ops: int,
+    concurrency: int,
+    warmup: int,
+    rng: random.Random
+) -> Dict[str, Dict[str, Any]]:
+    """Сценарии UserRepository для одного профиля движка на таблице из rows тестовых строк"""
+    database = Database(_profile_config(config, profile))
+    user_repo = UserRepository(database)
+    existing = [BENCH_ID_BASE - rng.randrange(rows) for _ in range(ops)]
+    # Новые пользователи - за пределами заполненного диапазона
+    new_ids = range(rows, rows + ops)
+    results = {}
+    try:
+        # Прогрев: соединения пула и подготовка запросов
+        await run_concurrent(lambda i: user_repo.get_user_by_telegram_id(existing[i % ops]), warmup, concurrency)
+
+        results["get_user_by_telegram_id (hit)"] = await run_concurrent(
+            lambda i: user_repo.get_user_by_telegram_id(existing[i]), ops, concurrency
+        )
+        results["get_user_by_telegram_id (miss)"] = await run_concurrent(
+            lambda i: user_repo.get_user_by_telegram_id(BENCH_ID_BASE - new_ids[i]), ops, concurrency
+        )
+        results["create_user (insert)"] = await run_concurrent(
+            lambda i: user_repo.create_user(make_user_data(new_ids[i])), ops, concurrency
+        )
+        await delete_inserted(database, rows)
+        results["create_user (update)"] = await run_concurrent(
+            lambda i: user_repo.create_user(make_user_data(BENCH_ID_BASE - existing[i], "gala")), ops, concurrency
+        )
+        results["update_user"] = await run_concurrent(
+            lambda i: user_repo.update_user(existing[i], {"package_type": "full"}), ops, concurrency
+        )
+    finally:
+        await database.close()
+    return results
+
+
+def compare(current: List[Dict[str, Any]], baseline_path: Path, threshold: float) -> int:
+    """Сравнение с сохранённым прогоном. Возвращает количество замедлений выше threshold (%)"""
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    previous = {
+        (item["profile"], item["rows"], item["concurrency"], item["operation"]): item
+        for item in baseline["results"]
+    }
+    print(f"\nСравнение с {baseline_path.name} (коммит {baseline['meta'].get('commit')}):")
+    print(f"{'Профиль / строк / параллельность / операция':<72} {'p95, %':>8} {'ops/s, %':>9}")
+    print("-" * 91)
+    regressions = 0
+    for item in current:
+        key = (item["profile"], item["rows"], item["concurrency"], item["operation"])
+        before = previous.get(key)
+        if before is None:
+            continue
+        p95_delta = (item["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        ops_delta = (item["throughput_ops_s"] / before["throughput_ops_s"] - 1) * 100 if before["throughput_ops_s"] else 0.0
+        regressed = p95_delta > threshold or ops_delta < -threshold
+        regressions += regressed
+        name = f"{item['profile']} / {item['rows']} / {item['concurrency']} / {item['operation']}"
+        print(f"{name:<72} {p95_delta:>+8.1f} {ops_delta:>+9.1f}{'  ⚠️' if regressed else ''}")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> int:
+    config = load_config()
+    sizes = sorted(_parse_list(args.sizes))
+    concurrencies = _parse_list(args.concurrency)
+    profiles = [name.strip() for name in args.profiles.split(",")]
+    unknown = [name for name in profiles if name not in PROFILES]
+    if unknown:
+        print(f"❌ Неизвестные профили: {', '.join(unknown)}. Доступны: {', '.join(PROFILES)}")
+        return 2
+
+    rng = random.Random(args.seed)
+    admin = Database(config)
+    results: List[Dict[str, Any]] = []
+    try:
+        await admin.create_tables()
+        await cleanup(admin)
+        async with admin.engine.connect() as conn:
+            server_version = (await conn.execute(text("SHOW server_version"))).scalar()
+
+        seeded = 0
+        for rows in sizes:
+            print(f"⏳ Заполнение таблицы до {rows} тестовых пользователей...")
+            seeded = await seed(admin, rows, seeded)
+            async with admin.engine.connect() as conn:
+                table_rows = (await conn.execute(select(func.count()).select_from(User))).scalar()
+
+            for profile in profiles:
+                for concurrency in concurrencies:
+                    print(f"⏱ {profile}, {rows} строк, параллельность {concurrency}")
+                    profile_results = await bench_profile(
+                        config, profile, rows, args.ops, concurrency, args.warmup, rng
+                    )
+                    print_results_table(profile_results)
+                    for operation, stats in profile_results.items():
+                        results.append({
+                            "profile": profile,
+                            "rows": rows,
+                            "table_rows": table_rows,
+                            "concurrency": concurrency,
+                            "operation": operation,
+                            **stats,
+                        })
+    finally:
+        if not args.keep_data:
+            await cleanup(admin)
+        await admin.close()
+
+    commit = _git("rev-parse", "--short", "HEAD")
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit,
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "psycopg": psycopg.__version__,
+            "postgres": server_version,
+            "db_host": config.db.host,
+            "ops": args.ops,
+            "warmup": args.warmup,
+            "profiles": {name: PROFILES[name] for name in profiles},
+        },
+        "results": results,
+    }
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"repository-{datetime.now():%Y%m%d-%H%M%S}-{commit or 'nogit'}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    print(f"\n💾 Результаты сохранены: {output}")
+
+    if args.compare:
+        regressions = compare(results, Path(args.compare), args.threshold)
+        if regressions:
+            print(f"\n⚠️ Замедлений больше {args.threshold}%: {regressions}")
+            if args.fail_on_regression:
+                return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки UserRepository на разных размерах таблицы и профилях движка")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="Размеры таблицы (тестовых строк) через запятую")
+    parser.add_argument("--concurrency", default="32", help="Параллельность через запятую, например 1,32")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help=f"Профили движка: {', '.join(PROFILES)}")
+    parser.add_argument("--ops", type=int, default=2000, help="Операций на сценарий")
+    parser.add_argument("--warmup", type=int, default=200, help="Прогревочных запросов перед замерами профиля")
+    parser.add_argument("--seed", type=int, default=1, help="Seed для выбора пользователей")
+    parser.add_argument("--output", help="Путь к JSON с результатами (по умолчанию benchmarks/results/)")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Порог замедления p95 / падения ops/s, %%")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Код выхода 1 при замедлениях выше порога")
+    parser.add_argument("--keep-data", action="store_true", help="Не удалять тестовых пользователей после замеров")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: старый путь create_user/update_user (SELECT + COMMIT + refresh)
+против одного запроса INSERT ... ON CONFLICT ... RETURNING / UPDATE ... RETURNING.
+
+Запуск (из корня проекта, нужна БД из .env):
+    python -m benchmarks.bench_upsert --ops 2000 --concurrency 32
+
+Бенчмарк работает с пользователями с отрицательными telegram_id
+и удаляет их до и после замеров.
+"""
+import argparse
+import asyncio
+from sqlalchemy import delete, select
+
+from benchmarks.common import print_results_table, run_concurrent
+from bot.database import Database, UserRepository
+from bot.models import User
+from config.config import load_config
+
+# Диапазон telegram_id для тестовых пользователей (реальные id положительные)
+BENCH_ID_BASE = -1_000_000
+
+
+def make_user_data(i: int, package_type: str = "business") -> dict:
+    return {
+        "telegram_id": BENCH_ID_BASE - i,
+        "username": f"bench_{i}",
+        "first_name": "Бенч",
+        "last_name": f"Пользователь{i}",
+        "package_type": package_type,
+        "participated_before": i % 2 == 0,
+        "participation_year": "2023" if i % 2 == 0 else None,
+        "is_vsm_graduate": i % 3 == 0,
+        "graduation_year": "2020" if i % 3 == 0 else None,
+    }
+
+
+async def legacy_create_user(db: Database, user_data: dict) -> User:
+    """Прежняя реализация UserRepository.create_user"""
+    session = await db.get_session()
+    try:
+        result = await session.execute(
+            select(User).where(User.telegram_id == user_data["telegram_id"])
+        )
+        existing_user = result.scalar_one_or_none()
+        if existing_user:
+            for key, value in user_data.items():
+                if key != "telegram_id":
+                    setattr(existing_user, key, value)
+            await session.commit()
+            await session.refresh(existing_user)
+            return existing_user
+        user = User(**user_data)
+        session.add(user)
+        await session.commit()
+        await session.refresh(user)
+        return user
+    finally:
+        await session.close()
+
+
+async def legacy_update_user(db: Database, telegram_id: int, user_data: dict) -> User:
+    """Прежняя реализация UserRepository.update_user"""
+    session = await db.get_session()
+    try:
+        result = await session.execute(select(User).where(User.telegram_id == telegram_id))
+        user = result.scalar_one_or_none()
+        if user:
+            for key, value in user_data.items():
+                setattr(user, key, value)
+            await session.commit()
+            await session.refresh(user)
+        return user
+    finally:
+        await session.close()
+
+
+async def cleanup(db: Database):
+    async with db.engine.begin() as conn:
+        await conn.execute(delete(User).where(User.telegram_id <= BENCH_ID_BASE))
+
+
+async def run(ops: int, concurrency: int):
+    config = load_config()
+    database = Database(config)
+    user_repo = UserRepository(database)
+    results = {}
+
+    try:
+        await database.create_tables()
+        await cleanup(database)
+
+        scenarios = [
+            ("legacy", lambda data: legacy_create_user(database, data),
+             lambda tid, data: legacy_update_user(database, tid, data)),
+            ("upsert", user_repo.create_user, user_repo.update_user),
+        ]
+        for name, create, update in scenarios:
+            # Вставка новых пользователей
+            results[f"{name}: create_user (insert)"] = await run_concurrent(
+                lambda i: create(make_user_data(i)), ops, concurrency
+            )
+            # Повторная регистрация тех же пользователей
+            results[f"{name}: create_user (update)"] = await run_concurrent(
+                lambda i: create(make_user_data(i, "gala")), ops, concurrency
+            )
+            results[f"{name}: update_user"] = await run_concurrent(
+                lambda i: update(BENCH_ID_BASE - i, {"package_type": "full"}), ops, concurrency
+            )
+            await cleanup(database)
+
+        print(f"\nОпераций на сценарий: {ops}, параллельность: {concurrency}\n")
+        print_results_table(results)
+        print(f"\nПул соединений: {database.pool_stats()}")
+    finally:
+        await cleanup(database)
+        await database.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк create_user/update_user: legacy vs upsert")
+    parser.add_argument("--ops", type=int, default=2000, help="Количество операций на сценарий")
+    parser.add_argument("--concurrency", type=int, default=32, help="Количество параллельных задач")
+    args = parser.parse_args()
+    asyncio.run(run(args.ops, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
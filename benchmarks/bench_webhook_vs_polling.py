@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк задержки доставки обновлений: long polling против webhook.
+
+Обновления генерируются локальным фейковым Bot API сервером (для polling)
+или отправляются POST-запросом прямо в webhook-сервер бота. Задержка -
+время от появления обновления до входа в обработчик. Перед остановкой бота
+в обоих режимах дожидаемся, пока фейковый сервер ответит на все message.answer,
+чтобы не обрывать запросы обработчиков.
+
+--latency-ms имитирует сетевую задержку в одну сторону между ботом и Telegram:
+в режиме polling она добавляется к каждому запросу getUpdates, в режиме webhook -
+к доставке каждого POST-запроса.
+
+Запуск (из корня проекта, внешние сервисы не нужны):
+    python -m benchmarks.bench_webhook_vs_polling --updates 500 --rate 100 --latency-ms 40
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict
+
+import aiohttp
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Message
+from aiohttp import web
+
+from benchmarks.common import summarize
+from benchmarks.fake_telegram import FAKE_TOKEN, FakeTelegramServer, make_message_update
+from bot.webhook import create_webhook_app
+from config.config import WebhookConfig
+
+WEBHOOK_SECRET = "benchmark-secret"
+
+
+def build_dispatcher(received: Dict[int, float], replied: Dict[int, float]) -> Dispatcher:
+    router = Router()
+
+    @router.message()
+    async def on_message(message: Message):
+        received[message.message_id] = time.perf_counter()
+        await message.answer("ok")
+        replied[message.message_id] = time.perf_counter()
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+async def wait_all(received: Dict[int, float], total: int, timeout: float = 60.0):
+    deadline = time.perf_counter() + timeout
+    while len(received) < total and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+
+
+async def bench_polling(server: FakeTelegramServer, updates: int, rate: float) -> dict:
+    received: Dict[int, float] = {}
+    replied: Dict[int, float] = {}
+    sent: Dict[int, float] = {}
+    dp = build_dispatcher(received, replied)
+    session = AiohttpSession(api=TelegramAPIServer.from_base(server.base_url))
+    bot = Bot(token=FAKE_TOKEN, session=session)
+
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, close_bot_session=False))
+    await asyncio.sleep(0.5)
+
+    started = time.perf_counter()
+    for update_id in range(1, updates + 1):
+        sent[update_id] = time.perf_counter()
+        await server.push_update(make_message_update(update_id, 1000 + update_id % 50, "ping"))
+        await asyncio.sleep(1 / rate)
+    await wait_all(received, updates)
+    elapsed = time.perf_counter() - started
+    await wait_all(replied, len(received))
+
+    await dp.stop_polling()
+    await polling
+    await bot.session.close()
+    return summarize([received[i] - sent[i] for i in received], elapsed)
+
+
+async def bench_webhook(server: FakeTelegramServer, updates: int, rate: float, port: int) -> dict:
+    received: Dict[int, float] = {}
+    replied: Dict[int, float] = {}
+    sent: Dict[int, float] = {}
+    dp = build_dispatcher(received, replied)
+    session = AiohttpSession(api=TelegramAPIServer.from_base(server.base_url))
+    bot = Bot(token=FAKE_TOKEN, session=session)
+    config = WebhookConfig(enabled=True, base_url=f"http://127.0.0.1:{port}", secret=WEBHOOK_SECRET, port=port)
+
+    runner = web.AppRunner(create_webhook_app(dp, bot, config))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    headers = {"X-Telegram-Bot-Api-Secret-Token": WEBHOOK_SECRET}
+    async with aiohttp.ClientSession() as http:
+        # Проверка, что запросы без секрета отклоняются
+        async with http.post(config.url, json=make_message_update(0, 1, "ping")) as response:
+            assert response.status == 401, f"Ожидался отказ без секрета, получен {response.status}"
+
+        async def deliver(update_id: int):
+            await asyncio.sleep(server.latency)
+            update = make_message_update(update_id, 1000 + update_id % 50, "ping")
+            async with http.post(config.url, json=update, headers=headers):
+                pass
+
+        started = time.perf_counter()
+        deliveries = []
+        for update_id in range(1, updates + 1):
+            sent[update_id] = time.perf_counter()
+            deliveries.append(asyncio.create_task(deliver(update_id)))
+            await asyncio.sleep(1 / rate)
+        await asyncio.gather(*deliveries)
+        await wait_all(received, updates)
+        elapsed = time.perf_counter() - started
+        await wait_all(replied, len(received))
+
+    await runner.cleanup()
+    return summarize([received[i] - sent[i] for i in received], elapsed)
+
+
+async def run(updates: int, rate: float, latency_ms: float):
+    server = FakeTelegramServer(latency=latency_ms / 1000)
+    await server.start()
+    try:
+        results = {
+            "polling": await bench_polling(server, updates, rate),
+            "webhook": await bench_webhook(server, updates, rate, port=8082),
+        }
+    finally:
+        await server.stop()
+
+    print(f"\nОбновлений: {updates}, темп подачи: {rate}/с, сетевая задержка: {latency_ms} мс\n")
+    print(f"{'Режим':<10} {'получено':>10} {'p50, мс':>10} {'p95, мс':>10} {'p99, мс':>10} {'max, мс':>10}")
+    print("-" * 64)
+    for mode, stats in results.items():
+        print(
+            f"{mode:<10} {stats['ops']:>10} {stats['p50_ms']:>10} {stats['p95_ms']:>10} "
+            f"{stats['p99_ms']:>10} {stats['max_ms']:>10}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка доставки обновлений: polling vs webhook")
+    parser.add_argument("--updates", type=int, default=500, help="Количество обновлений")
+    parser.add_argument("--rate", type=float, default=100.0, help="Обновлений в секунду")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="Сетевая задержка в одну сторону, мс")
+    args = parser.parse_args()
+    asyncio.run(run(args.updates, args.rate, args.latency_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Общие утилиты для бенчмарков
+"""
+import asyncio
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Перцентиль по отсортированному списку (метод ближайшего ранга)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, Any]:
+    """Сводка по задержкам (в миллисекундах) и пропускной способности"""
+    values = sorted(latencies)
+    return {
+        "ops": len(values),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_ops_s": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+async def run_concurrent(
+    operation: Callable[[int], Awaitable[Any]],
+    total: int,
+    concurrency: int
+) -> Dict[str, Any]:
+    """Выполняет operation(i) для i in range(total) с заданной параллельностью"""
+    latencies: List[float] = []
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            started = time.perf_counter()
+            await operation(i)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def print_results_table(results: Dict[str, Dict[str, Any]]):
+    """Печать результатов в виде таблицы"""
+    print(f"{'Сценарий':<32} {'ops/s':>10} {'p50, мс':>10} {'p95, мс':>10} {'p99, мс':>10}")
+    print("-" * 76)
+    for name, stats in results.items():
+        print(
+            f"{name:<32} {stats['throughput_ops_s']:>10} {stats['p50_ms']:>10} "
+            f"{stats['p95_ms']:>10} {stats['p99_ms']:>10}"
+        )
@@ -0,0 +1,199 @@
+"""
+Локальный фейковый Bot API для бенчмарков.
+
+FakeTelegramServer отдаёт обновления через getUpdates (long polling) и отвечает
+на остальные методы минимальными корректными результатами. FakeBotSession делает
+то же без HTTP - для прогона обновлений через Dispatcher.feed_update.
+"""
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import (
+    EditMessageReplyMarkup,
+    EditMessageText,
+    GetMe,
+    SendMessage,
+    SendPhoto,
+    TelegramMethod,
+)
+from aiogram.types import Chat, InlineKeyboardMarkup, Message, PhotoSize, User
+from aiohttp import web
+
+FAKE_BOT_ID = 123456
+FAKE_TOKEN = f"{FAKE_BOT_ID}:FAKE-TOKEN-FOR-BENCHMARKS"
+
+
+def make_message_update(update_id: int, user_id: int, text: str) -> Dict[str, Any]:
+    """Обновление с текстовым сообщением пользователя"""
+    user = {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private", "first_name": user["first_name"]},
+            "from": user,
+            "text": text,
+        },
+    }
+
+
+class FakeTelegramServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8081, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        # Имитация сетевой задержки в одну сторону до серверов Telegram, секунды
+        self.latency = latency
+        self.requests: List[str] = []
+        self._updates: List[Dict[str, Any]] = []
+        self._new_updates = asyncio.Condition()
+        self._message_id = 0
+        self._runner = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def push_update(self, update: Dict[str, Any]):
+        async with self._new_updates:
+            self._updates.append(update)
+            self._new_updates.notify_all()
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await request.post()
+        self.requests.append(method)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == "getUpdates":
+            result = await self._get_updates(int(params.get("offset", 0)), float(params.get("timeout", 0)))
+        elif method == "getMe":
+            result = {"id": FAKE_BOT_ID, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+        elif method in ("sendMessage", "sendPhoto", "editMessageText", "editMessageReplyMarkup"):
+            result = self._message_result(params)
+        else:
+            result = True
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.json_response({"ok": True, "result": result})
+
+    async def _get_updates(self, offset: int, timeout: float) -> List[Dict[str, Any]]:
+        async with self._new_updates:
+            self._updates = [update for update in self._updates if update["update_id"] >= offset]
+            if not self._updates and timeout:
+                try:
+                    await asyncio.wait_for(self._new_updates.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            return list(self._updates)
+
+    def _message_result(self, params) -> Dict[str, Any]:
+        self._message_id += 1
+        chat_id = int(params.get("chat_id", 0))
+        return {
+            "message_id": int(params.get("message_id", self._message_id)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": FAKE_BOT_ID, "is_bot": True, "first_name": "FakeBot"},
+            "text": params.get("text", ""),
+        }
+
+
+def make_callback_update(update_id: int, user_id: int, message_id: int, data: str) -> Dict[str, Any]:
+    """Обновление с нажатием inline-кнопки под сообщением бота message_id"""
+    user = {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": user,
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private", "first_name": user["first_name"]},
+                "from": {"id": FAKE_BOT_ID, "is_bot": True, "first_name": "FakeBot"},
+                "text": "",
+            },
+        },
+    }
+
+
+class FakeBotSession(BaseSession):
+    """Сессия бота без сети: запоминает исходящие вызовы и отвечает как Bot API.
+
+    Для каждого чата хранится последняя отправленная inline-клавиатура, чтобы
+    генератор нагрузки нажимал настоящие кнопки (callback_data aiogram-dialog).
+    """
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        # Имитация времени ответа Bot API на один вызов, секунды
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.keyboards: Dict[int, Tuple[int, InlineKeyboardMarkup]] = {}
+        self._message_id = 0
+
+    async def close(self):
+        pass
+
+    async def stream_content(self, url: str, headers=None, timeout: int = 30, chunk_size: int = 65536, raise_for_status: bool = True):
+        yield b""
+
+    async def make_request(self, bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if isinstance(method, GetMe):
+            return User(id=FAKE_BOT_ID, is_bot=True, first_name="FakeBot", username="fake_bot")
+        if isinstance(method, (SendMessage, SendPhoto)):
+            self._message_id += 1
+            return self._message(method, self._message_id)
+        if isinstance(method, (EditMessageText, EditMessageReplyMarkup)):
+            return self._message(method, method.message_id)
+        return True
+
+    def _message(self, method: TelegramMethod, message_id: int) -> Message:
+        chat_id = int(method.chat_id)
+        markup = getattr(method, "reply_markup", None)
+        if isinstance(markup, InlineKeyboardMarkup) and markup.inline_keyboard:
+            self.keyboards[chat_id] = (message_id, markup)
+        photo = None
+        if isinstance(method, SendPhoto):
+            photo = [PhotoSize(file_id="fake-photo", file_unique_id="fake-photo", width=1, height=1)]
+        return Message(
+            message_id=message_id,
+            date=datetime.now(timezone.utc),
+            chat=Chat(id=chat_id, type="private"),
+            from_user=User(id=FAKE_BOT_ID, is_bot=True, first_name="FakeBot"),
+            text=getattr(method, "text", None),
+            photo=photo,
+            reply_markup=markup if isinstance(markup, InlineKeyboardMarkup) else None,
+        )
+
+    def find_button(self, chat_id: int, suffix: str) -> Tuple[int, str]:
+        """message_id и callback_data кнопки, callback_data которой оканчивается на suffix"""
+        message_id, markup = self.keyboards[chat_id]
+        for row in markup.inline_keyboard:
+            for button in row:
+                if button.callback_data and button.callback_data.endswith(suffix):
+                    return message_id, button.callback_data
+        raise LookupError(f"Кнопка {suffix!r} не найдена в сообщении {message_id} чата {chat_id}")
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест регистрации без сети и внешних сервисов.
+
+Виртуальные пользователи параллельно проходят диалог регистрации: /start,
+"Как можно поучаствовать?", выбор пакета, имя, фамилия, вопросы об участии
+и выпуске (с вводом года или без). Обновления собираются как от Telegram и
+подаются в Dispatcher.feed_update с настоящими router и registration_dialog,
+теми же middleware, что в main.py.
+
+Вместо внешних систем:
+- Bot API - FakeBotSession (запоминает вызовы, кнопки нажимаются по настоящим callback_data);
+- Redis - MemoryStorage с задержкой --redis-latency-ms на каждое обращение;
+- PostgreSQL - репозиторий в памяти с задержкой --db-latency-ms на запись.
+
+Печатается число завершённых регистраций в секунду и перцентили задержки
+по шагам диалога (время feed_update одного обновления).
+
+Запуск (из корня проекта):
+    python -m benchmarks.load_registration --users 500 --concurrency 50
+    python -m benchmarks.load_registration --users 500 --concurrency 50 --api-latency-ms 40 --redis-latency-ms 1 --db-latency-ms 5
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.enums import ParseMode
+from aiogram.filters import ExceptionTypeFilter
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+from aiogram_dialog import setup_dialogs
+from aiogram_dialog.api.exceptions import UnknownIntent
+
+from benchmarks.common import print_results_table, summarize
+from benchmarks.fake_telegram import FAKE_TOKEN, FakeBotSession, make_callback_update, make_message_update
+from bot.dialogs import registration_dialog
+from bot.handlers import on_unknown_intent, router
+from bot.metrics import InstrumentationMiddleware
+from bot.models import User
+
+STEPS = (
+    "start",
+    "how_to_participate",
+    "package",
+    "first_name",
+    "last_name",
+    "participated",
+    "participation_year",
+    "vsm_graduate",
+    "graduation_year",
+)
+
+
+class DelayedMemoryStorage(MemoryStorage):
+    """MemoryStorage с задержкой сетевого обращения к Redis"""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+
+    async def set_state(self, key, state=None):
+        await asyncio.sleep(self.latency)
+        await super().set_state(key, state)
+
+    async def get_state(self, key):
+        await asyncio.sleep(self.latency)
+        return await super().get_state(key)
+
+    async def set_data(self, key, data):
+        await asyncio.sleep(self.latency)
+        await super().set_data(key, data)
+
+    async def get_data(self, key):
+        await asyncio.sleep(self.latency)
+        return await super().get_data(key)
+
+
+class InMemoryUserRepository:
+    """Замена UserRepository: пользователи в словаре, запись с задержкой БД"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.users: Dict[int, User] = {}
+
+    async def create_user(self, user_data: Dict[str, Any]) -> User:
+        await asyncio.sleep(self.latency)
+        now = datetime.utcnow()
+        user = User(id=len(self.users) + 1, created_at=now, updated_at=now, **user_data)
+        self.users[user.telegram_id] = user
+        return user
+
+    async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[User]:
+        await asyncio.sleep(self.latency)
+        return self.users.get(telegram_id)
+
+
+class StaticMediaManager:
+    """file_id картинки уже известен - /start отправляет фото без загрузки"""
+
+    async def get_file_id(self, filename: str) -> Optional[str]:
+        return f"fake-{filename}"
+
+
+class QueueSheetsWriter:
+    """Очередь записи в Google Sheets: только считает поставленных пользователей"""
+
+    def __init__(self):
+        self.queued = 0
+
+    def add_user(self, user) -> bool:
+        self.queued += 1
+        return True
+
+
+def build_dispatcher(storage: MemoryStorage, user_repo: InMemoryUserRepository, sheets_writer: QueueSheetsWriter) -> Dispatcher:
+    """Dispatcher как в main.py: те же роутеры, диалог и middleware"""
+    media_manager = StaticMediaManager()
+
+    async def services_middleware(handler, event, data):
+        data["user_repo"] = user_repo
+        data["sheets_writer"] = sheets_writer
+        data["media_manager"] = media_manager
+        return await handler(event, data)
+
+    dp = Dispatcher(storage=storage)
+    instrumentation_middleware = InstrumentationMiddleware()
+    dp.message.middleware(instrumentation_middleware)
+    dp.callback_query.middleware(instrumentation_middleware)
+    dp.message.middleware(services_middleware)
+    dp.callback_query.middleware(services_middleware)
+    dp.include_router(router)
+    dp.include_router(registration_dialog)
+    setup_dialogs(dp)
+    dp.errors.register(on_unknown_intent, ExceptionTypeFilter(UnknownIntent))
+    return dp
+
+
+class LoadGenerator:
+    def __init__(self, dp: Dispatcher, bot: Bot, session: FakeBotSession, think_time: float, seed: int):
+        self.dp = dp
+        self.bot = bot
+        self.session = session
+        # Пауза пользователя между шагами, секунды (случайная в пределах [0, think_time])
+        self.think_time = think_time
+        self.random = random.Random(seed)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.completed = 0
+        self._update_id = 0
+
+    def _next_update_id(self) -> int:
+        self._update_id += 1
+        return self._update_id
+
+    async def _feed(self, step: str, raw: Dict[str, Any]):
+        update = Update.model_validate(raw, context={"bot": self.bot})
+        started = time.perf_counter()
+        await self.dp.feed_update(self.bot, update)
+        self.latencies[step].append(time.perf_counter() - started)
+        if self.think_time:
+            await asyncio.sleep(self.random.uniform(0, self.think_time))
+
+    async def _message(self, step: str, user_id: int, text: str):
+        await self._feed(step, make_message_update(self._next_update_id(), user_id, text))
+
+    async def _click(self, step: str, user_id: int, button: str):
+        message_id, data = self.session.find_button(user_id, button)
+        await self._feed(step, make_callback_update(self._next_update_id(), user_id, message_id, data))
+
+    async def register(self, user_id: int):
+        """Полный проход диалога одним пользователем со случайными ответами"""
+        package = self.random.choice(("business", "gala", "full"))
+        participated = self.random.random() < 0.5
+        graduate = self.random.random() < 0.5
+
+        await self._message("start", user_id, "/start")
+        await self._click("how_to_participate", user_id, "how_to_participate")
+        await self._click("package", user_id, f"package_select:{package}")
+        await self._message("first_name", user_id, f"Имя{user_id}")
+        await self._message("last_name", user_id, f"Фамилия{user_id}")
+        if participated:
+            await self._click("participated", user_id, "participated_yes")
+            await self._message("participation_year", user_id, str(self.random.randint(2015, 2024)))
+        else:
+            await self._click("participated", user_id, "participated_no")
+        if graduate:
+            await self._click("vsm_graduate", user_id, "vsm_graduate_yes")
+            await self._message("graduation_year", user_id, str(self.random.randint(1995, 2025)))
+        else:
+            await self._click("vsm_graduate", user_id, "vsm_graduate_no")
+
+    async def run(self, users: int, concurrency: int) -> float:
+        user_ids = iter(range(1_000_000, 1_000_000 + users))
+
+        async def worker():
+            for user_id in user_ids:
+                try:
+                    await self.register(user_id)
+                    self.completed += 1
+                except Exception as e:
+                    self.errors[type(e).__name__] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - started
+
+
+async def run(args: argparse.Namespace):
+    session = FakeBotSession(latency=args.api_latency_ms / 1000)
+    bot = Bot(token=FAKE_TOKEN, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    storage = DelayedMemoryStorage(latency=args.redis_latency_ms / 1000)
+    user_repo = InMemoryUserRepository(latency=args.db_latency_ms / 1000)
+    sheets_writer = QueueSheetsWriter()
+    dp = build_dispatcher(storage, user_repo, sheets_writer)
+
+    generator = LoadGenerator(dp, bot, session, think_time=args.think_ms / 1000, seed=args.seed)
+    elapsed = await generator.run(args.users, args.concurrency)
+
+    print(
+        f"\nПользователей: {args.users}, параллельно: {args.concurrency}, задержки: "
+        f"Bot API {args.api_latency_ms} мс, Redis {args.redis_latency_ms} мс, БД {args.db_latency_ms} мс\n"
+    )
+    print_results_table({
+        step: summarize(generator.latencies[step], elapsed)
+        for step in STEPS if generator.latencies[step]
+    })
+
+    saved = len(user_repo.users)
+    print(f"\n✅ Завершено регистраций: {generator.completed} за {elapsed:.2f} с ({generator.completed / elapsed:.1f} рег./с)")
+    print(f"💾 Сохранено в репозитории: {saved}, в очереди Google Sheets: {sheets_writer.queued}")
+    print("📤 Вызовы Bot API: " + ", ".join(f"{name}={count}" for name, count in session.calls.most_common()))
+    if generator.errors:
+        print("❌ Ошибки: " + ", ".join(f"{name}={count}" for name, count in generator.errors.items()))
+    if saved != generator.completed:
+        print(f"⚠️ Не сохранено {generator.completed - saved} завершённых регистраций")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест диалога регистрации через Dispatcher.feed_update")
+    parser.add_argument("--users", type=int, default=500, help="Количество регистраций")
+    parser.add_argument("--concurrency", type=int, default=50, help="Пользователей, проходящих диалог одновременно")
+    parser.add_argument("--api-latency-ms", type=float, default=0.0, help="Время ответа Bot API на вызов, мс")
+    parser.add_argument("--redis-latency-ms", type=float, default=0.0, help="Задержка обращения к хранилищу FSM, мс")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="Задержка записи пользователя в БД, мс")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Максимальная пауза пользователя между шагами, мс")
+    parser.add_argument("--seed", type=int, default=1, help="Seed для выбора ответов")
+    args = parser.parse_args()
+    # Логи aiogram о каждом обновлении и сохранении пользователя искажают замер
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import asyncio
+import html
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from bot.batching import BatchWorker
+from bot.metrics import span
+from bot.models import PARTICIPATION_DECLINED, PAYMENT_CONFIRMED
+
+logger = logging.getLogger(__name__)
+
+# Лимит длины сообщения Telegram
+MESSAGE_LIMIT = 4096
+
+EVENT_TITLES = {
+    PAYMENT_CONFIRMED: "💰 <b>ПОДТВЕРЖДЕНИЕ ОПЛАТЫ</b>",
+    PARTICIPATION_DECLINED: "❌ <b>ОТКАЗ ОТ УЧАСТИЯ</b>",
+}
+
+EVENT_FOOTERS = {
+    PAYMENT_CONFIRMED: "✅ Пользователь подтвердил оплату участия в МБ'25",
+    PARTICIPATION_DECLINED: "💔 Пользователь отказался от участия в МБ'25",
+}
+
+EVENT_DIGEST_TITLES = {
+    PAYMENT_CONFIRMED: "💰 Подтвердили оплату",
+    PARTICIPATION_DECLINED: "❌ Отказались от участия",
+}
+
+
+@dataclass
+class AdminEvent:
+    """Событие для уведомления администратора"""
+    kind: str
+    user_id: int
+    username: str
+    full_name: str
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class AdminNotifier(BatchWorker):
+    """Фоновая отправка уведомлений администратору.
+
+    Хендлер только ставит событие в очередь. События, накопившиеся за окно
+    flush_interval, отправляются одной сводкой; одиночное событие - подробным
+    сообщением, как раньше. Между сообщениями выдерживается пауза, чтобы не
+    упираться в лимит Telegram на сообщения в один чат.
+    """
+
+    name = "admin-notifier"
+
+    def __init__(
+        self,
+        bot: Bot,
+        admin_id: int,
+        window: float = 10.0,
+        max_batch: int = 100,
+        send_interval: float = 1.0
+    ):
+        super().__init__(batch_size=max_batch, flush_interval=window)
+        self.bot = bot
+        self.admin_id = admin_id
+        self.send_interval = send_interval
+        self._next_send_at = 0.0
+
+    def notify(self, kind: str, user_id: int, username: Optional[str], full_name: Optional[str]) -> bool:
+        """Постановка уведомления в очередь, не блокирует вызывающий код"""
+        return self.put(AdminEvent(
+            kind=kind,
+            user_id=user_id,
+            username=html.escape(username or "без username"),
+            full_name=html.escape(full_name or "Неизвестно")
+        ))
+
+    async def flush(self, events: List[AdminEvent]):
+        if len(events) == 1:
+            texts = [self.format_event(events[0])]
+        else:
+            texts = self.format_digest(events)
+        for text in texts:
+            await self._send(text)
+
+    @staticmethod
+    def format_event(event: AdminEvent) -> str:
+        """Подробное уведомление об одном событии"""
+        return f"""{EVENT_TITLES.get(event.kind, event.kind)}
+
+👤 <b>Пользователь:</b> {event.full_name}
+🆔 <b>ID:</b> <code>{event.user_id}</code>
+📧 <b>Username:</b> @{event.username}
+📅 <b>Время:</b> {event.created_at.strftime('%d.%m.%Y %H:%M')}
+
+{EVENT_FOOTERS.get(event.kind, '')}"""
+
+    @staticmethod
+    def format_digest(events: List[AdminEvent]) -> List[str]:
+        """Сводка по нескольким событиям, разбитая на сообщения не длиннее лимита Telegram"""
+        counts = Counter(event.kind for event in events)
+        started = events[0].created_at.strftime('%d.%m.%Y %H:%M')
+        finished = events[-1].created_at.strftime('%H:%M')
+        summary = ", ".join(f"{EVENT_DIGEST_TITLES.get(kind, kind)}: {count}" for kind, count in counts.items())
+        header = f"📬 <b>СВОДКА</b> ({started}–{finished})\n{summary}"
+        
+        lines = []
+        for kind in counts:
+            lines.append(f"\n<b>{EVENT_DIGEST_TITLES.get(kind, kind)}:</b>")
+            for event in events:
+                if event.kind == kind:
+                    lines.append(
+                        f"• {event.full_name} (@{event.username}, <code>{event.user_id}</code>) "
+                        f"{event.created_at.strftime('%H:%M')}"
+                    )
+        
+        texts = []
+        current = header
+        for line in lines:
+            if len(current) + len(line) + 1 > MESSAGE_LIMIT:
+                texts.append(current)
+                current = "📬 <b>СВОДКА (продолжение)</b>\n"
+            current += "\n" + line
+        texts.append(current)
+        return texts
+
+    async def _send(self, text: str):
+        loop = asyncio.get_running_loop()
+        delay = self._next_send_at - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            async with span("telegram", "admin_notification"):
+                await self.bot.send_message(chat_id=self.admin_id, text=text)
+        except TelegramRetryAfter as e:
+            logger.warning(f"⚠️ Лимит Telegram на уведомления админу, повтор через {e.retry_after} с")
+            await asyncio.sleep(e.retry_after)
+            async with span("telegram", "admin_notification"):
+                await self.bot.send_message(chat_id=self.admin_id, text=text)
+        finally:
+            self._next_send_at = loop.time() + self.send_interval
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Маркер остановки фонового обработчика
+_STOP = object()
+
+
+class BatchWorker:
+    """Фоновый буфер: накапливает элементы и обрабатывает их пачками.
+
+    Пачка отправляется в flush(), как только набралось batch_size элементов
+    или прошло flush_interval секунд с момента появления первого элемента.
+    put() не блокирует вызывающий код. Элементы, которые не удалось обработать
+    при остановке (таймаут или обработчик не запущен), передаются в on_dropped():
+    по умолчанию они теряются, наследник может сохранить их в другом месте.
+    """
+
+    name = "batch"
+
+    def __init__(self, batch_size: int = 50, flush_interval: float = 2.0, max_queue_size: int = 10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._batch_ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Элементы, уже взятые из очереди в текущую пачку, но ещё не обработанные
+        self._batch: List[Any] = []
+        self.flushed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def start(self):
+        """Запуск фоновой задачи"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"{self.name}-worker")
+
+    def put(self, item: Any) -> bool:
+        """Добавление элемента в очередь без ожидания"""
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error(f"❌ Очередь {self.name} переполнена, элемент отброшен")
+            return False
+        if self._queue.qsize() >= self.batch_size - 1:
+            self._batch_ready.set()
+        return True
+
+    @property
+    def pending(self) -> int:
+        """Количество элементов, ожидающих обработки (включая собираемую пачку)"""
+        return self._queue.qsize() + len(self._batch)
+
+    async def flush(self, items: List[Any]):
+        """Обработка пачки элементов, реализуется в наследниках"""
+        raise NotImplementedError
+
+    async def on_dropped(self, items: List[Any]):
+        """Элементы, не обработанные при остановке. По умолчанию теряются"""
+        logger.error(f"❌ {self.name}: отброшено элементов: {len(items)}")
+
+    async def stop(self, timeout: Optional[float] = None):
+        """Остановка: обрабатывает всё, что уже в очереди, и завершает задачу"""
+        if self._task is None:
+            # Обработчик так и не запустился (например, Google Sheets не подключился)
+            logger.error(f"❌ {self.name}: обработчик не запущен")
+            await self._drop(self._drain())
+            return
+        await self._queue.put(_STOP)
+        self._batch_ready.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            # Задача отменена посреди flush: прерванная пачка и остаток очереди не обработаны
+            self._task.cancel()
+            logger.error(f"❌ {self.name}: не успели обработать очередь за {timeout} с")
+            items, self._batch = self._batch, []
+            await self._drop(items + self._drain())
+        finally:
+            self._task = None
+
+    async def _drop(self, items: List[Any]):
+        if not items:
+            return
+        self.dropped += len(items)
+        try:
+            await self.on_dropped(items)
+        except Exception as e:
+            logger.error(f"❌ {self.name}: ошибка при сохранении необработанных элементов: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            if batch:
+                await self._flush_batch(batch)
+            self._batch = []
+
+    async def _collect(self):
+        """Сбор пачки: ждём первый элемент, затем добираем до размера или таймаута"""
+        item = await self._queue.get()
+        if item is _STOP:
+            return [], True
+
+        batch = self._batch = [item]
+        if self._queue.qsize() + 1 < self.batch_size:
+            self._batch_ready.clear()
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+        while len(batch) < self.batch_size and not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is _STOP:
+                # Обрабатываем остаток очереди и выходим
+                batch.extend(self._drain())
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _drain(self) -> List[Any]:
+        items = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                items.append(item)
+        return items
+
+    async def _flush_batch(self, batch: List[Any]):
+        while batch:
+            chunk = batch[:self.batch_size]
+            try:
+                await self.flush(chunk)
+                self.flushed += len(chunk)
+            except Exception as e:
+                self.failed += len(chunk)
+                logger.error(f"❌ {self.name}: ошибка обработки пачки из {len(chunk)} элементов: {e}")
+            # batch - это self._batch: обработанная часть больше не числится в ожидании
+            del batch[:len(chunk)]
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import List, Optional, Set
+from bot.delivery import BLOCKED, SENT
+
+logger = logging.getLogger(__name__)
+
+# Статусы, после которых получателя не нужно повторно обрабатывать при возобновлении
+FINAL_STATUSES = (SENT, BLOCKED)
+
+
+class BroadcastJournal:
+    """Журнал доставки рассылки.
+
+    Append-only файл <directory>/<run_id>.log, по строке "telegram_id<TAB>status"
+    на каждого обработанного получателя. Записи копятся в буфере и сбрасываются
+    на диск (flush + fsync) пачками: каждые flush_every записей или раз в
+    flush_interval секунд. При падении теряется не больше одной пачки, а
+    повреждённая последняя строка при чтении пропускается.
+    """
+
+    def __init__(
+        self,
+        run_id: str,
+        directory: str = "broadcast_runs",
+        flush_every: int = 100,
+        flush_interval: float = 1.0
+    ):
+        self.run_id = run_id
+        self.path = os.path.join(directory, f"{run_id}.log")
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._buffer: List[str] = []
+        self._last_flush = time.monotonic()
+        self._flush_lock = asyncio.Lock()
+        self._file = None
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def new_run_id() -> str:
+        """ID нового запуска рассылки"""
+        return datetime.now().strftime("%Y%m%d-%H%M%S")
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load_completed(self) -> Set[int]:
+        """telegram_id получателей, которым рассылка уже доставлена (или которые заблокировали бота)"""
+        completed = set()
+        if not self.exists():
+            return completed
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 2 or not parts[0].lstrip("-").isdigit():
+                    continue  # Комментарий или строка, оборванная при падении
+                if parts[1] in FINAL_STATUSES:
+                    completed.add(int(parts[0]))
+        return completed
+
+    def open(self, note: Optional[str] = None):
+        """Открытие журнала на дозапись"""
+        ends_with_newline = True
+        if self.exists() and os.path.getsize(self.path) > 0:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                ends_with_newline = f.read(1) == b"\n"
+
+        self._file = open(self.path, "a", encoding="utf-8")
+        if not ends_with_newline:
+            # Завершаем строку, оборванную при падении, чтобы не склеить её со следующей записью
+            self._file.write("\n")
+        if note:
+            self._file.write(f"# {datetime.now().isoformat(timespec='seconds')} {note}\n")
+            self._file.flush()
+
+    async def record(self, telegram_id: int, status: str):
+        """Запись результата доставки"""
+        self._buffer.append(f"{telegram_id}\t{status}\n")
+        if len(self._buffer) >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush()
+
+    async def flush(self):
+        """Сброс буфера на диск в отдельном потоке"""
+        async with self._flush_lock:
+            if not self._buffer or self._file is None:
+                return
+            lines, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            await asyncio.to_thread(self._write, lines)
+
+    def _write(self, lines: List[str]):
+        self._file.writelines(lines)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    async def close(self):
+        await self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,470 @@
+import asyncio
+import json
+import logging
+import secrets
+import time
+from contextlib import aclosing
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+from aiogram import Bot
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError, WatchError
+from bot.database import AudienceFilter, UserRepository
+from bot.delivery import BLOCKED, SENT, DeliveryEngine
+from bot.templates import PACKAGE_IDS, TemplateRegistry, build_broadcast_registry
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "broadcast:jobs"
+GROUP_NAME = "broadcast-workers"
+JOB_KEY = "broadcast:job:{}"
+# Получатели, которым рассылка уже доставлена (или которые заблокировали бота)
+DONE_KEY = "broadcast:job:{}:done"
+# Все рассылки по времени создания (для списка в /broadcasts)
+JOBS_INDEX_KEY = "broadcast:jobs:index"
+
+# Статусы рассылки
+DRAFT = "draft"
+QUEUED = "queued"
+RUNNING = "running"
+PAUSED = "paused"
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (COMPLETED, CANCELLED)
+
+# Шаблоны, которые можно поставить в очередь
+TEMPLATES = ("sales",)
+
+
+@dataclass
+class BroadcastJob:
+    """Рассылка в очереди: аудитория, шаблон, статус и прогресс"""
+    job_id: str
+    status: str
+    template: str
+    audience: AudienceFilter
+    created_at: float
+    created_by: Optional[int] = None
+    total: int = 0
+    sent: int = 0
+    blocked: int = 0
+    failed: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.blocked + self.failed
+
+    @classmethod
+    def from_hash(cls, job_id: str, data: Dict[bytes, bytes]) -> "BroadcastJob":
+        fields = {key.decode(): value.decode() for key, value in data.items()}
+        return cls(
+            job_id=job_id,
+            status=fields["status"],
+            template=fields["template"],
+            audience=AudienceFilter.from_dict(json.loads(fields["audience"])),
+            created_at=float(fields["created_at"]),
+            created_by=int(fields["created_by"]) if fields.get("created_by") else None,
+            total=int(fields.get("total", 0)),
+            sent=int(fields.get("sent", 0)),
+            blocked=int(fields.get("blocked", 0)),
+            failed=int(fields.get("failed", 0)),
+            started_at=float(fields["started_at"]) if fields.get("started_at") else None,
+            finished_at=float(fields["finished_at"]) if fields.get("finished_at") else None,
+        )
+
+    def describe(self) -> str:
+        """Строка для списка рассылок"""
+        percent = self.processed / self.total * 100 if self.total else 0.0
+        return (
+            f"<code>{self.job_id}</code> - {self.status}, {self.template}, {self.audience.describe()}\n"
+            f"   {self.processed}/{self.total} ({percent:.0f}%): "
+            f"✅ {self.sent} 🚫 {self.blocked} ❌ {self.failed}"
+        )
+
+
+def parse_audience(text: Optional[str]) -> AudienceFilter:
+    """
+    Фильтр аудитории из аргументов команды, например:
+    package=business,gala participated=yes vsm=no from=2025-09-01 to=2025-10-01
+
+    Raises:
+        ValueError: Неизвестный параметр или некорректное значение
+    """
+    yes_no = {"yes": True, "да": True, "no": False, "нет": False}
+    audience = AudienceFilter()
+    for token in (text or "").split():
+        key, _, value = token.partition("=")
+        value = value.lower()
+        if key == "package":
+            packages = [package for package in value.split(",") if package]
+            unknown = set(packages) - set(PACKAGE_IDS)
+            if not packages or unknown:
+                raise ValueError(f"неизвестный пакет: {', '.join(sorted(unknown)) or value}")
+            audience.package_types = packages
+        elif key in ("participated", "vsm"):
+            if value not in yes_no:
+                raise ValueError(f"{key}: ожидается yes или no")
+            if key == "participated":
+                audience.participated_before = yes_no[value]
+            else:
+                audience.is_vsm_graduate = yes_no[value]
+        elif key in ("from", "to"):
+            try:
+                day = date.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"{key}: ожидается дата ГГГГ-ММ-ДД")
+            if key == "from":
+                audience.registered_from = datetime.combine(day, datetime.min.time())
+            else:
+                # Дата окончания включительно: до начала следующего дня
+                audience.registered_before = datetime.combine(day + timedelta(days=1), datetime.min.time())
+        else:
+            raise ValueError(f"неизвестный параметр '{key}'")
+    return audience
+
+
+class BroadcastQueue:
+    """Очередь рассылок на Redis Streams.
+
+    Рассылка хранится в хеше broadcast:job:<id>, в поток broadcast:jobs
+    попадает только её id. Запись потока подтверждается (XACK) лишь после
+    завершения рассылки, поэтому прерванная рассылка будет подхвачена снова.
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    async def create(
+        self,
+        audience: AudienceFilter,
+        total: int,
+        template: str = "sales",
+        created_by: Optional[int] = None
+    ) -> BroadcastJob:
+        """Создание черновика рассылки (в очередь ставится через enqueue)"""
+        if template not in TEMPLATES:
+            raise ValueError(f"неизвестный шаблон '{template}'")
+        job = BroadcastJob(
+            job_id=datetime.now().strftime("%Y%m%d-%H%M%S-") + secrets.token_hex(2),
+            status=DRAFT,
+            template=template,
+            audience=audience,
+            created_at=time.time(),
+            created_by=created_by,
+            total=total,
+        )
+        mapping = {
+            "status": job.status,
+            "template": job.template,
+            "audience": json.dumps(audience.to_dict()),
+            "created_at": job.created_at,
+            "total": job.total,
+            "sent": 0,
+            "blocked": 0,
+            "failed": 0,
+        }
+        if created_by is not None:
+            mapping["created_by"] = created_by
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(JOB_KEY.format(job.job_id), mapping=mapping)
+            pipe.zadd(JOBS_INDEX_KEY, {job.job_id: job.created_at})
+            await pipe.execute()
+        return job
+
+    async def enqueue(self, job_id: str) -> bool:
+        """Постановка черновика в очередь"""
+        if not await self._transition(job_id, (DRAFT,), QUEUED):
+            return False
+        await self.redis.xadd(STREAM_KEY, {"job_id": job_id})
+        return True
+
+    async def get(self, job_id: str) -> Optional[BroadcastJob]:
+        data = await self.redis.hgetall(JOB_KEY.format(job_id))
+        if not data:
+            return None
+        return BroadcastJob.from_hash(job_id, data)
+
+    async def list(self, limit: int = 10) -> List[BroadcastJob]:
+        """Последние рассылки, новые первыми"""
+        job_ids = await self.redis.zrevrange(JOBS_INDEX_KEY, 0, limit - 1)
+        jobs = []
+        for job_id in job_ids:
+            job = await self.get(job_id.decode())
+            if job:
+                jobs.append(job)
+        return jobs
+
+    async def pause(self, job_id: str) -> bool:
+        return await self._transition(job_id, (QUEUED, RUNNING), PAUSED)
+
+    async def resume(self, job_id: str) -> bool:
+        """Возврат в очередь: обработчик отпускает рассылку на паузе и продолжает её
+        по новой записи потока, пропуская уже обработанных получателей"""
+        if not await self._transition(job_id, (PAUSED,), QUEUED):
+            return False
+        await self.redis.xadd(STREAM_KEY, {"job_id": job_id})
+        return True
+
+    async def cancel(self, job_id: str) -> bool:
+        return await self._transition(job_id, (DRAFT, QUEUED, RUNNING, PAUSED), CANCELLED)
+
+    async def mark_running(self, job_id: str, **fields: Any) -> bool:
+        """Старт обработчиком. False - рассылку поставили на паузу или отменили"""
+        return await self._transition(job_id, (QUEUED, RUNNING), RUNNING, **fields)
+
+    async def complete(self, job_id: str, **fields: Any) -> bool:
+        """Все получатели обработаны. False - рассылку успели отменить"""
+        # QUEUED - пауза и возобновление успели пройти, пока обработчик дорабатывал рассылку
+        return await self._transition(job_id, (QUEUED, RUNNING, PAUSED), COMPLETED, **fields)
+
+    async def record(self, job_id: str, telegram_id: int, status: str):
+        """Учёт результата доставки одному получателю"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hincrby(JOB_KEY.format(job_id), status, 1)
+            if status in (SENT, BLOCKED):
+                pipe.sadd(DONE_KEY.format(job_id), telegram_id)
+            await pipe.execute()
+
+    async def load_done(self, job_id: str) -> Set[int]:
+        """Получатели, которых не нужно обрабатывать повторно"""
+        return {int(member) for member in await self.redis.smembers(DONE_KEY.format(job_id))}
+
+    async def _transition(self, job_id: str, allowed: tuple, status: str, **fields: Any) -> bool:
+        """Смена статуса, если текущий статус входит в allowed (атомарно через WATCH)"""
+        key = JOB_KEY.format(job_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    current = await pipe.hget(key, "status")
+                    if current is None or current.decode() not in allowed:
+                        await pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    pipe.hset(key, mapping={"status": status, **fields})
+                    await pipe.execute()
+                    return True
+                except WatchError:
+                    # Статус изменился между чтением и записью - проверяем заново
+                    continue
+
+
+class BroadcastWorker:
+    """Фоновое выполнение рассылок из очереди внутри процесса бота.
+
+    Рассылки выполняются по одной, через общий с ботом Bot и с ограничением
+    скорости ниже лимита Telegram, чтобы оставлять запас для ответов
+    пользователям. Пауза и отмена проверяются каждые poll_interval секунд.
+    Рассылка на паузе не занимает ни обработчик, ни соединение с БД: выборка
+    аудитории закрывается, запись потока подтверждается, а resume() ставит
+    рассылку в очередь заново.
+    """
+
+    def __init__(
+        self,
+        queue: BroadcastQueue,
+        bot: Bot,
+        user_repo: UserRepository,
+        consumer: str = "bot",
+        rate: float = 20.0,
+        concurrency: int = 5,
+        poll_interval: float = 1.0,
+        claim_idle: float = 300.0
+    ):
+        self.queue = queue
+        self.bot = bot
+        self.user_repo = user_repo
+        self.consumer = consumer
+        self.rate = rate
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.claim_idle = claim_idle
+        self.templates: TemplateRegistry = build_broadcast_registry()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def redis(self) -> Redis:
+        return self.queue.redis
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="broadcast-worker")
+
+    async def stop(self):
+        """Остановка: текущая рассылка не подтверждается и продолжится после перезапуска"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._task = None
+
+    async def _run(self):
+        await self._ensure_group()
+        while True:
+            try:
+                entry = await self._next_entry()
+                if entry is None:
+                    continue
+                entry_id, job_id = entry
+                if job_id is None or await self._process(job_id):
+                    await self.redis.xack(STREAM_KEY, GROUP_NAME, entry_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка обработчика очереди рассылок: {e}")
+                await asyncio.sleep(5)
+
+    async def _ensure_group(self):
+        try:
+            await self.redis.xgroup_create(STREAM_KEY, GROUP_NAME, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _next_entry(self) -> Optional[tuple]:
+        """Следующая рассылка: свои неподтверждённые, зависшие у других обработчиков, затем новые"""
+        response = await self.redis.xreadgroup(GROUP_NAME, self.consumer, {STREAM_KEY: "0"}, count=1)
+        entries = response[0][1] if response else []
+        if not entries:
+            _, entries, *_ = await self.redis.xautoclaim(
+                STREAM_KEY, GROUP_NAME, self.consumer, int(self.claim_idle * 1000), count=1
+            )
+        if not entries:
+            response = await self.redis.xreadgroup(
+                GROUP_NAME, self.consumer, {STREAM_KEY: ">"}, count=1, block=5000
+            )
+            entries = response[0][1] if response else []
+        if not entries:
+            return None
+        entry_id, fields = entries[0]
+        if not fields or b"job_id" not in fields:
+            # Запись удалена из потока (XTRIM/XDEL), подтверждаем и пропускаем
+            return entry_id, None
+        return entry_id, fields[b"job_id"].decode()
+
+    async def _process(self, job_id: str) -> bool:
+        """Выполнение рассылки. True - рассылка завершена и запись потока можно подтвердить"""
+        job = await self.queue.get(job_id)
+        if job is None:
+            logger.warning(f"⚠️ Рассылка {job_id} не найдена, пропускаем")
+            return True
+        if job.status == PAUSED:
+            # Продолжится по новой записи потока, которую добавит resume()
+            logger.info(f"⏸ Рассылка {job_id} на паузе, ждёт возобновления")
+            return True
+        if job.status not in (QUEUED, RUNNING):
+            return True
+        fields = {} if job.started_at else {"started_at": time.time()}
+        if not await self.queue.mark_running(job_id, **fields):
+            # Пауза или отмена между чтением и записью статуса
+            logger.info(f"⏸ Рассылка {job_id} поставлена на паузу или отменена до старта")
+            return True
+        
+        done = await self.queue.load_done(job_id)
+        logger.info(f"📤 Рассылка {job_id}: старт, уже обработано {len(done)} из {job.total}")
+        
+        control = _JobControl(self.queue, job_id, self.poll_interval)
+        control.start()
+        try:
+            engine = DeliveryEngine(rate=self.rate, concurrency=self.concurrency)
+            
+            async def send(user: Dict[str, Any]):
+                await self.bot(self.templates.broadcast(user["package"]).build(user["telegram_id"]))
+            
+            async def on_result(user: Dict[str, Any], status: str):
+                await self.queue.record(job_id, user["telegram_id"], status)
+            
+            stats = await engine.run(self._recipients(job, done, control), send, on_result=on_result)
+        finally:
+            control.stop()
+        
+        if control.paused and control.interrupted:
+            logger.info(
+                f"⏸ Рассылка {job_id} на паузе: отправлено {stats.sent}, выборка аудитории закрыта до возобновления"
+            )
+            return True
+        if control.cancelled or not await self.queue.complete(job_id, finished_at=time.time()):
+            logger.info(f"🛑 Рассылка {job_id} отменена")
+        else:
+            logger.info(
+                f"✅ Рассылка {job_id} завершена: отправлено {stats.sent}, "
+                f"заблокировали {stats.blocked}, ошибок {stats.failed}"
+            )
+        await self._notify_owner(job_id)
+        return True
+
+    async def _recipients(
+        self,
+        job: BroadcastJob,
+        done: Set[int],
+        control: "_JobControl"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        # aclosing: при паузе или отмене курсор и сессия БД закрываются сразу, а не при сборке мусора
+        async with aclosing(self.user_repo.iter_audience(job.audience)) as rows:
+            async for row in rows:
+                if control.stopped:
+                    control.interrupted = True
+                    return
+                if row.telegram_id in done:
+                    continue
+                package_id = PACKAGE_IDS.get(row.package_type)
+                if package_id is None:
+                    # Такие получатели не входят в total (см. создание рассылки)
+                    logger.warning(f"⚠️ Пользователь {row.telegram_id} с неизвестным пакетом {row.package_type} пропущен")
+                    continue
+                yield {"telegram_id": row.telegram_id, "package": package_id}
+
+    async def _notify_owner(self, job_id: str):
+        job = await self.queue.get(job_id)
+        if job is None or job.created_by is None:
+            return
+        try:
+            await self.bot.send_message(chat_id=job.created_by, text=f"📬 Рассылка завершена\n\n{job.describe()}")
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось сообщить о завершении рассылки {job_id}: {e}")
+
+
+class _JobControl:
+    """Опрос статуса рассылки: пауза и отмена во время выполнения"""
+
+    def __init__(self, queue: BroadcastQueue, job_id: str, poll_interval: float):
+        self.queue = queue
+        self.job_id = job_id
+        self.poll_interval = poll_interval
+        self.cancelled = False
+        self.paused = False
+        # Выдача получателей прервана паузой или отменой до конца аудитории
+        self.interrupted = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def stopped(self) -> bool:
+        """Выдачу получателей пора прекратить"""
+        return self.cancelled or self.paused
+
+    def start(self):
+        self._task = asyncio.create_task(self._poll(), name=f"broadcast-control-{self.job_id}")
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _poll(self):
+        while not self.stopped:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                job = await self.queue.get(self.job_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось проверить статус рассылки {self.job_id}: {e}")
+                continue
+            if job is None or job.status == CANCELLED:
+                self.cancelled = True
+            elif job.status == PAUSED:
+                self.paused = True
@@ -1,21 +1,184 @@
 import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import Row, event, func, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.pool import NullPool
-from sqlalchemy import select
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from config.config import load_config, Config
-from bot.models import Base, User
+from bot.metrics import timed
+from bot.models import PARTICIPATION_DECLINED, PAYMENT_CONFIRMED, Base, ParticipationStatus, User
+from bot.user_cache import UserCache
+
+
+@dataclass
+class PoolStats:
+    """Статистика пула соединений с БД"""
+    checked_out: int = 0
+    checkouts: int = 0
+    connects: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+    connect_total: float = 0.0
+    connect_max: float = 0.0
+
+    def record_wait(self, seconds: float):
+        self.checkouts += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def record_connect(self, seconds: float):
+        self.connects += 1
+        self.connect_total += seconds
+        self.connect_max = max(self.connect_max, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Снимок статистики в виде словаря (время в миллисекундах)"""
+        return {
+            "checked_out": self.checked_out,
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "wait_avg_ms": self.wait_total / self.checkouts * 1000 if self.checkouts else 0.0,
+            "wait_max_ms": self.wait_max * 1000,
+            "connect_avg_ms": self.connect_total / self.connects * 1000 if self.connects else 0.0,
+            "connect_max_ms": self.connect_max * 1000,
+        }
+
+
+# Колонки для потокового просмотра пользователей (без создания ORM объектов)
+USER_LISTING_COLUMNS = (
+    User.id,
+    User.telegram_id,
+    User.username,
+    User.first_name,
+    User.last_name,
+    User.package_type,
+    User.participated_before,
+    User.participation_year,
+    User.is_vsm_graduate,
+    User.graduation_year,
+    User.created_at,
+    User.updated_at,
+)
+
+
+def parse_user_cursor(value: str) -> Tuple[datetime, int]:
+    """Разбор курсора пагинации вида '<created_at в ISO формате>,<id>'"""
+    created_at, _, user_id = value.rpartition(",")
+    return datetime.fromisoformat(created_at), int(user_id)
+
+
+def format_user_cursor(created_at: datetime, user_id: int) -> str:
+    """Курсор пагинации для строки (created_at, id)"""
+    return f"{created_at.isoformat()},{user_id}"
+
+
+@dataclass
+class AudienceFilter:
+    """Фильтр аудитории рассылки по таблице users (None - без ограничения)"""
+    package_types: Optional[Sequence[str]] = None
+    participated_before: Optional[bool] = None
+    is_vsm_graduate: Optional[bool] = None
+    registered_from: Optional[datetime] = None
+    registered_before: Optional[datetime] = None
+
+    def conditions(self) -> List[Any]:
+        """Условия WHERE для выбранных фильтров"""
+        conditions = []
+        if self.package_types:
+            conditions.append(User.package_type.in_(list(self.package_types)))
+        if self.participated_before is not None:
+            conditions.append(User.participated_before.is_(self.participated_before))
+        if self.is_vsm_graduate is not None:
+            conditions.append(User.is_vsm_graduate.is_(self.is_vsm_graduate))
+        if self.registered_from is not None:
+            conditions.append(User.created_at >= self.registered_from)
+        if self.registered_before is not None:
+            conditions.append(User.created_at < self.registered_before)
+        return conditions
+
+    def describe(self) -> str:
+        """Краткое описание фильтра для журнала и превью"""
+        parts = []
+        if self.package_types:
+            parts.append(f"package={','.join(self.package_types)}")
+        if self.participated_before is not None:
+            parts.append(f"participated={'yes' if self.participated_before else 'no'}")
+        if self.is_vsm_graduate is not None:
+            parts.append(f"vsm_graduate={'yes' if self.is_vsm_graduate else 'no'}")
+        if self.registered_from is not None:
+            parts.append(f"from={self.registered_from.isoformat()}")
+        if self.registered_before is not None:
+            parts.append(f"before={self.registered_before.isoformat()}")
+        return " ".join(parts) or "all"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализуемое представление фильтра (для очереди рассылок)"""
+        return {
+            "package_types": list(self.package_types) if self.package_types else None,
+            "participated_before": self.participated_before,
+            "is_vsm_graduate": self.is_vsm_graduate,
+            "registered_from": self.registered_from.isoformat() if self.registered_from else None,
+            "registered_before": self.registered_before.isoformat() if self.registered_before else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AudienceFilter":
+        return cls(
+            package_types=data.get("package_types"),
+            participated_before=data.get("participated_before"),
+            is_vsm_graduate=data.get("is_vsm_graduate"),
+            registered_from=datetime.fromisoformat(data["registered_from"]) if data.get("registered_from") else None,
+            registered_before=datetime.fromisoformat(data["registered_before"]) if data.get("registered_before") else None,
+        )
+
+
+def _instrumented_pool_class(base: type, stats: PoolStats) -> type:
+    """Подкласс пула, замеряющий время ожидания соединения.
+
+    _do_get замыкает переданный объект stats (свой класс на каждый Database),
+    поэтому статистика переживает пересоздание пула (engine.dispose()
+    вызывает pool.recreate(), новый пул того же класса).
+    """
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return base._do_get(self)
+        finally:
+            stats.record_wait(time.perf_counter() - started)
+
+    return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get})
 
 
 class Database:
     def __init__(self, config: Config):
         self.config = config
-        db_url = f"postgresql+psycopg://{config.db.user}:{config.db.password}@{config.db.host}:{config.db.port}/{config.db.database}"
+        db_config = config.db
+        db_url = f"postgresql+psycopg://{db_config.user}:{db_config.password}@{db_config.host}:{db_config.port}/{db_config.database}"
+        
+        self.stats = PoolStats()
+        
+        if db_config.pool_enabled:
+            pool_options = dict(
+                poolclass=_instrumented_pool_class(AsyncAdaptedQueuePool, self.stats),
+                pool_size=db_config.pool_size,
+                max_overflow=db_config.max_overflow,
+                pool_timeout=db_config.pool_timeout,
+                pool_recycle=db_config.pool_recycle,
+                pool_pre_ping=db_config.pool_pre_ping,
+            )
+        else:
+            pool_options = dict(poolclass=_instrumented_pool_class(NullPool, self.stats))
         
         self.engine = create_async_engine(
             db_url,
-            poolclass=NullPool,
-            echo=True
+            echo=db_config.echo,
+            connect_args={"prepare_threshold": db_config.prepare_threshold},
+            **pool_options
         )
+        self._setup_pool_events()
         
         self.async_session = async_sessionmaker(
             self.engine,
@@ -23,11 +186,52 @@ class Database:
             expire_on_commit=False
         )
     
+    def _setup_pool_events(self):
+        """Подписка на события пула для сбора статистики"""
+        sync_engine = self.engine.sync_engine
+        
+        @event.listens_for(sync_engine, "do_connect")
+        def _on_do_connect(dialect, conn_rec, cargs, cparams):
+            conn_rec.info["connect_started"] = time.perf_counter()
+        
+        @event.listens_for(sync_engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            started = connection_record.info.pop("connect_started", None)
+            if started is not None:
+                self.stats.record_connect(time.perf_counter() - started)
+        
+        @event.listens_for(sync_engine, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            self.stats.checked_out += 1
+        
+        @event.listens_for(sync_engine, "checkin")
+        def _on_checkin(dbapi_connection, connection_record):
+            self.stats.checked_out -= 1
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Статистика пула соединений: занятые соединения, время ожидания и подключения"""
+        stats = self.stats.snapshot()
+        stats["pooled"] = self.config.db.pool_enabled
+        stats["status"] = self.engine.pool.status()
+        return stats
+    
     async def create_tables(self):
         """Создание всех таблиц"""
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
     
+    async def warm_up(self, create_tables: bool = True):
+        """Проверка подключения и заполнение пула соединениями до первых запросов"""
+        if create_tables:
+            await self.create_tables()
+        
+        async def ping():
+            async with self.engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        
+        connections = self.config.db.pool_size if self.config.db.pool_enabled else 1
+        await asyncio.gather(*(ping() for _ in range(connections)))
+    
     async def get_session(self) -> AsyncSession:
         """Получение сессии для работы с БД"""
         return self.async_session()
@@ -39,11 +243,24 @@ class Database:
 
 # Функции для работы с пользователями
 class UserRepository:
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, cache: Optional[UserCache] = None):
         self.db = db
+        self.cache = cache
+    
+    async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[User]:
+        """Получение пользователя по telegram_id (сначала из кэша, если он задан)"""
+        if self.cache is not None:
+            found, user = await self.cache.get(telegram_id)
+            if found:
+                return user
+        
+        user = await self._fetch_user_by_telegram_id(telegram_id)
+        if self.cache is not None:
+            await self.cache.fill(telegram_id, user)
+        return user
     
-    async def get_user_by_telegram_id(self, telegram_id: int) -> User:
-        """Получение пользователя по telegram_id"""
+    @timed("db", "get_user_by_telegram_id")
+    async def _fetch_user_by_telegram_id(self, telegram_id: int) -> Optional[User]:
         session = await self.db.get_session()
         try:
             result = await session.execute(select(User).where(User.telegram_id == telegram_id))
@@ -51,45 +268,193 @@ class UserRepository:
         finally:
             await session.close()
     
+    @timed("db")
     async def create_user(self, user_data: dict) -> User:
-        """Создание нового пользователя или обновление существующего"""
+        """Создание нового пользователя или обновление существующего.
+
+        Выполняется одним запросом INSERT ... ON CONFLICT (telegram_id) DO UPDATE ... RETURNING,
+        при обновлении created_at не меняется.
+        """
+        now = datetime.utcnow()
+        values = {"created_at": now, "updated_at": now, **user_data}
+        insert_stmt = pg_insert(User).values(values)
+        stmt = insert_stmt.on_conflict_do_update(
+            index_elements=[User.telegram_id],
+            set_={
+                key: insert_stmt.excluded[key]
+                for key in values
+                if key not in ("telegram_id", "created_at")  # telegram_id и created_at не меняем
+            }
+        ).returning(User)
+        
         session = await self.db.get_session()
         try:
-            # Сначала проверяем, существует ли пользователь
-            existing_user_result = await session.execute(
-                select(User).where(User.telegram_id == user_data["telegram_id"])
-            )
-            existing_user = existing_user_result.scalar_one_or_none()
-            
-            if existing_user:
-                # Обновляем существующего пользователя
-                for key, value in user_data.items():
-                    if key != "telegram_id":  # telegram_id не меняем
-                        setattr(existing_user, key, value)
-                await session.commit()
-                await session.refresh(existing_user)
-                return existing_user
-            else:
-                # Создаем нового пользователя
-                user = User(**user_data)
-                session.add(user)
-                await session.commit()
-                await session.refresh(user)
-                return user
+            result = await session.execute(stmt, execution_options={"populate_existing": True})
+            user = result.scalar_one()
+            await session.commit()
         finally:
             await session.close()
+        
+        if self.cache is not None:
+            await self.cache.put(user.telegram_id, user)
+        return user
     
-    async def update_user(self, telegram_id: int, user_data: dict) -> User:
-        """Обновление данных пользователя"""
+    @timed("db")
+    async def update_user(self, telegram_id: int, user_data: dict) -> Optional[User]:
+        """Обновление данных пользователя (один запрос UPDATE ... RETURNING)"""
+        stmt = (
+            update(User)
+            .where(User.telegram_id == telegram_id)
+            .values({"updated_at": datetime.utcnow(), **user_data})
+            .returning(User)
+        )
+        
         session = await self.db.get_session()
         try:
-            result = await session.execute(select(User).where(User.telegram_id == telegram_id))
+            result = await session.execute(stmt, execution_options={"populate_existing": True})
             user = result.scalar_one_or_none()
-            if user:
-                for key, value in user_data.items():
-                    setattr(user, key, value)
-                await session.commit()
-                await session.refresh(user)
-            return user
+            await session.commit()
+        finally:
+            await session.close()
+        
+        if self.cache is not None:
+            await self.cache.put(telegram_id, user)
+        return user
+    
+    async def iter_users(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        batch_size: int = 500
+    ) -> AsyncIterator[Row]:
+        """
+        Потоковый просмотр пользователей в порядке (created_at, id)
+        
+        Строки читаются серверным курсором пачками по batch_size, поэтому
+        память и время до первой строки не зависят от размера таблицы.
+        
+        Args:
+            limit: Максимальное количество строк
+            after: Курсор (created_at, id) последней строки предыдущей страницы
+            batch_size: Размер пачки при чтении курсора
+        """
+        stmt = select(*USER_LISTING_COLUMNS).order_by(User.created_at, User.id)
+        if after is not None:
+            stmt = stmt.where(tuple_(User.created_at, User.id) > tuple_(*after))
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        
+        session = await self.db.get_session()
+        try:
+            result = await session.stream(stmt.execution_options(yield_per=batch_size))
+            async for row in result:
+                yield row
+        finally:
+            await session.close()
+    
+    async def iter_audience(
+        self,
+        audience: AudienceFilter,
+        batch_size: int = 500
+    ) -> AsyncIterator[Row]:
+        """
+        Потоковая выборка аудитории рассылки (id, telegram_id, username, package_type)
+        
+        Строки читаются серверным курсором пачками по batch_size и отдаются
+        по мере того, как их забирает отправка, - аудитория не загружается
+        в память и не выгружается в файл целиком.
+        """
+        stmt = (
+            select(User.id, User.telegram_id, User.username, User.package_type)
+            .where(*audience.conditions())
+            .order_by(User.id)
+        )
+        
+        session = await self.db.get_session()
+        try:
+            result = await session.stream(stmt.execution_options(yield_per=batch_size))
+            async for row in result:
+                yield row
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+    
+    @timed("db")
+    async def get_audience_stats(self, audience: AudienceFilter) -> Dict[str, int]:
+        """Размер аудитории рассылки по типам пакетов одним агрегирующим запросом"""
+        stmt = (
+            select(User.package_type, func.count().label("count"))
+            .where(*audience.conditions())
+            .group_by(User.package_type)
+        )
+        
+        session = await self.db.get_session()
+        try:
+            result = await session.execute(stmt)
+            return {row.package_type: row.count for row in result}
+        finally:
+            await session.close()
+    
+    @staticmethod
+    def _count_statuses(status: str):
+        """Подзапрос: количество получателей с данным статусом (по индексу на status)"""
+        return (
+            select(func.count())
+            .select_from(ParticipationStatus)
+            .where(ParticipationStatus.status == status)
+            .scalar_subquery()
+        )
+    
+    @timed("db")
+    async def get_stats(self) -> Dict[str, int]:
+        """Статистика регистраций одним агрегирующим запросом (COUNT(*) FILTER (...))"""
+        stmt = select(
+            func.count().label("total"),
+            func.count().filter(User.package_type == "business").label("business"),
+            func.count().filter(User.package_type == "gala").label("gala"),
+            func.count().filter(User.package_type == "full").label("full"),
+            func.count().filter(User.participated_before.is_(True)).label("participated_before"),
+            func.count().filter(User.is_vsm_graduate.is_(True)).label("vsm_graduates"),
+            self._count_statuses(PAYMENT_CONFIRMED).label("payment_confirmed"),
+            self._count_statuses(PARTICIPATION_DECLINED).label("participation_declined"),
+        )
+        
+        session = await self.db.get_session()
+        try:
+            result = await session.execute(stmt)
+            return dict(result.one()._mapping)
+        finally:
+            await session.close()
+
+
+class ParticipationRepository:
+    def __init__(self, db: Database):
+        self.db = db
+    
+    @timed("db")
+    async def upsert_statuses(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Сохранение статусов участия одним запросом INSERT ... VALUES (...), (...) ON CONFLICT
+        
+        Каждая строка: telegram_id, status, updated_at. Запись не перезаписывается
+        более старым ответом, если пачки пришли не по порядку.
+        """
+        if not rows:
+            return 0
+        values = [{"created_at": row["updated_at"], **row} for row in rows]
+        insert_stmt = pg_insert(ParticipationStatus).values(values)
+        stmt = insert_stmt.on_conflict_do_update(
+            index_elements=[ParticipationStatus.telegram_id],
+            set_={
+                "status": insert_stmt.excluded.status,
+                "updated_at": insert_stmt.excluded.updated_at,
+            },
+            where=ParticipationStatus.updated_at <= insert_stmt.excluded.updated_at
+        )
+        
+        session = await self.db.get_session()
+        try:
+            await session.execute(stmt)
+            await session.commit()
+            return len(values)
+        finally:
+            await session.close()
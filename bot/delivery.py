@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, Optional, Union
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+logger = logging.getLogger(__name__)
+
+# Статусы доставки
+SENT = "sent"
+BLOCKED = "blocked"
+FAILED = "failed"
+
+
+class TokenBucket:
+    """Глобальный лимит скорости отправки (токенов в секунду)"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """Приостановка выдачи токенов (например, после 429 от Telegram)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class DeliveryStats:
+    """Итоги доставки"""
+    sent: int = 0
+    blocked: int = 0
+    failed: int = 0
+    retries: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+
+    @property
+    def total(self) -> int:
+        return self.sent + self.blocked + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def rate(self) -> float:
+        """Фактическая скорость, сообщений в секунду"""
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+
+class DeliveryEngine:
+    """Параллельная доставка сообщений с учётом лимитов Telegram.
+
+    Несколько воркеров берут получателей из ограниченной очереди, общий
+    TokenBucket держит суммарную скорость в пределах лимита бота (~30 сообщений/с),
+    а отправки в один и тот же чат разносятся не чаще per_chat_interval.
+    На TelegramRetryAfter все воркеры ждут retry_after, сетевые и серверные
+    ошибки повторяются с экспоненциальной задержкой.
+    """
+
+    def __init__(
+        self,
+        rate: float = 25.0,
+        concurrency: int = 10,
+        per_chat_interval: float = 1.0,
+        max_retries: int = 5,
+        base_backoff: float = 1.0
+    ):
+        self.bucket = TokenBucket(rate)
+        self.concurrency = concurrency
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self._chat_next_send: Dict[int, float] = {}
+
+    async def run(
+        self,
+        recipients: Union[Iterable[Any], AsyncIterable[Any]],
+        send: Callable[[Any], Awaitable[Any]],
+        chat_id: Callable[[Any], int] = lambda recipient: recipient["telegram_id"],
+        on_result: Optional[Callable[[Any, str], Any]] = None
+    ) -> DeliveryStats:
+        """
+        Доставка всем получателям
+
+        Args:
+            recipients: Получатели (обычный или асинхронный итератор, читается потоково)
+            send: Корутина отправки одному получателю
+            chat_id: Функция получения chat_id получателя
+            on_result: Вызывается после каждой доставки со статусом SENT/BLOCKED/FAILED
+
+        Returns:
+            DeliveryStats: Итоги доставки
+        """
+        stats = DeliveryStats()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def worker():
+            while True:
+                recipient = await queue.get()
+                try:
+                    if recipient is None:
+                        return
+                    status = await self._deliver(recipient, send, chat_id(recipient), stats)
+                    setattr(stats, status, getattr(stats, status) + 1)
+                    if on_result:
+                        result = on_result(recipient, status)
+                        if asyncio.iscoroutine(result):
+                            await result
+                finally:
+                    queue.task_done()
+
+        async def produce():
+            if hasattr(recipients, "__aiter__"):
+                async for recipient in recipients:
+                    await queue.put(recipient)
+            else:
+                for recipient in recipients:
+                    await queue.put(recipient)
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        tasks = [asyncio.create_task(produce())]
+        tasks += [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            stats.finished_at = time.monotonic()
+        return stats
+
+    async def _deliver(self, recipient: Any, send: Callable[[Any], Awaitable[Any]], chat_id: int, stats: DeliveryStats) -> str:
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_chat(chat_id)
+            await self.bucket.acquire()
+            try:
+                await send(recipient)
+                return SENT
+            except TelegramRetryAfter as e:
+                logger.warning(f"Лимит Telegram, пауза {e.retry_after} с (чат {chat_id})")
+                self.bucket.pause(e.retry_after)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                delay = self.base_backoff * 2 ** attempt
+                logger.warning(f"Ошибка сети при отправке в чат {chat_id}, повтор через {delay:.1f} с: {e}")
+                await asyncio.sleep(delay)
+            except TelegramForbiddenError:
+                logger.warning(f"Пользователь {chat_id} заблокировал бота")
+                return BLOCKED
+            except TelegramBadRequest as e:
+                logger.error(f"Ошибка отправки пользователю {chat_id}: {e}")
+                return FAILED
+            except Exception as e:
+                logger.error(f"Неожиданная ошибка при отправке пользователю {chat_id}: {e}")
+                return FAILED
+            stats.retries += 1
+
+        logger.error(f"Не удалось отправить сообщение пользователю {chat_id} после {self.max_retries} повторов")
+        return FAILED
+
+    async def _wait_for_chat(self, chat_id: int):
+        """Пауза между сообщениями в один и тот же чат"""
+        now = time.monotonic()
+        next_send = self._chat_next_send.get(chat_id, 0.0)
+        if next_send > now:
+            await asyncio.sleep(next_send - now)
+            now = time.monotonic()
+        self._chat_next_send[chat_id] = now + self.per_chat_interval
+
+        if len(self._chat_next_send) > 10000:
+            # Убираем чаты, пауза для которых уже истекла
+            self._chat_next_send = {
+                chat: moment for chat, moment in self._chat_next_send.items() if moment > now
+            }
@@ -1,3 +1,4 @@
+import logging
 from typing import Any, Dict
 from aiogram.types import CallbackQuery, Message
 from aiogram_dialog import Dialog, DialogManager, Window, ShowMode
@@ -5,59 +6,9 @@ from aiogram_dialog.widgets.text import Const, Format
 from aiogram_dialog.widgets.kbd import Button, Column, Select, Back
 from aiogram_dialog.widgets.input import TextInput
 from bot.states import RegistrationSG
+from bot.texts import COMPLETION_TEXT, PACKAGES_TEXT, PROGRAM_TEXT, WELCOME_TEXT
 
-
-# Тексты для бота
-WELCOME_TEXT = """Дорогие выпускники! 
-
-В этом году на МБ25 мы хотим предоставить вам возможность снова стать частью конференции! Для этого мы придумали специальную программу для выпускников. Вы сможете посетить деловую программу третьего дня, послушать выступления и дискуссии уважаемых спикеров, а также принять участие в нетворкинге - развить свои софтскиллы и приобрести ценные деловые контакты."""
-
-PACKAGES_TEXT = """Мы предлагаем посетить конференцию в третий день - 25 октября. Есть три варианта участия:
-
-1. Деловая программа - участие в мероприятиях третьего дня конференции (25 октября). 
-Вас ждут интересные лекции от топовых спикеров, панельные дискуссии на актуальные темы, а также интерактивное мероприятие для выпускников с перерывом на нетворкинг. Вы сможете отработать навык целеполагания и деловой коммуникации и получить массу новых знакомств. Сплошная польза с утра и до самого вечера.
-Стоимость: 2 990р
-
-2. Гала-ужин - закрытие конференции в ресторане с панорамным видом на Петербург.
-Ваш шанс за бокалом игристого пообщаться с нынешними участниками конференции - насладиться приятной компанией и вкусным фуршетом. 
-Стоимость: 3 490р
-
-3. Деловая программа и гала-ужин - целый день интересных мероприятий и прекрасный праздник вечером.
-Сначала послушаете все самые крутые мероприятия третьего дня, а вечером отдохнете на ужине в ресторане с видом на ночной город.
-Стоимость: 5 990р
-
-Чтобы попасть в лист ожидания, выбери пакет участия, который тебе наиболее интересен."""
-
-COMPLETION_TEXT = """Спасибо, что зарегистрировался! В этот бот придет уведомление, когда откроются продажи. Не пропусти!"""
-
-PROGRAM_TEXT = """<b>Третий день МБ: буст личностного развития</b>
-
-Этот трек мы посвящаем вам — выпускникам, что строят будущее в менеджменте. Программа насыщена практикой и нетворкингом, чтобы дать вам максимум полезного для карьеры.
-
-🎯 <b>Деловая программа:</b>
-
-<b>12:00–13:20 | Игра-интерактив по коммуникации в команде</b>
-Разберём реальные сложности общения в корпоративной среде в лёгком игровом формате. Вы откроете для себя конкретные инструменты, которые помогают понимать коллег и достигать общих целей без лишнего стресса. Погрузимся в живые кейсы и найдём решения для типичных рабочих конфликтов.
-
-<b>14:30–15:10 | Воркшоп по самопрезентации</b>
-Научимся рассказывать о себе так, чтобы вас запоминали — и как профессионала, и как интересную личность. Вы освоите 3 подхода и создадите 3 варианта самопрезентации для ключевых ситуаций: собеседование, карьерное мероприятие, неформальное знакомство. Узнаете, как подчеркнуть свои сильные стороны и уверенно держаться перед любой аудиторией.
-
-<b>15:10–15:30 | Нетворкинг в формате быстрых встреч</b>
-Динамичный формат с короткими переходами от стола к столу, обменом мнений по карточкам и свободными диалогами. Это отличный и быстрый способ расширить круг полезных знакомств и найти единомышленников в индустрии.
-
-👩‍🏫 <b>Спикеры и фасилитаторы:</b>
-
-Катя Митусова — Лидер Women in Tech Russia, ex-Google, ex-Wrike, Platinum Tier Facilitator #IamRemarkable
-
-Оля Чадулина — HR в IT, ex-Raiffeisenbank, карьерный ментор и коуч ICF, автор канала «Всё ты можешь»
-
-Лена Соколова — Product Owner в EdTech, ex-Нетология, ex-Яндекс Практикум, автор канала и подкаста «Карьера без багов», сооснователь сообщества «Ещё не продакты»
-
-✨ <b>Почему стоит быть?</b>
-
-Финальный день — это ваша возможность прокачать ключевые навыки, получить свежие инсайты и пообщаться с теми, кто разделяет ваш интерес к будущему в менеджменте.
-
-<b>Ждём именно вас, выпускников Конференции и Высшей Школы Менеджмента!</b>"""
+logger = logging.getLogger(__name__)
 
 
 # Геттеры данных для диалогов
@@ -154,27 +105,23 @@ async def complete_registration(callback, widget, dialog_manager: DialogManager)
         user_repo = dialog_manager.middleware_data.get('user_repo')
         if user_repo:
             saved_user = await user_repo.create_user(user_data)
-            print(f"✅ Пользователь {user_data['telegram_id']} успешно сохранен в БД")
+            logger.info(f"✅ Пользователь {user_data['telegram_id']} успешно сохранен в БД")
         else:
-            print("⚠️ UserRepository не найден в middleware_data")
+            logger.warning("⚠️ UserRepository не найден в middleware_data")
     except Exception as e:
         # Логируем ошибку, но продолжаем работу
-        print(f"❌ Ошибка сохранения пользователя: {e}")
+        logger.error(f"❌ Ошибка сохранения пользователя: {e}")
     
-    # Сохранение в Google Sheets
+    # Постановка в очередь на запись в Google Sheets (запись идёт в фоне)
     if saved_user:
-        try:
-            google_sheets = dialog_manager.middleware_data.get('google_sheets')
-            if google_sheets:
-                success = google_sheets.add_user_to_sheet(saved_user)
-                if success:
-                    print(f"✅ Пользователь {user_data['telegram_id']} успешно добавлен в Google Sheets")
-                else:
-                    print(f"⚠️ Не удалось добавить пользователя в Google Sheets")
+        sheets_writer = dialog_manager.middleware_data.get('sheets_writer')
+        if sheets_writer:
+            if sheets_writer.add_user(saved_user):
+                logger.info(f"✅ Пользователь {user_data['telegram_id']} поставлен в очередь на запись в Google Sheets")
             else:
-                print("⚠️ Google Sheets сервис не найден в middleware_data")
-        except Exception as e:
-            print(f"❌ Ошибка записи в Google Sheets: {e}")
+                logger.warning(f"⚠️ Не удалось поставить пользователя в очередь Google Sheets")
+        else:
+            logger.warning("⚠️ Очередь записи в Google Sheets не найдена в middleware_data")
     
     await dialog_manager.switch_to(RegistrationSG.completed)
 
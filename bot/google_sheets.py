@@ -1,25 +1,61 @@
-import gspread
-from google.oauth2.service_account import Credentials
 import logging
-from typing import Optional, Dict, Any
+import re
+import threading
+import time
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 from bot.models import User
 
 logger = logging.getLogger(__name__)
 
+# Номер первой строки в диапазоне ответа API, например "main!A15:L17" -> 15
+_RANGE_START_ROW = re.compile(r"![A-Z]+(\d+)")
+
 class GoogleSheetsService:
     """Сервис для работы с Google Sheets"""
     
-    def __init__(self, credentials_path: str, spreadsheet_url: str):
+    def __init__(
+        self,
+        credentials_path: str,
+        spreadsheet_url: str,
+        index_resync_interval: float = 600.0,
+        connect: bool = True
+    ):
         self.credentials_path = credentials_path
         self.spreadsheet_url = spreadsheet_url
         self.client = None
         self.sheet = None
+        # Класс ошибки API gspread (модуль импортируется при подключении)
+        self._api_error = None
+        # Индекс telegram_id -> номер строки, чтобы не скачивать колонку B на каждую запись
+        self.index_resync_interval = index_resync_interval
+        self._row_index: Dict[int, int] = {}
+        self._next_row = 1
+        self._index_synced_at: Optional[float] = None
+        self._lock = threading.Lock()
+        if connect:
+            self._setup_client()
+    
+    @property
+    def is_connected(self) -> bool:
+        return self.sheet is not None
+    
+    def connect(self):
+        """Подключение к таблице (синхронно: OAuth, open_by_url, индекс строк).
+
+        При connect=False в конструкторе вызывается из фоновой задачи через
+        asyncio.to_thread, чтобы не задерживать запуск бота.
+        """
         self._setup_client()
     
     def _setup_client(self):
         """Настройка клиента Google Sheets"""
         try:
+            # gspread и google-auth импортируются только при подключении - это заметная часть времени запуска
+            import gspread
+            from google.oauth2.service_account import Credentials
+            self._api_error = gspread.exceptions.APIError
+            
             # Области доступа для Google Sheets API
             scope = [
                 'https://www.googleapis.com/auth/spreadsheets',
@@ -43,6 +79,12 @@ class GoogleSheetsService:
         except Exception as e:
             logger.error(f"❌ Ошибка подключения к Google Sheets: {e}")
             raise
+        
+        try:
+            self._sync_index()
+        except Exception as e:
+            # Индекс будет построен при первой записи
+            logger.error(f"❌ Ошибка построения индекса строк Google Sheets: {e}")
     
     def add_user_to_sheet(self, user: User) -> bool:
         """
@@ -59,40 +101,143 @@ class GoogleSheetsService:
                 logger.error("Google Sheets не инициализирован")
                 return False
             
-            # Подготовка данных для строки
-            row_data = [
-                user.id,  # A: ID
-                user.telegram_id,  # B: Telegram ID
-                f"@{user.username}" if user.username else "Нет username",  # C: Username
-                user.first_name,  # D: Имя
-                user.last_name,  # E: Фамилия
-                self._get_package_name(user.package_type),  # F: Пакет участия
-                "Да" if user.participated_before else "Нет",  # G: Участвовал ранее
-                user.participation_year or "",  # H: Год участия
-                "Да" if user.is_vsm_graduate else "Нет",  # I: Выпускник ВШМ
-                user.graduation_year or "",  # J: Год выпуска
-                self._format_datetime(user.created_at),  # K: Дата регистрации
-                self._format_datetime(user.updated_at),  # L: Дата обновления
-            ]
-            
-            # Проверка, существует ли пользователь в таблице
-            existing_row = self._find_user_row(user.telegram_id)
-            
-            if existing_row:
-                # Обновление существующей строки
-                self.sheet.update(f'A{existing_row}:L{existing_row}', [row_data])
-                logger.info(f"✅ Обновлен пользователь {user.telegram_id} в строке {existing_row}")
-            else:
-                # Добавление новой строки
-                self.sheet.append_row(row_data)
-                logger.info(f"✅ Добавлен новый пользователь {user.telegram_id}")
-            
+            self.write_rows([self.build_row(user)])
             return True
             
         except Exception as e:
             logger.error(f"❌ Ошибка при добавлении в Google Sheets: {e}")
             return False
     
+    def build_row(self, user: User) -> List[Any]:
+        """Подготовка строки таблицы для пользователя"""
+        return [
+            user.id,  # A: ID
+            user.telegram_id,  # B: Telegram ID
+            f"@{user.username}" if user.username else "Нет username",  # C: Username
+            user.first_name,  # D: Имя
+            user.last_name,  # E: Фамилия
+            self._get_package_name(user.package_type),  # F: Пакет участия
+            "Да" if user.participated_before else "Нет",  # G: Участвовал ранее
+            user.participation_year or "",  # H: Год участия
+            "Да" if user.is_vsm_graduate else "Нет",  # I: Выпускник ВШМ
+            user.graduation_year or "",  # J: Год выпуска
+            self._format_datetime(user.created_at),  # K: Дата регистрации
+            self._format_datetime(user.updated_at),  # L: Дата обновления
+        ]
+    
+    def write_rows(self, rows: List[List[Any]]) -> int:
+        """
+        Запись пачки строк: существующие пользователи обновляются одним batch_update,
+        новые добавляются одним append_rows
+        
+        Индекс строк пересобирается раз в index_resync_interval, после ошибки
+        записи и если append_rows вернул неожиданные номера строк (таблицу
+        изменили вне бота) - без дополнительных запросов на каждую пачку.
+        
+        Args:
+            rows: Строки, подготовленные build_row
+            
+        Returns:
+            int: Количество выполненных запросов на запись
+        """
+        if not self.sheet:
+            raise RuntimeError("Google Sheets не инициализирован")
+        
+        with self._lock:
+            if self._index_is_stale():
+                self._sync_index()
+            
+            try:
+                return self._write_rows(rows)
+            except self._api_error as e:
+                if e.code == 429:
+                    raise
+                # Строки могли сдвинуться (удаление/сортировка вручную) - пересобираем индекс и повторяем
+                logger.warning(f"⚠️ Ошибка записи по индексу строк, пересинхронизация: {e}")
+                self._sync_index()
+                return self._write_rows(rows)
+    
+    def _write_rows(self, rows: List[List[Any]]) -> int:
+        updates = []
+        new_rows = []
+        for row in rows:
+            existing_row = self._row_index.get(int(row[1]))
+            if existing_row:
+                updates.append({"range": f"A{existing_row}:L{existing_row}", "values": [row]})
+            else:
+                new_rows.append(row)
+        
+        requests = 0
+        if updates:
+            self.sheet.batch_update(updates)
+            requests += 1
+            logger.info(f"✅ Обновлено пользователей в Google Sheets: {len(updates)}")
+        if new_rows:
+            response = self.sheet.append_rows(new_rows)
+            requests += 1
+            self._index_appended_rows(response, new_rows)
+            logger.info(f"✅ Добавлено новых пользователей в Google Sheets: {len(new_rows)}")
+        return requests
+    
+    def _index_appended_rows(self, response: Dict[str, Any], rows: List[List[Any]]):
+        """Добавление в индекс строк, записанных append_rows"""
+        updated_range = response.get("updates", {}).get("updatedRange", "")
+        match = _RANGE_START_ROW.search(updated_range)
+        if not match:
+            # Не удалось определить номера строк - пересоберём индекс при следующей записи
+            self._index_synced_at = None
+            return
+        first_row = int(match.group(1))
+        if first_row != self._next_row:
+            # Строки добавили или удалили вне бота (сверка, вручную): индекс мог сдвинуться
+            logger.warning(
+                f"⚠️ Google Sheets: новые строки записаны с {first_row}, ожидалась {self._next_row} - "
+                f"индекс будет пересобран при следующей записи"
+            )
+            self._index_synced_at = None
+        for offset, row in enumerate(rows):
+            self._row_index[int(row[1])] = first_row + offset
+        self._next_row = first_row + len(rows)
+    
+    def _index_is_stale(self) -> bool:
+        if self._index_synced_at is None:
+            return True
+        return time.monotonic() - self._index_synced_at > self.index_resync_interval
+    
+    def _sync_index(self):
+        """Построение индекса telegram_id -> номер строки по колонке B (один запрос)"""
+        self._set_index(self.sheet.col_values(2))  # Колонка B
+    
+    def _set_index(self, telegram_ids: List[str]):
+        row_index = {}
+        for i, cell_value in enumerate(telegram_ids, 1):
+            if cell_value.isdigit():  # Пропускаем заголовок и пустые ячейки
+                row_index[int(cell_value)] = i
+        
+        self._row_index = row_index
+        # append_rows дописывает после последней заполненной строки
+        self._next_row = len(telegram_ids) + 1
+        self._index_synced_at = time.monotonic()
+        logger.info(f"✅ Индекс строк Google Sheets синхронизирован: {len(row_index)} пользователей")
+    
+    def get_all_values(self) -> List[List[str]]:
+        """
+        Вся таблица одним запросом (значения в том виде, как они отображаются)
+        
+        Заодно обновляет индекс строк по колонке B, чтобы следующая
+        запись попала в актуальные строки.
+        
+        Returns:
+            list: Строки таблицы, включая заголовок
+        """
+        if not self.sheet:
+            raise RuntimeError("Google Sheets не инициализирован")
+        
+        with self._lock:
+            values = self.sheet.get_all_values()
+            self._set_index([row[1] if len(row) > 1 else "" for row in values])
+            return values
+    
     def _find_user_row(self, telegram_id: int) -> Optional[int]:
         """
         Поиск строки пользователя по Telegram ID
@@ -104,15 +249,10 @@ class GoogleSheetsService:
             int: Номер строки или None если не найден
         """
         try:
-            # Получаем все значения из колонки B (Telegram ID)
-            telegram_ids = self.sheet.col_values(2)  # Колонка B
-            
-            # Ищем соответствующий telegram_id
-            for i, cell_value in enumerate(telegram_ids, 1):
-                if cell_value == str(telegram_id):
-                    return i
-            
-            return None
+            with self._lock:
+                if self._index_is_stale():
+                    self._sync_index()
+                return self._row_index.get(telegram_id)
             
         except Exception as e:
             logger.error(f"❌ Ошибка при поиске пользователя: {e}")
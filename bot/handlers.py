@@ -1,9 +1,22 @@
+import logging
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, FSInputFile
-from aiogram.filters import CommandStart, Command
-from aiogram_dialog import DialogManager, StartMode
+from aiogram.filters import CommandObject, CommandStart, Command
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import ErrorEvent
+from aiogram_dialog import DialogManager, ShowMode, StartMode
+from bot.admin_notifier import AdminNotifier
+from bot.broadcast_queue import BroadcastQueue, parse_audience
+from bot.database import UserRepository
+from bot.models import PARTICIPATION_DECLINED, PAYMENT_CONFIRMED
+from bot.participation_writer import ParticipationWriter
 from bot.states import RegistrationSG
+from bot.texts import CONFIRM_PAYMENT_TEXT, DECLINE_PARTICIPATION_TEXT, PROGRAM_TEXT
 from bot.media_manager import MediaManager
+from bot.stats import StatsService
+from bot.templates import PACKAGE_IDS
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
@@ -34,14 +47,28 @@ async def start_command(message: Message, dialog_manager: DialogManager):
                         photo=photo,
                     )
                 except Exception as e:
-                    print(f"⚠️ Не удалось отправить изображение: {e}")
+                    logger.warning(f"⚠️ Не удалось отправить изображение: {e}")
         except Exception as e:
-            print(f"⚠️ Ошибка при отправке изображения: {e}")
+            logger.warning(f"⚠️ Ошибка при отправке изображения: {e}")
     
     # Запускаем диалог
     await dialog_manager.start(RegistrationSG.welcome, mode=StartMode.RESET_STACK)
 
 
+async def on_unknown_intent(event: ErrorEvent, dialog_manager: DialogManager):
+    """Нажатие на кнопку диалога, контекст которого уже удалён (истёк TTL или сброшен стек)"""
+    logger.info(f"Перезапуск диалога: {event.exception}")
+    callback = event.update.callback_query
+    if callback:
+        await callback.answer("Сессия устарела, начинаем заново")
+        if callback.message:
+            try:
+                await callback.message.delete()
+            except TelegramBadRequest:
+                pass
+    await dialog_manager.start(RegistrationSG.welcome, mode=StartMode.RESET_STACK, show_mode=ShowMode.SEND)
+
+
 @router.message(Command(commands=['menu']))
 async def process_command_menu(message: Message, dialog_manager: DialogManager):
     """Обработчик команды /menu"""
@@ -65,34 +92,44 @@ async def process_command_menu(message: Message, dialog_manager: DialogManager):
                         photo=photo,
                     )
                 except Exception as e:
-                    print(f"⚠️ Не удалось отправить изображение: {e}")
+                    logger.warning(f"⚠️ Не удалось отправить изображение: {e}")
         except Exception as e:
-            print(f"⚠️ Ошибка при отправке изображения: {e}")
+            logger.warning(f"⚠️ Ошибка при отправке изображения: {e}")
     
     # Запускаем диалог
     await dialog_manager.start(state=RegistrationSG.welcome, mode=StartMode.RESET_STACK)
 
 
 @router.message(Command(commands=['stats']))
-async def process_command_stats(message: Message):
+async def process_command_stats(message: Message, stats_service: StatsService):
     """Обработчик команды /stats - только для администратора"""
     if message.from_user.id != ADMIN_ID:
         await message.answer("❌ У вас нет доступа к этой команде.")
         return
     
-    # Здесь можно добавить логику получения статистики из базы данных
-    stats_text = """📊 <b>СТАТИСТИКА МБ'25</b>
+    try:
+        stats, age = await stats_service.get_stats()
+    except Exception as e:
+        logger.error(f"❌ Ошибка при получении статистики: {e}")
+        await message.answer("❌ Не удалось получить статистику, попробуйте позже.")
+        return
+    
+    stats_text = f"""📊 <b>СТАТИСТИКА МБ'25</b>
+
+📝 <b>Всего пользователей:</b> {stats['total']}
 
-🔍 <b>Активность по кнопкам:</b>
-• Запросы программы: - (функция в разработке)
-• Подтверждения оплаты: - (функция в разработке)  
-• Отказы от участия: - (функция в разработке)
+📦 <b>По пакетам:</b>
+• Деловая программа: {stats['business']}
+• Гала-ужин: {stats['gala']}
+• Полный пакет: {stats['full']}
 
-📝 <b>Общая статистика:</b>
-• Всего пользователей: - (функция в разработке)
-• Активных участников: - (функция в разработке)
+🎓 Участвовали в МБ ранее: {stats['participated_before']}
+🏫 Выпускники ВШМ: {stats['vsm_graduates']}
 
-💡 Для получения детальной статистики добавьте интеграцию с базой данных."""
+💰 Подтвердили оплату: {stats['payment_confirmed']}
+❌ Отказались от участия: {stats['participation_declined']}
+
+<i>Данные обновлены {int(age)} с назад</i>"""
     
     await message.answer(stats_text)
 
@@ -102,126 +139,127 @@ async def process_command_stats(message: Message):
 @router.callback_query(F.data == "program_info")
 async def handle_program_info(callback: CallbackQuery):
     """Обработчик кнопки 'Что в программе?'"""
-    program_text = """<b>Третий день МБ: буст личностного развития</b>
-
-Этот трек мы посвящаем вам — выпускникам, что строят будущее в менеджменте. Программа насыщена практикой и нетворкингом, чтобы дать вам максимум полезного для карьеры.
-
-🎯 <b>Деловая программа:</b>
-
-<b>12:00–13:20 | Игра-интерактив по коммуникации в команде</b>
-Разберём реальные сложности общения в корпоративной среде в лёгком игровом формате. Вы откроете для себя конкретные инструменты, которые помогают понимать коллег и достигать общих целей без лишнего стресса. Погрузимся в живые кейсы и найдём решения для типичных рабочих конфликтов.
-
-<b>14:30–15:10 | Воркшоп по самопрезентации</b>
-Научимся рассказывать о себе так, чтобы вас запоминали — и как профессионала, и как интересную личность. Вы освоите 3 подхода и создадите 3 варианта самопрезентации для ключевых ситуаций: собеседование, карьерное мероприятие, неформальное знакомство. Узнаете, как подчеркнуть свои сильные стороны и уверенно держаться перед любой аудиторией.
-
-<b>15:10–15:30 | Нетворкинг в формате быстрых встреч</b>
-Динамичный формат с короткими переходами от стола к столу, обменом мнений по карточкам и свободными диалогами. Это отличный и быстрый способ расширить круг полезных знакомств и найти единомышленников в индустрии.
-
-👩‍🏫 <b>Спикеры и фасилитаторы:</b>
-
-Катя Митусова — Лидер Women in Tech Russia, ex-Google, ex-Wrike, Platinum Tier Facilitator #IamRemarkable
-
-Оля Чадулина — HR в IT, ex-Raiffeisenbank, карьерный ментор и коуч ICF, автор канала «Всё ты можешь»
-
-Лена Соколова — Product Owner в EdTech, ex-Нетология, ex-Яндекс Практикум, автор канала и подкаста «Карьера без багов», сооснователь сообщества «Ещё не продакты»
-
-✨ <b>Почему стоит быть?</b>
-
-Финальный день — это ваша возможность прокачать ключевые навыки, получить свежие инсайты и пообщаться с теми, кто разделяет ваш интерес к будущему в менеджменте.
-
-<b>Ждём именно вас, выпускников Конференции и Высшей Школы Менеджмента!</b>"""
-    
-    await callback.message.answer(program_text)
+    await callback.message.answer(PROGRAM_TEXT)
     await callback.answer()
 
 
 @router.callback_query(F.data == "confirm_payment")
-async def handle_confirm_payment(callback: CallbackQuery, user_repo):
+async def handle_confirm_payment(
+    callback: CallbackQuery,
+    participation_writer: ParticipationWriter,
+    admin_notifier: AdminNotifier
+):
     """Обработчик кнопки 'Подтвердить оплату'"""
-    user_id = callback.from_user.id
-    username = callback.from_user.username or "без username"
-    full_name = callback.from_user.full_name or "Неизвестно"
+    # Сразу отвечаем на callback, чтобы у пользователя пропал индикатор загрузки
+    await callback.answer("Подтверждение получено!")
     
-    # Здесь можно добавить логику сохранения подтверждения в базу данных
-    # Например: await user_repo.set_payment_confirmed(user_id, True)
+    # Статус записывается в БД в фоне вместе с другими ответами
+    participation_writer.set_status(callback.from_user.id, PAYMENT_CONFIRMED)
     
-    # Новый текст для замены оригинального сообщения
-    confirm_text = """✅ <b>Подтверждение оплаты получено!</b>
-
-Спасибо за подтверждение!
-
-В течение 24 часов наша команда проверит платеж и вышлет подтверждение участия.
-
-Если у вас есть вопросы, не стесняйтесь обращаться к нам.
-
-<b>До встречи на Менеджменте Будущего '25!</b> 🎉"""
+    # Отправляем ответ пользователю
+    await callback.message.answer(CONFIRM_PAYMENT_TEXT)
     
-    # Уведомление администратору о подтверждении оплаты
-    admin_notification = f"""💰 <b>ПОДТВЕРЖДЕНИЕ ОПЛАТЫ</b>
+    # Уведомление администратору отправляется в фоне (сводкой, если событий много)
+    admin_notifier.notify(PAYMENT_CONFIRMED, callback.from_user.id, callback.from_user.username, callback.from_user.full_name)
 
-👤 <b>Пользователь:</b> {full_name}
-🆔 <b>ID:</b> <code>{user_id}</code>
-📧 <b>Username:</b> @{username}
-📅 <b>Время:</b> {callback.message.date.strftime('%d.%m.%Y %H:%M')}
 
-✅ Пользователь подтвердил оплату участия в МБ'25"""
+@router.callback_query(F.data == "decline_participation")
+async def handle_decline_participation(
+    callback: CallbackQuery,
+    participation_writer: ParticipationWriter,
+    admin_notifier: AdminNotifier
+):
+    """Обработчик кнопки 'Отказаться от участия'"""
+    # Сразу отвечаем на callback, чтобы у пользователя пропал индикатор загрузки
+    await callback.answer("Мы учли ваше решение")
+    
+    # Статус записывается в БД в фоне вместе с другими ответами
+    participation_writer.set_status(callback.from_user.id, PARTICIPATION_DECLINED)
     
-    # Удаляем оригинальное сообщение и отправляем новое
-    await callback.message.answer(confirm_text)
+    # Отправляем ответ пользователю
+    await callback.message.answer(DECLINE_PARTICIPATION_TEXT)
+    
+    # Уведомление администратору отправляется в фоне (сводкой, если событий много)
+    admin_notifier.notify(PARTICIPATION_DECLINED, callback.from_user.id, callback.from_user.username, callback.from_user.full_name)
+
+# Очередь рассылок (только для администратора)
+@router.message(Command(commands=['broadcast_new']))
+async def process_command_broadcast_new(
+    message: Message,
+    command: CommandObject,
+    user_repo: UserRepository,
+    broadcast_queue: BroadcastQueue
+):
+    """Создание черновика рассылки: /broadcast_new package=gala participated=yes vsm=no from=ГГГГ-ММ-ДД to=ГГГГ-ММ-ДД"""
+    if message.from_user.id != ADMIN_ID:
+        await message.answer("❌ У вас нет доступа к этой команде.")
+        return
     
-    # Отправка уведомления администратору
     try:
-        await callback.bot.send_message(
-            chat_id=ADMIN_ID,
-            text=admin_notification
+        audience = parse_audience(command.args)
+    except ValueError as e:
+        await message.answer(
+            f"❌ Некорректный фильтр: {e}\n\n"
+            "Пример: <code>/broadcast_new package=business,gala participated=yes vsm=no from=2025-09-01 to=2025-10-01</code>"
         )
-    except Exception as e:
-        # Логируем ошибку, но не прерываем основной процесс
-        import logging
-        logging.error(f"Ошибка отправки уведомления админу: {e}")
+        return
     
-    await callback.answer("Подтверждение получено!")
-
-
-@router.callback_query(F.data == "decline_participation")
-async def handle_decline_participation(callback: CallbackQuery, user_repo):
-    """Обработчик кнопки 'Отказаться от участия'"""
-    user_id = callback.from_user.id
-    username = callback.from_user.username or "без username"
-    full_name = callback.from_user.full_name or "Неизвестно"
+    counts = await user_repo.get_audience_stats(audience)
+    total = sum(count for package_type, count in counts.items() if package_type in PACKAGE_IDS)
+    if total == 0:
+        await message.answer(f"❌ По фильтру {audience.describe()} получателей нет.")
+        return
     
-    # Здесь можно добавить логику сохранения отказа в базу данных
-    # Например: await user_repo.set_participation_declined(user_id, True)
+    job = await broadcast_queue.create(audience, total, created_by=message.chat.id)
+    packages = "\n".join(f"• {package_type}: {count}" for package_type, count in counts.items())
+    await message.answer(
+        f"📝 <b>Черновик рассылки</b> <code>{job.job_id}</code>\n\n"
+        f"Аудитория: {audience.describe()}\n"
+        f"Получателей: {total}\n{packages}\n\n"
+        f"Запустить: /broadcast_start {job.job_id}\n"
+        f"Удалить: /broadcast_cancel {job.job_id}"
+    )
+
+
+@router.message(Command(commands=['broadcast_start', 'broadcast_pause', 'broadcast_resume', 'broadcast_cancel']))
+async def process_command_broadcast_control(message: Message, command: CommandObject, broadcast_queue: BroadcastQueue):
+    """Управление рассылкой: /broadcast_start|pause|resume|cancel <id>"""
+    if message.from_user.id != ADMIN_ID:
+        await message.answer("❌ У вас нет доступа к этой команде.")
+        return
     
-    # Новый текст для замены оригинального сообщения
-    decline_text = """❌ <b>Отказ от участия</b>
-
-Вы отказались от участия.
-
-Мы понимаем, что планы могут меняться. Если передумаете, всегда можете написать нам."""
+    job_id = (command.args or "").strip()
+    if not job_id:
+        await message.answer(f"❌ Укажите ID рассылки: /{command.command} &lt;id&gt;")
+        return
     
-    # Уведомление администратору об отказе от участия
-    admin_notification = f"""❌ <b>ОТКАЗ ОТ УЧАСТИЯ</b>
+    actions = {
+        'broadcast_start': (broadcast_queue.enqueue, "▶️ Рассылка поставлена в очередь"),
+        'broadcast_pause': (broadcast_queue.pause, "⏸ Рассылка поставлена на паузу"),
+        'broadcast_resume': (broadcast_queue.resume, "▶️ Рассылка продолжена"),
+        'broadcast_cancel': (broadcast_queue.cancel, "🛑 Рассылка отменена"),
+    }
+    action, success_text = actions[command.command]
+    if await action(job_id):
+        await message.answer(f"{success_text}: <code>{job_id}</code>")
+        return
+    
+    job = await broadcast_queue.get(job_id)
+    if job is None:
+        await message.answer(f"❌ Рассылка <code>{job_id}</code> не найдена")
+    else:
+        await message.answer(f"❌ Нельзя выполнить команду для рассылки в статусе {job.status}")
 
-👤 <b>Пользователь:</b> {full_name}
-🆔 <b>ID:</b> <code>{user_id}</code>
-📧 <b>Username:</b> @{username}
-📅 <b>Время:</b> {callback.message.date.strftime('%d.%m.%Y %H:%M')}
 
-💔 Пользователь отказался от участия в МБ'25"""
-    
-    # Удаляем оригинальное сообщение и отправляем новое
-    await callback.message.answer(decline_text)
-    
-    # Отправка уведомления администратору
-    try:
-        await callback.bot.send_message(
-            chat_id=ADMIN_ID,
-            text=admin_notification
-        )
-    except Exception as e:
-        # Логируем ошибку, но не прерываем основной процесс
-        import logging
-        logging.error(f"Ошибка отправки уведомления админу: {e}")
+@router.message(Command(commands=['broadcasts']))
+async def process_command_broadcasts(message: Message, broadcast_queue: BroadcastQueue):
+    """Последние рассылки и их прогресс"""
+    if message.from_user.id != ADMIN_ID:
+        await message.answer("❌ У вас нет доступа к этой команде.")
+        return
     
-    await callback.answer("Мы учли ваше решение")
\ No newline at end of file
+    jobs = await broadcast_queue.list(limit=10)
+    if not jobs:
+        await message.answer("📭 Рассылок пока не было")
+        return
+    await message.answer("📬 <b>Рассылки</b>\n\n" + "\n\n".join(job.describe() for job in jobs))
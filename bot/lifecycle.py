@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import signal
+import time
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from aiogram.types import TelegramObject
+
+from bot.batching import BatchWorker
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkerReport:
+    """Что стало с очередью фонового обработчика при остановке"""
+    name: str
+    pending: int = 0
+    flushed: int = 0
+    failed: int = 0
+    dropped: int = 0
+
+
+@dataclass
+class ShutdownReport:
+    handlers_finished: int = 0
+    handlers_cancelled: int = 0
+    workers: List[WorkerReport] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def lost(self) -> int:
+        """Потерянные элементы очередей (ошибка записи или отброшены по таймауту)"""
+        return sum(worker.failed + worker.dropped for worker in self.workers)
+
+    def describe(self) -> str:
+        lines = [
+            f"🛑 Остановка за {self.duration:.1f} с: хендлеров завершено {self.handlers_finished}, "
+            f"прервано {self.handlers_cancelled}"
+        ]
+        for worker in self.workers:
+            lines.append(
+                f"  • {worker.name}: в очереди {worker.pending}, записано {worker.flushed}, "
+                f"ошибок {worker.failed}, отброшено {worker.dropped}"
+            )
+        for error in self.errors:
+            lines.append(f"  ❌ {error}")
+        return "\n".join(lines)
+
+
+class LifecycleManager:
+    """Корректная остановка бота.
+
+    По SIGTERM/SIGINT: прекращается приём обновлений, обрабатываемые события
+    дорабатывают до drain_timeout секунд (вместе с остановкой фоновых служб,
+    например обработчика рассылок), затем очереди BatchWorker сбрасываются
+    до flush_timeout секунд, и только после этого закрываются пулы и сессии.
+    """
+
+    def __init__(self, drain_timeout: float = 20.0, flush_timeout: float = 30.0):
+        self.drain_timeout = drain_timeout
+        self.flush_timeout = flush_timeout
+        self._stop_requested = asyncio.Event()
+        self._in_flight: Set[asyncio.Task] = set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._handled = 0
+        self._services: List[Tuple[str, Callable[[], Awaitable[Any]]]] = []
+        self._workers: List[BatchWorker] = []
+        self._resources: List[Tuple[str, Callable[[], Awaitable[Any]]]] = []
+
+    @property
+    def stop_requested(self) -> asyncio.Event:
+        return self._stop_requested
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def add_service(self, name: str, stop: Callable[[], Awaitable[Any]]):
+        """Фоновая служба, останавливаемая параллельно с дообработкой событий"""
+        self._services.append((name, stop))
+
+    def add_worker(self, worker: Optional[BatchWorker]):
+        """Очередь, которая сбрасывается после дообработки событий"""
+        if worker is not None:
+            self._workers.append(worker)
+
+    def add_resource(self, name: str, close: Callable[[], Awaitable[Any]]):
+        """Пул или сессия, закрываемые последними (в порядке регистрации)"""
+        self._resources.append((name, close))
+
+    async def track_updates(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """Outer middleware для dp.update: учёт обрабатываемых обновлений"""
+        task = asyncio.current_task()
+        self._in_flight.add(task)
+        self._idle.clear()
+        try:
+            return await handler(event, data)
+        finally:
+            self._in_flight.discard(task)
+            self._handled += 1
+            if not self._in_flight:
+                self._idle.set()
+
+    def install_signal_handlers(self):
+        """SIGTERM и SIGINT запускают остановку вместо немедленного завершения"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            with suppress(NotImplementedError):  # нет на Windows
+                loop.add_signal_handler(sig, self.request_stop, sig)
+
+    def request_stop(self, sig: Optional[signal.Signals] = None):
+        if not self._stop_requested.is_set():
+            logger.info(f"⏹ Получен сигнал {sig.name if sig else 'stop'}, останавливаем приём обновлений")
+        self._stop_requested.set()
+
+    async def serve(self, server: Awaitable[Any], stop: Optional[Callable[[], Awaitable[Any]]] = None):
+        """Работа server (polling или webhook) до сигнала остановки.
+
+        stop() должен прекратить приём обновлений, после чего server завершается.
+        Если stop() не сработал, задача server отменяется. Если server завершился
+        сам (например, с ошибкой), ошибка пробрасывается.
+        """
+        server_task = asyncio.create_task(server, name="updates-server")
+        stop_task = asyncio.create_task(self._stop_requested.wait())
+        await asyncio.wait({server_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+        stop_task.cancel()
+        if not server_task.done() and stop is not None:
+            try:
+                await stop()
+            except Exception as e:
+                # Например, сигнал пришёл до старта polling: stop_polling() падает с
+                # "Polling is not started" - иначе server продолжил бы работать после закрытия ресурсов
+                logger.warning(f"⚠️ Не удалось штатно остановить приём обновлений ({e}), прерываем")
+                server_task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await server_task
+                return
+        await server_task
+
+    async def shutdown(self) -> ShutdownReport:
+        """Дообработка событий, сброс очередей и закрытие ресурсов"""
+        started = time.perf_counter()
+        report = ShutdownReport()
+        handled_before = self._handled
+        in_flight = self.in_flight
+        if in_flight:
+            logger.info(f"⏳ Ждём завершения {in_flight} обрабатываемых обновлений (до {self.drain_timeout:.0f} с)")
+
+        # 1. Дообработка событий и остановка фоновых служб
+        await asyncio.gather(
+            self._drain(report),
+            *(self._call(name, stop, report) for name, stop in self._services)
+        )
+        report.handlers_finished = self._handled - handled_before - report.handlers_cancelled
+
+        # 2. Сброс очередей (хендлеры могли добавить в них элементы до завершения)
+        report.workers = await asyncio.gather(*(self._flush(worker, report) for worker in self._workers))
+
+        # 3. Закрытие пулов и сессий
+        for name, close in self._resources:
+            await self._call(name, close, report)
+
+        report.duration = time.perf_counter() - started
+        log = logger.warning if report.lost or report.handlers_cancelled or report.errors else logger.info
+        log(report.describe())
+        return report
+
+    async def _drain(self, report: ShutdownReport):
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            tasks = list(self._in_flight)
+            report.handlers_cancelled = len(tasks)
+            logger.error(f"❌ {len(tasks)} обновлений не обработаны за {self.drain_timeout:.0f} с, прерываем")
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _flush(self, worker: BatchWorker, report: ShutdownReport) -> WorkerReport:
+        before = worker.stats()
+        try:
+            await worker.stop(timeout=self.flush_timeout)
+        except Exception as e:
+            report.errors.append(f"{worker.name}: {e}")
+        after = worker.stats()
+        return WorkerReport(
+            name=worker.name,
+            pending=before["pending"],
+            flushed=after["flushed"] - before["flushed"],
+            failed=after["failed"] - before["failed"],
+            dropped=after["dropped"] - before["dropped"],
+        )
+
+    async def _call(self, name: str, func: Callable[[], Awaitable[Any]], report: ShutdownReport):
+        try:
+            await func()
+        except Exception as e:
+            report.errors.append(f"{name}: {e}")
+            logger.error(f"❌ Ошибка при остановке {name}: {e}")
@@ -1,68 +1,154 @@
+import asyncio
+import hashlib
 import json
+import logging
 import os
-from typing import Optional
+import tempfile
+from typing import Dict, Iterable, Optional, Tuple
 from aiogram import Bot
 from aiogram.types import FSInputFile
 from aiogram.enums import ContentType
 from aiogram_dialog.api.entities import MediaAttachment, MediaId
 
+logger = logging.getLogger(__name__)
+
 
 class MediaManager:
+    """Реестр file_id медиафайлов.
+
+    file_id хранятся в памяти по SHA-256 содержимого файла, поэтому изменённая
+    картинка получает новый file_id даже при том же имени. Реестр сохраняется
+    в JSON атомарно (временный файл + os.replace) в отдельном потоке.
+    Одновременные запросы одного и того же файла загружают его в Telegram один раз.
+    """
+
     def __init__(self, bot: Bot, file_ids_path: str = "file_ids.json"):
         self.bot = bot
         # Путь к JSON файлу относительно корня проекта
-        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        self.file_ids_path = os.path.join(project_root, file_ids_path)
+        self.project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.file_ids_path = os.path.join(self.project_root, file_ids_path)
         self.target_user_id = 257026813  # ID пользователя для отправки и получения file_id
         
-    def _load_file_ids(self) -> dict:
-        """Загружает file_id из JSON файла"""
+        self._file_ids: Optional[Dict[str, dict]] = None  # sha256 -> {"file_id", "filename"}
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}  # путь -> (mtime_ns, size, sha256)
+        self._pending: Dict[str, asyncio.Task] = {}  # sha256 -> генерация file_id в процессе
+        self._load_lock = asyncio.Lock()
+        self._save_lock = asyncio.Lock()
+        
+    def _load_file_ids(self) -> Dict[str, dict]:
+        """Загружает реестр file_id из JSON файла"""
         if os.path.exists(self.file_ids_path):
             try:
                 with open(self.file_ids_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    data = json.load(f)
             except (json.JSONDecodeError, FileNotFoundError):
                 return {}
+            # Старый формат {имя файла: file_id} не содержит хэша содержимого - такие записи пропускаем
+            return {key: value for key, value in data.items() if isinstance(value, dict)}
         return {}
     
-    def _save_file_ids(self, file_ids: dict):
-        """Сохраняет file_id в JSON файл"""
-        with open(self.file_ids_path, 'w', encoding='utf-8') as f:
-            json.dump(file_ids, f, ensure_ascii=False, indent=2)
+    def _save_file_ids(self, file_ids: Dict[str, dict]):
+        """Атомарно сохраняет реестр file_id в JSON файл"""
+        directory = os.path.dirname(self.file_ids_path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".file_ids.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(file_ids, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.file_ids_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    
+    async def _get_registry(self) -> Dict[str, dict]:
+        """Реестр в памяти, при первом обращении читается с диска"""
+        if self._file_ids is None:
+            async with self._load_lock:
+                if self._file_ids is None:
+                    self._file_ids = await asyncio.to_thread(self._load_file_ids)
+        return self._file_ids
+    
+    def _full_path(self, filename: str) -> str:
+        return os.path.join(self.project_root, filename)
+    
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+    
+    async def _content_hash(self, filename: str) -> Optional[str]:
+        """SHA-256 содержимого файла; пересчитывается только если файл изменился"""
+        full_path = self._full_path(filename)
+        try:
+            stat = os.stat(full_path)
+        except FileNotFoundError:
+            logger.error(f"❌ Файл {full_path} не найден")
+            return None
+        
+        cached = self._hashes.get(full_path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        
+        content_hash = await asyncio.to_thread(self._hash_file, full_path)
+        self._hashes[full_path] = (stat.st_mtime_ns, stat.st_size, content_hash)
+        return content_hash
     
     async def get_file_id(self, filename: str) -> Optional[str]:
         """Получает file_id для файла. Если его нет, генерирует новый"""
-        file_ids = self._load_file_ids()
+        content_hash = await self._content_hash(filename)
+        if content_hash is None:
+            return None
         
-        # Проверяем, есть ли уже file_id для этого файла
-        if filename in file_ids:
-            print(f"✅ Найден существующий file_id для {filename}")
-            return file_ids[filename]
+        file_ids = await self._get_registry()
+        entry = file_ids.get(content_hash)
+        if entry:
+            return entry["file_id"]
         
-        # Если file_id нет, генерируем его
-        print(f"🔄 Генерация file_id для {filename}...")
+        # Одновременные запросы (например, несколько /start) ждут одну и ту же генерацию
+        task = self._pending.get(content_hash)
+        if task is None:
+            task = asyncio.create_task(self._generate_and_store(filename, content_hash))
+            self._pending[content_hash] = task
+            task.add_done_callback(lambda _: self._pending.pop(content_hash, None))
+        return await asyncio.shield(task)
+    
+    async def _generate_and_store(self, filename: str, content_hash: str) -> Optional[str]:
+        """Генерация file_id и сохранение его в реестре"""
+        logger.info(f"🔄 Генерация file_id для {filename}...")
         file_id = await self._generate_file_id(filename)
-        
         if file_id:
-            # Сохраняем новый file_id
-            file_ids[filename] = file_id
-            self._save_file_ids(file_ids)
-            print(f"✅ Сгенерирован и сохранен file_id для {filename}")
-            return file_id
-        
-        return None
+            file_ids = await self._get_registry()
+            file_ids[content_hash] = {"file_id": file_id, "filename": filename}
+            await self._persist()
+            logger.info(f"✅ Сгенерирован и сохранен file_id для {filename}")
+        return file_id
+    
+    async def _persist(self):
+        """Сохранение реестра на диск в отдельном потоке"""
+        async with self._save_lock:
+            snapshot = dict(self._file_ids)
+            await asyncio.to_thread(self._save_file_ids, snapshot)
+    
+    async def prewarm(self, filenames: Iterable[str]):
+        """Параллельная подготовка file_id для всех файлов при запуске бота"""
+        filenames = list(filenames)
+        results = await asyncio.gather(
+            *(self.get_file_id(filename) for filename in filenames),
+            return_exceptions=True
+        )
+        for filename, result in zip(filenames, results):
+            if isinstance(result, BaseException) or result is None:
+                logger.warning(f"⚠️ Не удалось подготовить file_id для {filename}: {result}")
     
     async def _generate_file_id(self, filename: str) -> Optional[str]:
         """Генерирует file_id путем отправки файла пользователю"""
         try:
             # Формируем полный путь к файлу (относительно корня проекта)
-            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            full_path = os.path.join(project_root, filename)
-            
-            # Проверяем существование файла
-            if not os.path.exists(full_path):
-                print(f"❌ Файл {full_path} не найден")
-                return None
+            full_path = self._full_path(filename)
             
             # Отправляем файл пользователю
             photo = FSInputFile(full_path)
@@ -75,11 +161,11 @@ class MediaManager:
             # Получаем file_id из отправленного сообщения
             if message.photo:
                 file_id = message.photo[-1].file_id  # Берем самое большое разрешение
-                print(f"✅ Получен file_id: {file_id}")
+                logger.info(f"✅ Получен file_id: {file_id}")
                 return file_id
             
         except Exception as e:
-            print(f"❌ Ошибка при генерации file_id для {filename}: {e}")
+            logger.error(f"❌ Ошибка при генерации file_id для {filename}: {e}")
         
         return None
     
@@ -88,4 +174,4 @@ class MediaManager:
         file_id = await self.get_file_id(filename)
         if file_id:
             return MediaAttachment(ContentType.PHOTO, file_id=MediaId(file_id))
-        return None
\ No newline at end of file
+        return None
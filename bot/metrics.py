@@ -0,0 +1,163 @@
+import functools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+from aiogram_dialog.api.internal import CONTEXT_KEY
+from aiohttp import web
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+logger = logging.getLogger(__name__)
+
+# Границы гистограмм, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HANDLER_LATENCY = Histogram(
+    "bot_handler_duration_seconds",
+    "Время обработки события хендлером",
+    ["handler", "event", "dialog_state"],
+    buckets=LATENCY_BUCKETS,
+)
+HANDLER_ERRORS = Counter(
+    "bot_handler_errors_total",
+    "Исключения в хендлерах",
+    ["handler", "event", "dialog_state", "error"],
+)
+UPDATES_IN_FLIGHT = Gauge(
+    "bot_updates_in_flight",
+    "События, обрабатываемые в данный момент",
+    ["event"],
+)
+SPAN_LATENCY = Histogram(
+    "bot_span_duration_seconds",
+    "Время вызовов внешних систем (БД, Redis, Google Sheets)",
+    ["system", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+SPAN_ERRORS = Counter(
+    "bot_span_errors_total",
+    "Ошибки вызовов внешних систем",
+    ["system", "operation"],
+)
+CACHE_REQUESTS = Counter(
+    "bot_cache_requests_total",
+    "Обращения к кэшу по результату (hit, negative_hit, miss, error)",
+    ["cache", "result"],
+)
+REDIS_COMMAND_LATENCY = Histogram(
+    "bot_redis_command_duration_seconds",
+    "Время выполнения команд Redis (PIPELINE/MULTI - пачка целиком)",
+    ["command"],
+    buckets=LATENCY_BUCKETS,
+)
+REDIS_COMMAND_ERRORS = Counter(
+    "bot_redis_command_errors_total",
+    "Ошибки команд Redis",
+    ["command", "error"],
+)
+REDIS_POOL_CONNECTIONS = Gauge(
+    "bot_redis_pool_connections",
+    "Соединения пула Redis (in_use - заняты командами, idle - свободны)",
+    ["state"],
+)
+REDIS_POOL_MAX_CONNECTIONS = Gauge(
+    "bot_redis_pool_max_connections",
+    "Максимум соединений в пуле Redis",
+)
+STARTUP_PHASE = Gauge(
+    "bot_startup_phase_seconds",
+    "Длительность фаз запуска бота (background:* - фоновые подключения)",
+    ["phase"],
+)
+REDIS_POOL_WAIT = Histogram(
+    "bot_redis_pool_wait_seconds",
+    "Ожидание свободного соединения из пула Redis",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+
+
+@asynccontextmanager
+async def span(system: str, operation: str):
+    """Замер времени вызова внешней системы"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        SPAN_ERRORS.labels(system, operation).inc()
+        raise
+    finally:
+        SPAN_LATENCY.labels(system, operation).observe(time.perf_counter() - started)
+
+
+def timed(system: str, operation: Optional[str] = None):
+    """Декоратор для асинхронных методов: оборачивает вызов в span"""
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        name = operation or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with span(system, name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _handler_name(data: Dict[str, Any]) -> str:
+    handler = data.get("handler")
+    callback = getattr(handler, "callback", None)
+    return getattr(callback, "__qualname__", None) or "unknown"
+
+
+def _dialog_state(data: Dict[str, Any]) -> str:
+    context = data.get(CONTEXT_KEY)
+    if context is not None and context.state is not None:
+        return context.state.state
+    return data.get("raw_state") or ""
+
+
+class InstrumentationMiddleware(BaseMiddleware):
+    """Метрики хендлеров: время обработки, ошибки и количество событий в работе"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if isinstance(event, Message):
+            event_type = "message"
+        elif isinstance(event, CallbackQuery):
+            event_type = "callback_query"
+        else:
+            event_type = type(event).__name__
+
+        handler_name = _handler_name(data)
+        dialog_state = _dialog_state(data)
+        in_flight = UPDATES_IN_FLIGHT.labels(event_type)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            HANDLER_ERRORS.labels(handler_name, event_type, dialog_state, type(e).__name__).inc()
+            raise
+        finally:
+            in_flight.dec()
+            HANDLER_LATENCY.labels(handler_name, event_type, dialog_state).observe(time.perf_counter() - started)
+
+
+async def _metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(body=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """HTTP сервер с метриками в формате Prometheus на /metrics"""
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"✅ Метрики доступны на http://{host}:{port}/metrics")
+    return runner
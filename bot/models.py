@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, DateTime, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
 Base = declarative_base()
 
+# Статусы участия (ответы на кнопки рассылки)
+PAYMENT_CONFIRMED = "payment_confirmed"
+PARTICIPATION_DECLINED = "participation_declined"
+
+
 class User(Base):
     __tablename__ = 'users'
     
@@ -17,5 +22,22 @@ class User(Base):
     participation_year = Column(String(10), nullable=True)
     is_vsm_graduate = Column(Boolean, nullable=False)
     graduation_year = Column(String(10), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # ключ пагинации (created_at, id)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Для постраничного просмотра по (created_at, id)
+        Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
+
+
+class ParticipationStatus(Base):
+    """Последний ответ получателя рассылки: подтвердил оплату или отказался"""
+    __tablename__ = 'participation_statuses'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Получатель может быть не зарегистрирован в боте (рассылка по CSV), поэтому без внешнего ключа
+    telegram_id = Column(BigInteger, unique=True, nullable=False)
+    status = Column(String(30), nullable=False, index=True)  # payment_confirmed, participation_declined
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,82 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List
+from sqlalchemy.exc import DataError, IntegrityError
+from bot.batching import BatchWorker
+from bot.database import ParticipationRepository
+from bot.startup import retry_with_backoff
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StatusChange:
+    """Ответ получателя рассылки, ожидающий записи в БД"""
+    telegram_id: int
+    status: str
+    updated_at: datetime = field(default_factory=datetime.utcnow)
+
+
+class ParticipationWriter(BatchWorker):
+    """Отложенная запись статусов участия (write-behind).
+
+    Нажатия кнопок копятся в очереди и записываются одним многострочным
+    INSERT ... ON CONFLICT, когда набралось batch_size ответов или прошло
+    flush_interval секунд. Из нескольких ответов одного пользователя в пачке
+    сохраняется последний. При ошибке БД запись пачки повторяется с растущей
+    паузой (upsert не перезаписывает более новый ответ, поэтому повтор безопасен);
+    если все попытки исчерпаны, ответы выводятся в лог для ручного восстановления.
+    """
+
+    name = "participation-status"
+
+    def __init__(
+        self,
+        repo: ParticipationRepository,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        retry_attempts: int = 5,
+        retry_delay: float = 0.5,
+        retry_max_delay: float = 8.0
+    ):
+        super().__init__(batch_size=batch_size, flush_interval=flush_interval)
+        self.repo = repo
+        self.retry_attempts = retry_attempts
+        self.retry_delay = retry_delay
+        self.retry_max_delay = retry_max_delay
+
+    def set_status(self, telegram_id: int, status: str) -> bool:
+        """Постановка статуса в очередь на запись, не блокирует вызывающий код"""
+        return self.put(StatusChange(telegram_id, status))
+
+    async def flush(self, changes: List[StatusChange]):
+        latest: Dict[int, StatusChange] = {}
+        for change in changes:
+            latest[change.telegram_id] = change
+        
+        rows = [
+            {"telegram_id": change.telegram_id, "status": change.status, "updated_at": change.updated_at}
+            for change in latest.values()
+        ]
+        try:
+            await retry_with_backoff(
+                lambda: self.repo.upsert_statuses(rows),
+                self.name,
+                attempts=self.retry_attempts,
+                delay=self.retry_delay,
+                max_delay=self.retry_max_delay,
+                # Ошибки в самих данных повтором не исправить
+                fatal=(IntegrityError, DataError)
+            )
+        except Exception:
+            self._log_lost(latest.values())
+            raise
+        logger.info(f"✅ Сохранено статусов участия: {len(rows)}")
+
+    async def on_dropped(self, changes: List[StatusChange]):
+        self._log_lost(changes)
+
+    def _log_lost(self, changes):
+        lost = ", ".join(f"{change.telegram_id}={change.status}@{change.updated_at:%Y-%m-%d %H:%M:%S}" for change in changes)
+        logger.error(f"❌ {self.name}: не сохранены статусы участия: {lost}")
@@ -0,0 +1,127 @@
+import asyncio
+import time
+from typing import Optional
+
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import ConnectionError
+
+from bot.metrics import (
+    REDIS_COMMAND_ERRORS,
+    REDIS_COMMAND_LATENCY,
+    REDIS_POOL_CONNECTIONS,
+    REDIS_POOL_MAX_CONNECTIONS,
+    REDIS_POOL_WAIT,
+)
+from config.config import RedisConfig
+
+
+def _command_name(args) -> str:
+    if not args:
+        return "unknown"
+    name = args[0]
+    if isinstance(name, bytes):
+        name = name.decode()
+    return str(name).upper()
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """Пул соединений с замером ожидания свободного соединения.
+
+    При исчерпании max_connections команда ждёт освобождения соединения до
+    pool_timeout секунд, а не падает сразу с ConnectionError. Подключение
+    выполняется вне блокировки пула: в BlockingConnectionPool redis-py 5.0
+    ошибка подключения (Redis недоступен) зависала до таймаута пула и
+    подменялась на "No connection available".
+    """
+
+    async def get_connection(self, command_name, *keys, **options):
+        started = time.perf_counter()
+        try:
+            connection = await asyncio.wait_for(self._acquire(), self.timeout)
+        except asyncio.TimeoutError as e:
+            raise ConnectionError("No connection available.") from e
+        finally:
+            REDIS_POOL_WAIT.observe(time.perf_counter() - started)
+
+        try:
+            await self.ensure_connection(connection)
+        except BaseException:
+            await self.release(connection)
+            raise
+        return connection
+
+    async def _acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(self.can_get_connection)
+            try:
+                connection = self._available_connections.pop()
+            except IndexError:
+                connection = self.make_connection()
+            self._in_use_connections.add(connection)
+            return connection
+
+    def in_use(self) -> int:
+        return len(self._in_use_connections)
+
+    def idle(self) -> int:
+        return len(self._available_connections)
+
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline / MULTI: время выполнения всей пачки команд"""
+
+    async def execute(self, raise_on_error: bool = True):
+        operation = "MULTI" if self.transaction else "PIPELINE"
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        except Exception as e:
+            REDIS_COMMAND_ERRORS.labels(operation, type(e).__name__).inc()
+            raise
+        finally:
+            REDIS_COMMAND_LATENCY.labels(operation).observe(time.perf_counter() - started)
+
+
+class InstrumentedRedis(Redis):
+    """Redis клиент с метриками времени выполнения и ошибок по именам команд"""
+
+    async def execute_command(self, *args, **options):
+        command = _command_name(args)
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        except Exception as e:
+            REDIS_COMMAND_ERRORS.labels(command, type(e).__name__).inc()
+            raise
+        finally:
+            REDIS_COMMAND_LATENCY.labels(command).observe(time.perf_counter() - started)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+def create_redis_pool(config: RedisConfig) -> InstrumentedConnectionPool:
+    """Общий пул соединений Redis для FSM, кэша, очереди рассылок и скриптов"""
+    pool = InstrumentedConnectionPool(
+        host=config.host,
+        port=config.port,
+        db=config.db,
+        password=config.password or None,
+        max_connections=config.max_connections,
+        timeout=config.pool_timeout,
+        socket_timeout=config.socket_timeout,
+        socket_connect_timeout=config.socket_connect_timeout,
+        socket_keepalive=True,
+        health_check_interval=config.health_check_interval,
+        retry_on_timeout=config.retry_on_timeout,
+    )
+    REDIS_POOL_MAX_CONNECTIONS.set(config.max_connections)
+    REDIS_POOL_CONNECTIONS.labels("in_use").set_function(pool.in_use)
+    REDIS_POOL_CONNECTIONS.labels("idle").set_function(pool.idle)
+    return pool
+
+
+def create_redis(config: RedisConfig) -> InstrumentedRedis:
+    """Клиент Redis поверх общего пула. aclose() клиента закрывает и пул"""
+    return InstrumentedRedis.from_pool(create_redis_pool(config))
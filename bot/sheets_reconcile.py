@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from bot.database import UserRepository
+from bot.google_sheets import GoogleSheetsService
+from bot.sheets_writer import SheetsDeadLetters
+
+logger = logging.getLogger(__name__)
+
+# Колонки A:L, которые заполняет GoogleSheetsService.build_row
+SHEET_COLUMNS = 12
+
+
+@dataclass
+class SheetDiff:
+    """Расхождения между таблицей пользователей в БД и Google Sheets"""
+    checked: int = 0
+    in_sync: int = 0
+    # telegram_id пользователей, которых нет в таблице / чья строка устарела
+    missing: List[int] = field(default_factory=list)
+    stale: List[int] = field(default_factory=list)
+    # Строки таблицы без пользователя в БД и повторяющиеся telegram_id (только отчёт)
+    extra: List[int] = field(default_factory=list)
+    duplicates: List[int] = field(default_factory=list)
+    repaired: int = 0
+    write_requests: int = 0
+    dead_letters_cleared: int = 0
+
+    @property
+    def to_repair(self) -> int:
+        return len(self.missing) + len(self.stale)
+
+
+def normalize_row(row: List[Any]) -> List[str]:
+    """Строка в том виде, как её возвращает get_all_values: строки, None -> пустая ячейка"""
+    cells = ["" if value is None else str(value).strip() for value in row[:SHEET_COLUMNS]]
+    return cells + [""] * (SHEET_COLUMNS - len(cells))
+
+
+def index_sheet(values: List[List[str]], diff: SheetDiff) -> Dict[int, List[str]]:
+    """telegram_id -> нормализованная строка таблицы (заголовок и пустые строки пропускаются)"""
+    rows: Dict[int, List[str]] = {}
+    for row in values:
+        telegram_id = row[1].strip() if len(row) > 1 else ""
+        if not telegram_id.isdigit():
+            continue
+        telegram_id = int(telegram_id)
+        if telegram_id in rows:
+            diff.duplicates.append(telegram_id)
+        # Запись по индексу попадает в последнюю из повторяющихся строк - её и сравниваем
+        rows[telegram_id] = normalize_row(row)
+    return rows
+
+
+async def reconcile_sheet(
+    sheets: GoogleSheetsService,
+    user_repo: UserRepository,
+    dead_letters: Optional[SheetsDeadLetters] = None,
+    dry_run: bool = False,
+    batch_size: int = 200,
+    max_requests_per_minute: int = 50
+) -> SheetDiff:
+    """
+    Сверка Google Sheets с БД и восстановление расхождений
+
+    Таблица читается целиком одним запросом get_all_values, пользователи из БД -
+    потоково (iter_users). Недостающие и устаревшие строки записываются пачками
+    по batch_size через write_rows: существующие обновляются одним batch_update,
+    новые добавляются одним append_rows, с паузой по квоте Sheets API.
+    Записи dead letter, прочитанные до сверки, удаляются для пользователей,
+    чьи строки совпали с БД или были восстановлены.
+
+    Args:
+        sheets: Подключённый сервис Google Sheets
+        user_repo: Репозиторий пользователей
+        dead_letters: Хранилище строк, не записанных SheetsWriter
+        dry_run: Только отчёт о расхождениях, без записи
+        batch_size: Строк в одной пачке записи
+        max_requests_per_minute: Лимит запросов на запись в минуту
+    """
+    diff = SheetDiff()
+    # Читаем dead letter до таблицы: записи, появившиеся во время сверки, не трогаем
+    pending_ids: Set[int] = set(await dead_letters.all()) if dead_letters is not None else set()
+
+    values = await asyncio.to_thread(sheets.get_all_values)
+    sheet_rows = index_sheet(values, diff)
+    del values
+
+    repairs: List[List[Any]] = []
+    async for user in user_repo.iter_users():
+        diff.checked += 1
+        row = sheets.build_row(user)
+        sheet_row = sheet_rows.pop(user.telegram_id, None)
+        if sheet_row is None:
+            diff.missing.append(user.telegram_id)
+        elif sheet_row != normalize_row(row):
+            diff.stale.append(user.telegram_id)
+        else:
+            diff.in_sync += 1
+            continue
+        repairs.append(row)
+    diff.extra = list(sheet_rows)
+
+    logger.info(
+        f"🔎 Сверка Google Sheets: пользователей {diff.checked}, совпадает {diff.in_sync}, "
+        f"нет в таблице {len(diff.missing)}, устарело {len(diff.stale)}, лишних строк {len(diff.extra)}"
+    )
+    if dry_run:
+        return diff
+
+    unresolved = set(diff.missing) | set(diff.stale)
+    request_interval = 60.0 / max_requests_per_minute
+    requests = 0
+    try:
+        for start in range(0, len(repairs), batch_size):
+            await asyncio.sleep(request_interval * requests)
+            chunk = repairs[start:start + batch_size]
+            requests = await asyncio.to_thread(sheets.write_rows, chunk)
+            diff.write_requests += requests
+            diff.repaired += len(chunk)
+            unresolved.difference_update(int(row[1]) for row in chunk)
+    except Exception as e:
+        logger.error(f"❌ Восстановлено строк {diff.repaired} из {diff.to_repair}, ошибка записи: {e}")
+        raise
+    finally:
+        if dead_letters is not None:
+            # Совпавшие, восстановленные и удалённые из БД пользователи больше не ждут записи
+            diff.dead_letters_cleared = await dead_letters.remove(pending_ids - unresolved)
+
+    logger.info(f"✅ Восстановлено строк в Google Sheets: {diff.repaired} (запросов: {diff.write_requests})")
+    return diff
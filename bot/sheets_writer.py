@@ -0,0 +1,211 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from redis.asyncio import Redis
+from bot.batching import BatchWorker
+from bot.google_sheets import GoogleSheetsService
+from bot.metrics import span
+from bot.models import User
+
+logger = logging.getLogger(__name__)
+
+DEAD_LETTERS_KEY = "sheets:dead_letters"
+
+
+@dataclass
+class SheetRow:
+    """Строка для записи в Google Sheets и число неудачных попыток"""
+    telegram_id: int
+    row: List[Any]
+    attempts: int = 0
+
+
+class SheetsDeadLetters:
+    """Строки, которые не удалось записать в Google Sheets после всех повторов.
+
+    Хранятся в Redis-хэше telegram_id -> JSON (последняя версия строки, ошибка,
+    число попыток). Записи удаляются командой сверки manage_data.py sheets-reconcile
+    после восстановления строк в таблице.
+    """
+
+    def __init__(self, redis: Redis, key: str = DEAD_LETTERS_KEY):
+        self.redis = redis
+        self.key = key
+
+    async def add(self, items: Iterable[SheetRow], error: str):
+        failed_at = datetime.utcnow().isoformat(timespec="seconds")
+        mapping = {
+            item.telegram_id: json.dumps(
+                {"row": item.row, "attempts": item.attempts, "error": error, "failed_at": failed_at},
+                ensure_ascii=False,
+                default=str
+            )
+            for item in items
+        }
+        if mapping:
+            await self.redis.hset(self.key, mapping=mapping)
+
+    async def all(self) -> Dict[int, Dict[str, Any]]:
+        entries = await self.redis.hgetall(self.key)
+        return {int(telegram_id): json.loads(value) for telegram_id, value in entries.items()}
+
+    async def remove(self, telegram_ids: Iterable[int]) -> int:
+        telegram_ids = list(telegram_ids)
+        if not telegram_ids:
+            return 0
+        return await self.redis.hdel(self.key, *telegram_ids)
+
+    async def count(self) -> int:
+        return await self.redis.hlen(self.key)
+
+
+class SheetsWriter(BatchWorker):
+    """Асинхронная запись в Google Sheets.
+
+    Строки копятся в очереди и записываются пачками в отдельном потоке,
+    поэтому синхронный gspread не блокирует event loop. Между пачками
+    выдерживается пауза, чтобы не превышать квоту Sheets API на запись.
+    Строки из неудачной пачки возвращаются в очередь с растущей паузой,
+    после retry_attempts попыток - в dead letter.
+    """
+
+    name = "google-sheets"
+
+    def __init__(
+        self,
+        sheets: GoogleSheetsService,
+        batch_size: int = 50,
+        flush_interval: float = 2.0,
+        max_requests_per_minute: int = 50,
+        dead_letters: Optional[SheetsDeadLetters] = None,
+        retry_attempts: int = 5,
+        retry_delay: float = 5.0,
+        retry_max_delay: float = 300.0
+    ):
+        super().__init__(batch_size=batch_size, flush_interval=flush_interval)
+        self.sheets = sheets
+        self.dead_letters = dead_letters
+        self.retry_attempts = retry_attempts
+        self.retry_delay = retry_delay
+        self.retry_max_delay = retry_max_delay
+        self._request_interval = 60.0 / max_requests_per_minute
+        self._next_request_at = 0.0
+        # Строки, ожидающие повтора: telegram_id -> (строка, таймер возврата в очередь)
+        self._retries: Dict[int, tuple] = {}
+        # Последняя ещё не записанная строка пользователя: более старые не пишем и не повторяем
+        self._newest: Dict[int, SheetRow] = {}
+        self.dead_lettered = 0
+
+    def add_user(self, user: User) -> bool:
+        """Постановка пользователя в очередь на запись, не блокирует вызывающий код"""
+        item = SheetRow(user.telegram_id, self.sheets.build_row(user))
+        # Новая строка заменяет ожидающую повтора
+        self._cancel_retry(item.telegram_id)
+        self._newest[item.telegram_id] = item
+        if self.put(item):
+            return True
+        asyncio.get_running_loop().create_task(self._dead_letter([item], "очередь переполнена"))
+        return False
+
+    def _is_newest(self, item: SheetRow) -> bool:
+        return self._newest.get(item.telegram_id, item) is item
+
+    def _cancel_retry(self, telegram_id: int):
+        retry = self._retries.pop(telegram_id, None)
+        if retry:
+            retry[1].cancel()
+
+    async def flush(self, items: List[SheetRow]):
+        # Для каждого пользователя записываем только последнюю версию строки
+        latest: Dict[int, SheetRow] = {item.telegram_id: item for item in items if self._is_newest(item)}
+        if not latest:
+            return
+
+        loop = asyncio.get_running_loop()
+        delay = self._next_request_at - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        requests = 2  # при ошибке считаем, что пачка израсходовала квоту полностью
+        try:
+            async with span("sheets", "write_rows"):
+                requests = await asyncio.to_thread(self.sheets.write_rows, [item.row for item in latest.values()])
+        except Exception as e:
+            await self._retry_later(latest.values(), e)
+            raise
+        finally:
+            self._next_request_at = loop.time() + self._request_interval * max(requests, 1)
+
+        for telegram_id, item in latest.items():
+            # Повтор более старой строки перезаписал бы только что записанную
+            self._cancel_retry(telegram_id)
+            if self._newest.get(telegram_id) is item:
+                del self._newest[telegram_id]
+
+    async def _retry_later(self, items: Iterable[SheetRow], error: Exception):
+        """Возврат строк в очередь через retry_delay * 2^(попытка-1) секунд или в dead letter"""
+        loop = asyncio.get_running_loop()
+        exhausted = []
+        scheduled = 0
+        delay = 0.0
+        for item in items:
+            if not self._is_newest(item):
+                # Пока шла запись, в очередь встала более новая строка - она и будет записана
+                continue
+            item.attempts += 1
+            if item.attempts >= self.retry_attempts:
+                exhausted.append(item)
+                continue
+            self._cancel_retry(item.telegram_id)
+            delay = min(self.retry_delay * 2 ** (item.attempts - 1), self.retry_max_delay)
+            self._retries[item.telegram_id] = (item, loop.call_later(delay, self._requeue, item))
+            scheduled += 1
+        if scheduled:
+            logger.warning(f"⚠️ {self.name}: повтор записи {scheduled} строк через {delay:.0f} с")
+        await self._dead_letter(exhausted, f"{type(error).__name__}: {error}")
+
+    def _requeue(self, item: SheetRow):
+        self._retries.pop(item.telegram_id, None)
+        if not self.put(item):
+            asyncio.get_running_loop().create_task(self._dead_letter([item], "очередь переполнена"))
+
+    async def _dead_letter(self, items: List[SheetRow], error: str):
+        items = [item for item in items if self._is_newest(item)]
+        if not items:
+            return
+        for item in items:
+            self._newest.pop(item.telegram_id, None)
+        self.dead_lettered += len(items)
+        logger.error(
+            f"❌ {self.name}: не удалось записать строк: {len(items)} ({error}), "
+            f"восстановление - python3 manage_data.py sheets-reconcile"
+        )
+        if self.dead_letters is None:
+            return
+        try:
+            await self.dead_letters.add(items, error)
+        except Exception as e:
+            logger.error(f"❌ {self.name}: не удалось сохранить строки в dead letter: {e}")
+
+    async def on_dropped(self, items: List[SheetRow]):
+        # Таблица так и не подключилась или не успели записать очередь при остановке
+        await self._dead_letter(items, "не записано до остановки бота")
+
+    async def stop(self, timeout: Optional[float] = None):
+        await super().stop(timeout)
+        # Отложенные повторы уже не выполнятся - сохраняем строки для сверки
+        retries = []
+        for item, handle in self._retries.values():
+            handle.cancel()
+            retries.append(item)
+        self._retries.clear()
+        await self._dead_letter(retries, "бот остановлен до повторной записи")
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["retrying"] = len(self._retries)
+        stats["dead_lettered"] = self.dead_lettered
+        return stats
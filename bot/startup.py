@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+from bot.metrics import STARTUP_PHASE
+
+logger = logging.getLogger(__name__)
+
+
+class StartupError(Exception):
+    """Обязательный шаг запуска завершился ошибкой"""
+
+    def __init__(self, phase: str, error: BaseException):
+        super().__init__(f"{phase}: {error}")
+        self.phase = phase
+        self.error = error
+
+
+async def retry_with_backoff(
+    func: Callable[[], Awaitable[Any]],
+    name: str,
+    attempts: Optional[int] = None,
+    delay: float = 5.0,
+    max_delay: float = 300.0,
+    fatal: Tuple[Type[BaseException], ...] = ()
+) -> Tuple[Any, int]:
+    """Повтор func с экспоненциальной паузой (attempts=None - без ограничения).
+
+    Ошибки из fatal (например, нет файла учётных данных) не повторяются.
+    Возвращает результат и количество попыток.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return await func(), attempt
+        except fatal:
+            raise
+        except Exception as e:
+            if attempts is not None and attempt >= attempts:
+                raise
+            pause = min(delay * 2 ** (attempt - 1), max_delay)
+            logger.warning(f"⚠️ {name}: попытка {attempt} не удалась ({e}), повтор через {pause:g} с")
+            await asyncio.sleep(pause)
+
+
+class StartupSequencer:
+    """Запуск бота по фазам с замером времени каждой.
+
+    Обязательные шаги (Redis, БД, Telegram) выполняются параллельно в
+    run_concurrently. Необязательные интеграции подключаются в фоне с
+    повторами (background) и не задерживают начало обработки обновлений.
+    """
+
+    def __init__(self, started: Optional[float] = None):
+        # Момент старта процесса по time.perf_counter() (до импортов main.py)
+        self.started = started if started is not None else time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.background_timings: Dict[str, float] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def record(self, name: str, seconds: float):
+        self.timings[name] = seconds
+        STARTUP_PHASE.labels(name).set(seconds)
+
+    @asynccontextmanager
+    async def phase(self, name: str):
+        """Замер времени фазы запуска"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    async def run_concurrently(self, steps: Dict[str, Awaitable[Any]]) -> Dict[str, Any]:
+        """Параллельный запуск обязательных шагов. Ошибка любого шага - StartupError"""
+        async def timed_step(name: str, step: Awaitable[Any]):
+            async with self.phase(name):
+                return await step
+
+        results = await asyncio.gather(
+            *(timed_step(name, step) for name, step in steps.items()),
+            return_exceptions=True
+        )
+        for name, result in zip(steps, results):
+            if isinstance(result, BaseException):
+                raise StartupError(name, result) from result
+        return dict(zip(steps, results))
+
+    def background(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        on_ready: Optional[Callable[[Any], None]] = None,
+        attempts: Optional[int] = None,
+        delay: float = 5.0,
+        max_delay: float = 300.0,
+        fatal: Tuple[Type[BaseException], ...] = ()
+    ) -> asyncio.Task:
+        """Подключение необязательной интеграции в фоне с повторами"""
+        async def run():
+            started = time.perf_counter()
+            try:
+                result, attempt = await retry_with_backoff(func, name, attempts, delay, max_delay, fatal)
+            except Exception as e:
+                logger.error(f"❌ {name}: не удалось подключиться, интеграция отключена: {e}")
+                return
+            elapsed = time.perf_counter() - started
+            self.background_timings[name] = elapsed
+            STARTUP_PHASE.labels(f"background:{name}").set(elapsed)
+            logger.info(f"✅ {name}: подключено в фоне за {elapsed:.2f} с (попыток: {attempt})")
+            if on_ready is not None:
+                on_ready(result)
+
+        task = asyncio.create_task(run(), name=f"startup-{name}")
+        self._tasks.append(task)
+        return task
+
+    def report(self) -> str:
+        """Разбивка времени запуска по фазам"""
+        total = time.perf_counter() - self.started
+        STARTUP_PHASE.labels("total").set(total)
+        phases = ", ".join(f"{name} {seconds * 1000:.0f} мс" for name, seconds in self.timings.items())
+        report = f"⏱ Запуск за {total * 1000:.0f} мс: {phases}"
+        pending = [task.get_name().removeprefix("startup-") for task in self._tasks if not task.done()]
+        if pending:
+            report += f"; в фоне: {', '.join(pending)}"
+        return report
+
+    async def stop(self):
+        """Отмена незавершённых фоновых подключений"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
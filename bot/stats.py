@@ -0,0 +1,27 @@
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+from bot.database import UserRepository
+
+
+class StatsService:
+    """Статистика регистраций для /stats с кэшированием в памяти.
+
+    Пока кэш свежий (моложе ttl секунд), БД не запрашивается; одновременные
+    запросы после истечения ttl ждут одного обновления.
+    """
+
+    def __init__(self, user_repo: UserRepository, ttl: float = 30.0):
+        self.user_repo = user_repo
+        self.ttl = ttl
+        self._stats: Optional[Dict[str, int]] = None
+        self._updated_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get_stats(self) -> Tuple[Dict[str, int], float]:
+        """Статистика и её возраст в секундах"""
+        async with self._lock:
+            if self._stats is None or time.monotonic() - self._updated_at >= self.ttl:
+                self._stats = await self.user_repo.get_stats()
+                self._updated_at = time.monotonic()
+            return self._stats, time.monotonic() - self._updated_at
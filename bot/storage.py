@@ -0,0 +1,165 @@
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+import msgpack
+from aiogram.fsm.storage.base import DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+from redis.asyncio import Redis
+from bot.metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedRedisStorage(RedisStorage):
+    """RedisStorage с замером времени каждого обращения к Redis"""
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        async with span("redis", "set_state"):
+            await super().set_state(key, state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        async with span("redis", "get_state"):
+            return await super().get_state(key)
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        async with span("redis", "set_data"):
+            await super().set_data(key, data)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        async with span("redis", "get_data"):
+            return await super().get_data(key)
+
+
+def pack_data(data: Dict[str, Any]) -> bytes:
+    """Компактная сериализация данных FSM / aiogram-dialog в msgpack"""
+    return msgpack.packb(data, use_bin_type=True)
+
+
+def unpack_data(raw: bytes) -> Dict[str, Any]:
+    """Чтение данных в msgpack и в прежнем формате JSON.
+
+    JSON-объект всегда начинается с '{', а словарь msgpack - с байта 0x80-0x8f,
+    0xde или 0xdf, поэтому записи, сохранённые до перехода на msgpack,
+    читаются без миграции и перезаписываются в новом формате при изменении.
+    """
+    if raw[:1] == b"{":
+        return json.loads(raw)
+    return msgpack.unpackb(raw, raw=False)
+
+
+class MsgpackRedisStorage(RedisStorage):
+    """RedisStorage, хранящий данные в msgpack вместо JSON"""
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        redis_key = self.key_builder.build(key, "data")
+        if not data:
+            await self.redis.delete(redis_key)
+            return
+        await self.redis.set(redis_key, pack_data(data), ex=self.data_ttl)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        redis_key = self.key_builder.build(key, "data")
+        raw = await self.redis.get(redis_key)
+        if raw is None:
+            return {}
+        if isinstance(raw, str):
+            raw = raw.encode("utf-8")
+        return unpack_data(raw)
+
+
+class InstrumentedMsgpackRedisStorage(InstrumentedRedisStorage, MsgpackRedisStorage):
+    """MsgpackRedisStorage с замером времени обращений к Redis"""
+
+
+def create_storage(
+    redis: Redis,
+    serializer: str = "msgpack",
+    state_ttl: Optional[int] = None,
+    data_ttl: Optional[int] = None
+) -> RedisStorage:
+    """
+    Хранилище FSM для бота
+
+    Args:
+        redis: Клиент Redis
+        serializer: msgpack (компактно) или json (формат aiogram по умолчанию)
+        state_ttl: TTL ключей состояния, секунды (None - без TTL)
+        data_ttl: TTL ключей данных, в том числе стеков и контекстов aiogram-dialog, секунды
+    """
+    storage_class = InstrumentedMsgpackRedisStorage if serializer == "msgpack" else InstrumentedRedisStorage
+    return storage_class(
+        redis=redis,
+        key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+        state_ttl=state_ttl,
+        data_ttl=data_ttl,
+    )
+
+
+@dataclass
+class KeyTypeUsage:
+    """Память Redis, занятая ключами одного типа"""
+    keys: int = 0
+    bytes: int = 0
+    without_ttl: int = 0
+    max_bytes: int = 0
+
+    @property
+    def avg_bytes(self) -> float:
+        return self.bytes / self.keys if self.keys else 0.0
+
+
+@dataclass
+class MemoryReport:
+    """Отчёт о памяти Redis по типам ключей"""
+    types: Dict[str, KeyTypeUsage] = field(default_factory=dict)
+
+    def add(self, key_type: str, size: int, ttl: int):
+        usage = self.types.setdefault(key_type, KeyTypeUsage())
+        usage.keys += 1
+        usage.bytes += size
+        usage.max_bytes = max(usage.max_bytes, size)
+        if ttl == -1:
+            usage.without_ttl += 1
+
+
+def classify_key(key: str) -> str:
+    """Тип ключа Redis по его имени"""
+    if key.startswith("fsm:"):
+        if ":aiogd:context:" in key:
+            return "dialog_context"
+        if ":aiogd:stack:" in key:
+            return "dialog_stack"
+        return f"fsm_{key.rsplit(':', 1)[-1]}"
+    if key.startswith("user:"):
+        return "user_cache"
+    if key.startswith("broadcast:"):
+        return "broadcast"
+    return "other"
+
+
+async def memory_report(redis: Redis, match: str = "*", batch_size: int = 500) -> MemoryReport:
+    """Обход ключей через SCAN и подсчёт MEMORY USAGE и TTL пачками (pipeline)"""
+    report = MemoryReport()
+    batch = []
+
+    async def measure(keys):
+        async with redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.memory_usage(key, samples=0)
+                pipe.ttl(key)
+            results = await pipe.execute()
+        for i, key in enumerate(keys):
+            size, ttl = results[2 * i], results[2 * i + 1]
+            if size is None:
+                continue  # ключ истёк во время обхода
+            report.add(classify_key(key.decode() if isinstance(key, bytes) else key), size, ttl)
+
+    async for key in redis.scan_iter(match=match, count=batch_size):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            await measure(batch)
+            batch = []
+    if batch:
+        await measure(batch)
+    return report
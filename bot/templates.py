@@ -0,0 +1,109 @@
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Union
+from aiogram.methods import SendMessage
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from bot.texts import (
+    BROADCAST_PACKAGE_ADDITIONAL_INFO,
+    BROADCAST_PACKAGE_NAMES,
+    BROADCAST_TEMPLATE,
+)
+
+
+# Номер пакета в рассылке по package_type из БД
+PACKAGE_IDS = {
+    "business": 1,
+    "gala": 2,
+    "full": 3,
+}
+
+
+def serialize_markup(markup: InlineKeyboardMarkup) -> str:
+    """JSON клавиатуры в том виде, в котором aiogram отправляет его в Bot API"""
+    return json.dumps(markup.model_dump(exclude_none=True), ensure_ascii=False, separators=(",", ":"))
+
+
+@dataclass(frozen=True)
+class PreparedMessage:
+    """Готовое сообщение: текст, клавиатура и заготовка запроса sendMessage"""
+    text: str
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+    reply_markup_json: Optional[str] = None
+    method: SendMessage = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # model_construct пропускает проверку pydantic, но копирует значения по умолчанию,
+        # поэтому заготовка создаётся один раз. Клавиатура передаётся строкой JSON -
+        # сессия aiogram отправляет строки как есть.
+        object.__setattr__(self, "method", SendMessage.model_construct(
+            chat_id=0,
+            text=self.text,
+            reply_markup=self.reply_markup_json,
+        ))
+
+    def build(self, chat_id: Union[int, str]) -> SendMessage:
+        """Запрос sendMessage для получателя (поверхностная копия заготовки)"""
+        return self.method.model_copy(update={"chat_id": chat_id})
+
+
+def prepare_message(text: str, reply_markup: Optional[InlineKeyboardMarkup] = None) -> PreparedMessage:
+    """Подготовка сообщения: клавиатура сериализуется один раз"""
+    return PreparedMessage(
+        text=text,
+        reply_markup=reply_markup,
+        reply_markup_json=serialize_markup(reply_markup) if reply_markup else None,
+    )
+
+
+def broadcast_keyboard() -> InlineKeyboardMarkup:
+    """Клавиатура рассылки о начале продаж"""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="Что в программе?", callback_data="program_info")],
+        [InlineKeyboardButton(text="✅ Подтвердить оплату", callback_data="confirm_payment")],
+        [InlineKeyboardButton(text="❌ Отказаться от участия", callback_data="decline_participation")]
+    ])
+
+
+def render_broadcast_text(package_id: int) -> str:
+    """Текст рассылки для пакета"""
+    return BROADCAST_TEMPLATE.format(
+        package_name=BROADCAST_PACKAGE_NAMES.get(package_id, "Неизвестный пакет"),
+        package_additional_info=BROADCAST_PACKAGE_ADDITIONAL_INFO.get(package_id, ""),
+    )
+
+
+class TemplateRegistry:
+    """Реестр заранее подготовленных сообщений.
+
+    Каждый вариант текста и клавиатура собираются один раз, дальше при
+    каждой отправке берётся готовый PreparedMessage.
+    """
+
+    def __init__(self):
+        self._messages: Dict[str, PreparedMessage] = {}
+
+    def register(self, name: str, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None) -> PreparedMessage:
+        message = prepare_message(text, reply_markup)
+        self._messages[name] = message
+        return message
+
+    def get(self, name: str) -> PreparedMessage:
+        return self._messages[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._messages
+
+    def broadcast(self, package_id: int) -> PreparedMessage:
+        """Сообщение рассылки для пакета (неизвестный пакет готовится при первом обращении)"""
+        name = f"broadcast:{package_id}"
+        if name not in self._messages:
+            self.register(name, render_broadcast_text(package_id), broadcast_keyboard())
+        return self._messages[name]
+
+
+def build_broadcast_registry() -> TemplateRegistry:
+    """Реестр с сообщениями рассылки для всех пакетов"""
+    registry = TemplateRegistry()
+    for package_id in BROADCAST_PACKAGE_NAMES:
+        registry.broadcast(package_id)
+    return registry
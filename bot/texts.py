@@ -0,0 +1,101 @@
+"""
+Тексты сообщений бота и рассылки
+"""
+
+# Регистрация
+WELCOME_TEXT = """Дорогие выпускники! 
+
+В этом году на МБ25 мы хотим предоставить вам возможность снова стать частью конференции! Для этого мы придумали специальную программу для выпускников. Вы сможете посетить деловую программу третьего дня, послушать выступления и дискуссии уважаемых спикеров, а также принять участие в нетворкинге - развить свои софтскиллы и приобрести ценные деловые контакты."""
+
+PACKAGES_TEXT = """Мы предлагаем посетить конференцию в третий день - 25 октября. Есть три варианта участия:
+
+1. Деловая программа - участие в мероприятиях третьего дня конференции (25 октября). 
+Вас ждут интересные лекции от топовых спикеров, панельные дискуссии на актуальные темы, а также интерактивное мероприятие для выпускников с перерывом на нетворкинг. Вы сможете отработать навык целеполагания и деловой коммуникации и получить массу новых знакомств. Сплошная польза с утра и до самого вечера.
+Стоимость: 2 990р
+
+2. Гала-ужин - закрытие конференции в ресторане с панорамным видом на Петербург.
+Ваш шанс за бокалом игристого пообщаться с нынешними участниками конференции - насладиться приятной компанией и вкусным фуршетом. 
+Стоимость: 3 490р
+
+3. Деловая программа и гала-ужин - целый день интересных мероприятий и прекрасный праздник вечером.
+Сначала послушаете все самые крутые мероприятия третьего дня, а вечером отдохнете на ужине в ресторане с видом на ночной город.
+Стоимость: 5 990р
+
+Чтобы попасть в лист ожидания, выбери пакет участия, который тебе наиболее интересен."""
+
+COMPLETION_TEXT = """Спасибо, что зарегистрировался! В этот бот придет уведомление, когда откроются продажи. Не пропусти!"""
+
+# Программа третьего дня (кнопка "Что в программе?" и шаг диалога)
+PROGRAM_TEXT = """<b>Третий день МБ: буст личностного развития</b>
+
+Этот трек мы посвящаем вам — выпускникам, что строят будущее в менеджменте. Программа насыщена практикой и нетворкингом, чтобы дать вам максимум полезного для карьеры.
+
+🎯 <b>Деловая программа:</b>
+
+<b>12:00–13:20 | Игра-интерактив по коммуникации в команде</b>
+Разберём реальные сложности общения в корпоративной среде в лёгком игровом формате. Вы откроете для себя конкретные инструменты, которые помогают понимать коллег и достигать общих целей без лишнего стресса. Погрузимся в живые кейсы и найдём решения для типичных рабочих конфликтов.
+
+<b>14:30–15:10 | Воркшоп по самопрезентации</b>
+Научимся рассказывать о себе так, чтобы вас запоминали — и как профессионала, и как интересную личность. Вы освоите 3 подхода и создадите 3 варианта самопрезентации для ключевых ситуаций: собеседование, карьерное мероприятие, неформальное знакомство. Узнаете, как подчеркнуть свои сильные стороны и уверенно держаться перед любой аудиторией.
+
+<b>15:10–15:30 | Нетворкинг в формате быстрых встреч</b>
+Динамичный формат с короткими переходами от стола к столу, обменом мнений по карточкам и свободными диалогами. Это отличный и быстрый способ расширить круг полезных знакомств и найти единомышленников в индустрии.
+
+👩‍🏫 <b>Спикеры и фасилитаторы:</b>
+
+Катя Митусова — Лидер Women in Tech Russia, ex-Google, ex-Wrike, Platinum Tier Facilitator #IamRemarkable
+
+Оля Чадулина — HR в IT, ex-Raiffeisenbank, карьерный ментор и коуч ICF, автор канала «Всё ты можешь»
+
+Лена Соколова — Product Owner в EdTech, ex-Нетология, ex-Яндекс Практикум, автор канала и подкаста «Карьера без багов», сооснователь сообщества «Ещё не продакты»
+
+✨ <b>Почему стоит быть?</b>
+
+Финальный день — это ваша возможность прокачать ключевые навыки, получить свежие инсайты и пообщаться с теми, кто разделяет ваш интерес к будущему в менеджменте.
+
+<b>Ждём именно вас, выпускников Конференции и Высшей Школы Менеджмента!</b>"""
+
+# Ответы на кнопки рассылки
+CONFIRM_PAYMENT_TEXT = """✅ <b>Подтверждение оплаты получено!</b>
+
+Спасибо за подтверждение!
+
+В течение 24 часов наша команда проверит платеж и вышлет подтверждение участия.
+
+Если у вас есть вопросы, не стесняйтесь обращаться к нам.
+
+<b>До встречи на Менеджменте Будущего '25!</b> 🎉"""
+
+DECLINE_PARTICIPATION_TEXT = """❌ <b>Отказ от участия</b>
+
+Вы отказались от участия.
+
+Мы понимаем, что планы могут меняться. Если передумаете, всегда можете написать нам."""
+
+# Рассылка о начале продаж
+BROADCAST_TEMPLATE = """Всем привет! 
+
+✨Мы готовы объявить о запуске продаж билетов на деловую программу и гала ужин. 
+
+Выбранный пакет участия: {package_name}{package_additional_info}
+
+
+Для оплаты переведи сумму согласно выбранному тарифу по номеру телефона +7 (960) 259 88-47 на Альфа-банк (Дмитрий К.). 
+
+В течении 24 часов после оплаты в боте придет подтверждение. Убедительная просьба: не отключай уведомления!
+
+Ждем тебя на Менеджменте Будущего '25!"""
+
+# Названия пакетов в рассылке (номер пакета -> название)
+BROADCAST_PACKAGE_NAMES = {
+    1: "Деловая программа – 2 990 руб.",
+    2: "Гала-ужин – 3 490 руб.",
+    3: "Деловая программа & гала-ужин – 5 990 руб.",
+}
+
+# Дополнительная информация для пакетов
+BROADCAST_PACKAGE_ADDITIONAL_INFO = {
+    1: "\n❗ Мы также предлагаем приобрести полный пакет участия за 6 490 рублей. Так ты сможешь посетить не только деловую программу 3-го дня, но и гала-ужин, который завершает конференцию.",
+    2: "\n❗ Мы также предлагаем приобрести полный пакет участия за 6 490 рублей. Так ты сможешь посетить не только гала-ужин, но и деловую программу 3-го дня.",
+    3: "",  # Для полного пакета дополнительной информации нет
+}
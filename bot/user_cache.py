@@ -0,0 +1,124 @@
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Tuple
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from bot.metrics import CACHE_REQUESTS, span
+from bot.models import User
+
+logger = logging.getLogger(__name__)
+
+# Колонки пользователя в порядке сериализации
+USER_COLUMNS = tuple(column.name for column in User.__table__.columns)
+DATETIME_COLUMNS = frozenset(
+    column.name for column in User.__table__.columns if column.type.python_type is datetime
+)
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# Значение записи "пользователь не найден"
+MISSING = b"-"
+
+
+def dump_user(user: User) -> bytes:
+    """Компактная сериализация: JSON массив значений колонок, даты - в микросекундах от эпохи"""
+    values: List[Any] = []
+    for name in USER_COLUMNS:
+        value = getattr(user, name)
+        if value is not None and name in DATETIME_COLUMNS:
+            value = (value - EPOCH) // MICROSECOND
+        values.append(value)
+    return json.dumps(values, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def load_user(raw: bytes) -> User:
+    """Восстановление пользователя из dump_user (объект не привязан к сессии)"""
+    fields = dict(zip(USER_COLUMNS, json.loads(raw)))
+    for name in DATETIME_COLUMNS:
+        if fields.get(name) is not None:
+            fields[name] = EPOCH + fields[name] * MICROSECOND
+    return User(**fields)
+
+
+class UserCache:
+    """Read-through кэш пользователей в Redis.
+
+    Ключ user:v1:<telegram_id> хранит пользователя или отметку MISSING,
+    если его нет в БД. Ошибки Redis не прерывают работу - запрос уходит в БД.
+    """
+
+    def __init__(self, redis: Redis, ttl: int = 3600, negative_ttl: int = 60, prefix: str = "user:v1:"):
+        self.redis = redis
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.prefix = prefix
+
+    def _key(self, telegram_id: int) -> str:
+        return f"{self.prefix}{telegram_id}"
+
+    async def get(self, telegram_id: int) -> Tuple[bool, Optional[User]]:
+        """(найдено в кэше, пользователь или None для отметки "не найден")"""
+        try:
+            async with span("redis", "user_cache_get"):
+                raw = await self.redis.get(self._key(telegram_id))
+        except RedisError as e:
+            CACHE_REQUESTS.labels("user", "error").inc()
+            logger.warning(f"⚠️ Кэш пользователей недоступен: {e}")
+            return False, None
+        
+        if raw is None:
+            CACHE_REQUESTS.labels("user", "miss").inc()
+            return False, None
+        if raw == MISSING:
+            CACHE_REQUESTS.labels("user", "negative_hit").inc()
+            return True, None
+        CACHE_REQUESTS.labels("user", "hit").inc()
+        return True, load_user(raw)
+
+    async def fill(self, telegram_id: int, user: Optional[User]):
+        """Заполнение после промаха.
+
+        SET NX не перезаписывает значение, которое успел положить
+        create_user/update_user, пока шёл запрос к БД.
+        """
+        await self._set(telegram_id, user, nx=True)
+
+    async def put(self, telegram_id: int, user: Optional[User]):
+        """Запись актуального значения после изменения в БД"""
+        await self._set(telegram_id, user, nx=False)
+
+    async def _set(self, telegram_id: int, user: Optional[User], nx: bool):
+        if user is None:
+            value, ttl = MISSING, self.negative_ttl
+        else:
+            value, ttl = dump_user(user), self.ttl
+        try:
+            async with span("redis", "user_cache_set"):
+                await self.redis.set(self._key(telegram_id), value, ex=ttl, nx=nx)
+        except RedisError as e:
+            logger.warning(f"⚠️ Не удалось обновить кэш пользователя {telegram_id}: {e}")
+            if not nx:
+                # Старое значение не должно пережить изменение в БД
+                await self.invalidate(telegram_id)
+
+    async def invalidate(self, telegram_id: int):
+        """Удаление записи о пользователе"""
+        try:
+            await self.redis.delete(self._key(telegram_id))
+        except RedisError as e:
+            logger.warning(f"⚠️ Не удалось удалить кэш пользователя {telegram_id}: {e}")
+
+    async def clear(self) -> int:
+        """Удаление всех записей кэша пользователей, возвращает количество ключей"""
+        deleted = 0
+        keys = []
+        async for key in self.redis.scan_iter(match=f"{self.prefix}*", count=500):
+            keys.append(key)
+            if len(keys) >= 500:
+                deleted += await self.redis.delete(*keys)
+                keys = []
+        if keys:
+            deleted += await self.redis.delete(*keys)
+        return deleted
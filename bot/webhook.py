@@ -0,0 +1,47 @@
+import asyncio
+import logging
+from typing import Optional
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from config.config import WebhookConfig
+
+logger = logging.getLogger(__name__)
+
+
+def create_webhook_app(dp: Dispatcher, bot: Bot, config: WebhookConfig) -> web.Application:
+    """aiohttp приложение, принимающее обновления от Telegram.
+
+    Запросы без правильного заголовка X-Telegram-Bot-Api-Secret-Token отклоняются.
+    Обновление обрабатывается в фоне, Telegram сразу получает ответ 200.
+    """
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=config.secret
+    ).register(app, path=config.path)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, config: WebhookConfig, stop_event: Optional[asyncio.Event] = None):
+    """Запуск webhook-сервера; работает до stop_event (или до отмены задачи)"""
+    app = create_webhook_app(dp, bot, config)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, config.host, config.port)
+    await site.start()
+
+    await bot.set_webhook(
+        url=config.url,
+        secret_token=config.secret,
+        allowed_updates=dp.resolve_used_update_types()
+    )
+    logger.info(f"✅ Webhook установлен: {config.url}, сервер слушает {config.host}:{config.port}")
+
+    try:
+        await (stop_event or asyncio.Event()).wait()
+    finally:
+        # Webhook не удаляем: за балансировщиком могут работать другие экземпляры бота
+        await runner.cleanup()
@@ -1,24 +1,39 @@
 """
-Скрипт для рассылки сообщений участникам из CSV файла
+Скрипт для рассылки сообщений участникам из CSV файла или из базы данных
 
 Особенности:
 - Поддержка dry-run режима
 - Обязательное подтверждение перед отправкой
-- Чтение данных из CSV файла
+- Потоковое чтение данных из CSV файла (в том числе .csv.gz) с удалением дублей
+- Выборка аудитории прямо из таблицы users (--from-db) с фильтрами, строки
+  читаются серверным курсором по мере отправки
 - Формирование персонализированных сообщений
 - Отправка через основной бот с обработчиками
+- Параллельная отправка с учётом лимитов Telegram (TokenBucket, повтор при 429)
+- Журнал доставки и продолжение прерванной рассылки (--resume <run-id>)
+- Постановка рассылки в очередь бота (--enqueue): отправляет обработчик
+  внутри процесса бота, не конкурируя с ним за лимиты Telegram
 """
 
+import argparse
 import asyncio
 import csv
+import gzip
 import logging
-from typing import List, Dict, Any
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, AsyncIterator, Iterator, Optional, Set, TextIO
 from aiogram import Bot
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 
+from bot.broadcast_journal import BroadcastJournal
+from bot.broadcast_queue import BroadcastQueue
+from bot.database import AudienceFilter, Database, UserRepository
+from bot.delivery import DeliveryEngine, DeliveryStats, SENT
+from bot.redis_client import create_redis
+from bot.templates import PACKAGE_IDS, build_broadcast_registry
+from bot.texts import BROADCAST_PACKAGE_NAMES
 from config.config import load_config
 
 
@@ -29,70 +44,46 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Сигнатура gzip-файла
+GZIP_MAGIC = b'\x1f\x8b'
 
-class BroadcastScript:
-    def __init__(self, csv_file_path: str = "broadcast.csv"):
-        self.csv_file_path = csv_file_path
-        self.config = load_config()
-        self.bot = None
-        
-        # Маппинг пакетов
-        self.package_mapping = {
-            1: "Деловая программа – 2 990 руб.",
-            2: "Гала-ужин – 3 490 руб.",
-            3: "Деловая программа & гала-ужин – 5 990 руб."
-        }
-        
-        # Дополнительная информация для пакетов
-        self.package_additional_info = {
-            1: "\n❗ Мы также предлагаем приобрести полный пакет участия за 6 490 рублей. Так ты сможешь посетить не только деловую программу 3-го дня, но и гала-ужин, который завершает конференцию.",
-            2: "\n❗ Мы также предлагаем приобрести полный пакет участия за 6 490 рублей. Так ты сможешь посетить не только гала-ужин, но и деловую программу 3-го дня.",
-            3: ""  # Для полного пакета дополнительной информации нет
-        }
-        
-        # Базовый текст сообщения
-        self.message_template = """Всем привет! 
-
-✨Мы готовы объявить о запуске продаж билетов на деловую программу и гала ужин. 
-
-Выбранный пакет участия: {package_name}{package_additional_info}
-
-
-Для оплаты переведи сумму согласно выбранному тарифу по номеру телефона +7 (960) 259 88-47 на Альфа-банк (Дмитрий К.). 
-
-В течении 24 часов после оплаты в боте придет подтверждение. Убедительная просьба: не отключай уведомления!
-
-Ждем тебя на Менеджменте Будущего '25!"""
-
-        # Текст для кнопки "Что в программе?"
-        self.program_info_text = """<b>Третий день МБ: буст личностного развития</b>
-
-Этот трек мы посвящаем вам — выпускникам, что строят будущее в менеджменте. Программа насыщена практикой и нетворкингом, чтобы дать вам максимум полезного для карьеры.
-
-🎯 <b>Деловая программа:</b>
-
-<b>12:00–13:20 | Игра-интерактив по коммуникации в команде</b>
-Разберём реальные сложности общения в корпоративной среде в лёгком игровом формате. Вы откроете для себя конкретные инструменты, которые помогают понимать коллег и достигать общих целей без лишнего стресса. Погрузимся в живые кейсы и найдём решения для типичных рабочих конфликтов.
-
-<b>14:30–15:10 | Воркшоп по самопрезентации</b>
-Научимся рассказывать о себе так, чтобы вас запоминали — и как профессионала, и как интересную личность. Вы освоите 3 подхода и создадите 3 варианта самопрезентации для ключевых ситуаций: собеседование, карьерное мероприятие, неформальное знакомство. Узнаете, как подчеркнуть свои сильные стороны и уверенно держаться перед любой аудиторией.
-
-<b>15:10–15:30 | Нетворкинг в формате быстрых встреч</b>
-Динамичный формат с короткими переходами от стола к столу, обменом мнений по карточкам и свободными диалогами. Это отличный и быстрый способ расширить круг полезных знакомств и найти единомышленников в индустрии.
 
-👩‍🏫 <b>Спикеры и фасилитаторы:</b>
 
-Катя Митусова — Лидер Women in Tech Russia, ex-Google, ex-Wrike, Platinum Tier Facilitator #IamRemarkable
+@dataclass
+class RecipientStats:
+    """Статистика получателей, собранная за один проход по CSV или запросом к БД"""
+    total: int = 0
+    package_counts: Dict[int, int] = field(default_factory=dict)
+    duplicates: int = 0
+    invalid: int = 0
+    skipped: int = 0
 
-Оля Чадулина — HR в IT, ex-Raiffeisenbank, карьерный ментор и коуч ICF, автор канала «Всё ты можешь»
+    def add(self, package_id: int, count: int = 1):
+        self.total += count
+        self.package_counts[package_id] = self.package_counts.get(package_id, 0) + count
 
-Лена Соколова — Product Owner в EdTech, ex-Нетология, ex-Яндекс Практикум, автор канала и подкаста «Карьера без багов», сооснователь сообщества «Ещё не продакты»
 
-✨ <b>Почему стоит быть?</b>
-
-Финальный день — это ваша возможность прокачать ключевые навыки, получить свежие инсайты и пообщаться с теми, кто разделяет ваш интерес к будущему в менеджменте.
-
-<b>Ждём именно вас, выпускников Конференции и Высшей Школы Менеджмента!</b>"""
+class BroadcastScript:
+    def __init__(
+        self,
+        csv_file_path: str = "broadcast.csv",
+        concurrency: int = 10,
+        rate: float = 25.0,
+        resume_run_id: Optional[str] = None,
+        audience: Optional[AudienceFilter] = None
+    ):
+        self.csv_file_path = csv_file_path
+        # Если задан фильтр аудитории, получатели выбираются из БД, а не из CSV
+        self.audience = audience
+        self.database = None
+        self.concurrency = concurrency
+        self.rate = rate
+        self.resume_run_id = resume_run_id
+        self.config = load_config()
+        self.bot = None
+        
+        # Сообщения рассылки для каждого пакета собираются один раз
+        self.templates = build_broadcast_registry()
 
     async def initialize_bot(self):
         """Инициализация бота"""
@@ -106,121 +97,239 @@ class BroadcastScript:
         if self.bot:
             await self.bot.session.close()
 
-    def read_csv_data(self) -> List[Dict[str, Any]]:
-        """Чтение данных из CSV файла"""
-        users = []
-        try:
-            with open(self.csv_file_path, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
+    @property
+    def source_description(self) -> str:
+        """Источник получателей для журнала рассылки"""
+        if self.audience is not None:
+            return f"db {self.audience.describe()}"
+        return f"csv={self.csv_file_path}"
+
+    def _open_csv(self) -> TextIO:
+        """Открытие CSV файла, в том числе сжатого gzip"""
+        with open(self.csv_file_path, 'rb') as file:
+            is_gzip = file.read(2) == GZIP_MAGIC
+        if is_gzip:
+            return gzip.open(self.csv_file_path, 'rt', encoding='utf-8', newline='')
+        return open(self.csv_file_path, 'r', encoding='utf-8', newline='')
+
+    def iter_recipients(
+        self,
+        skip: Optional[Set[int]] = None,
+        stats: Optional[RecipientStats] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Потоковое чтение получателей из CSV: разбор, проверка и удаление дублей за один проход"""
+        seen = set()
+        with self._open_csv() as file:
+            reader = csv.DictReader(file)
+            for line_number, row in enumerate(reader, 2):
+                try:
                     # Исправляем опечатку в названии колонки (pacakage -> package)
-                    if 'pacakage' in row:
-                        row['package'] = row['pacakage']
-                    
-                    users.append({
+                    package = row['pacakage'] if 'pacakage' in row else row['package']
+                    user = {
                         'id': int(row['id']),
                         'telegram_id': int(row['telegram_id']),
-                        'username': row.get('username', ''),
-                        'package': int(row['package'])
-                    })
+                        'username': row.get('username') or '',
+                        'package': int(package)
+                    }
+                except (KeyError, TypeError, ValueError):
+                    if stats is not None:
+                        stats.invalid += 1
+                        logger.warning(f"Строка {line_number} CSV файла содержит некорректные данные и пропущена")
+                    continue
+                
+                if user['telegram_id'] in seen:
+                    if stats is not None:
+                        stats.duplicates += 1
+                    continue
+                seen.add(user['telegram_id'])
+                
+                if skip and user['telegram_id'] in skip:
+                    if stats is not None:
+                        stats.skipped += 1
+                    continue
+                
+                if stats is not None:
+                    stats.add(user['package'])
+                yield user
+
+    def scan_recipients(self, skip: Optional[Set[int]] = None) -> Optional[RecipientStats]:
+        """Один проход по CSV для превью: количество получателей и статистика по пакетам"""
+        stats = RecipientStats()
+        try:
+            for _ in self.iter_recipients(skip, stats):
+                pass
         except FileNotFoundError:
             logger.error(f"CSV файл {self.csv_file_path} не найден")
-            return []
+            return None
         except Exception as e:
             logger.error(f"Ошибка при чтении CSV файла: {e}")
-            return []
-        
-        return users
-
-    def create_keyboard(self) -> InlineKeyboardMarkup:
-        """Создание клавиатуры с кнопками"""
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="Что в программе?", callback_data="program_info")],
-            [InlineKeyboardButton(text="✅ Подтвердить оплату", callback_data="confirm_payment")],
-            [InlineKeyboardButton(text="❌ Отказаться от участия", callback_data="decline_participation")]
-        ])
-        return keyboard
+            return None
+        return stats
+
+    async def iter_db_recipients(
+        self,
+        skip: Optional[Set[int]] = None,
+        stats: Optional[RecipientStats] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Потоковая выборка получателей из таблицы users серверным курсором"""
+        user_repo = UserRepository(self.database)
+        async for row in user_repo.iter_audience(self.audience):
+            package_id = PACKAGE_IDS.get(row.package_type)
+            if package_id is None:
+                if stats is not None:
+                    stats.invalid += 1
+                    logger.warning(f"Пользователь {row.telegram_id} с неизвестным пакетом {row.package_type} пропущен")
+                continue
+            
+            if skip and row.telegram_id in skip:
+                if stats is not None:
+                    stats.skipped += 1
+                continue
+            
+            if stats is not None:
+                stats.add(package_id)
+            yield {
+                'id': row.id,
+                'telegram_id': row.telegram_id,
+                'username': row.username or '',
+                'package': package_id
+            }
+
+    async def scan_db_recipients(self, skip: Optional[Set[int]] = None) -> Optional[RecipientStats]:
+        """Превью аудитории из БД: агрегирующий запрос, а при продолжении рассылки - проход курсором"""
+        stats = RecipientStats()
+        try:
+            if skip:
+                # Уже обработанных получателей нужно исключить из подсчёта
+                async for _ in self.iter_db_recipients(skip, stats):
+                    pass
+                return stats
+            
+            user_repo = UserRepository(self.database)
+            for package_type, count in (await user_repo.get_audience_stats(self.audience)).items():
+                package_id = PACKAGE_IDS.get(package_type)
+                if package_id is None:
+                    stats.invalid += count
+                    logger.warning(f"{count} пользователей с неизвестным пакетом {package_type} будут пропущены")
+                    continue
+                stats.add(package_id, count)
+        except Exception as e:
+            logger.error(f"Ошибка при выборке получателей из БД: {e}")
+            return None
+        return stats
+
+    async def scan(self, skip: Optional[Set[int]] = None) -> Optional[RecipientStats]:
+        """Превью получателей из выбранного источника"""
+        if self.audience is not None:
+            return await self.scan_db_recipients(skip)
+        return self.scan_recipients(skip)
+
+    async def recipients(self, skip: Optional[Set[int]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Получатели из выбранного источника"""
+        if self.audience is not None:
+            async for user in self.iter_db_recipients(skip):
+                yield user
+        else:
+            for user in self.iter_recipients(skip):
+                yield user
 
     def format_message(self, package_id: int) -> str:
-        """Формирование персонализированного сообщения"""
-        package_name = self.package_mapping.get(package_id, "Неизвестный пакет")
-        package_additional_info = self.package_additional_info.get(package_id, "")
-        
-        return self.message_template.format(
-            package_name=package_name,
-            package_additional_info=package_additional_info
-        )
+        """Персонализированное сообщение для пакета"""
+        return self.templates.broadcast(package_id).text
 
-    def display_preview(self, users: List[Dict[str, Any]]):
+    def display_preview(self, stats: RecipientStats):
         """Показ превью рассылки"""
         print("\n" + "="*80)
         print("ПРЕВЬЮ РАССЫЛКИ")
         print("="*80)
-        print(f"Общее количество получателей: {len(users)}")
+        if self.audience is not None:
+            print(f"Аудитория из БД: {self.audience.describe()}")
+        print(f"Общее количество получателей: {stats.total}")
+        if stats.duplicates or stats.invalid:
+            print(f"Пропущено дублей: {stats.duplicates}, некорректных записей: {stats.invalid}")
         print()
         
-        # Группировка по пакетам
-        package_stats = {}
-        for user in users:
-            package = user['package']
-            if package not in package_stats:
-                package_stats[package] = 0
-            package_stats[package] += 1
-        
         print("Статистика по пакетам:")
-        for package_id, count in package_stats.items():
-            package_name = self.package_mapping.get(package_id, f"Неизвестный пакет {package_id}")
+        for package_id, count in stats.package_counts.items():
+            package_name = BROADCAST_PACKAGE_NAMES.get(package_id, f"Неизвестный пакет {package_id}")
             print(f"  {package_name}: {count} получателей")
         
         print("\nПример сообщения для каждого типа пакета:")
         print("-" * 80)
         
-        for package_id in sorted(package_stats.keys()):
-            print(f"\nПАКЕТ {package_id}: {self.package_mapping.get(package_id, 'Неизвестный')}")
+        for package_id in sorted(stats.package_counts.keys()):
+            print(f"\nПАКЕТ {package_id}: {BROADCAST_PACKAGE_NAMES.get(package_id, 'Неизвестный')}")
             print("-" * 50)
             print(self.format_message(package_id))
             print()
 
-    async def send_message_to_user(self, user: Dict[str, Any], dry_run: bool = True) -> bool:
-        """Отправка сообщения одному пользователю"""
-        try:
-            message_text = self.format_message(user['package'])
-            keyboard = self.create_keyboard()
-            
-            if dry_run:
-                print(f"[DRY RUN] Отправка сообщения пользователю {user['telegram_id']} (@{user['username']})")
-                return True
-            else:
-                await self.bot.send_message(
-                    chat_id=user['telegram_id'],
-                    text=message_text,
-                    reply_markup=keyboard
-                )
-                logger.info(f"Сообщение отправлено пользователю {user['telegram_id']} (@{user['username']})")
-                return True
-                
-        except TelegramForbiddenError:
-            logger.warning(f"Пользователь {user['telegram_id']} заблокировал бота")
-            return False
-        except TelegramBadRequest as e:
-            logger.error(f"Ошибка отправки пользователю {user['telegram_id']}: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"Неожиданная ошибка при отправке пользователю {user['telegram_id']}: {e}")
-            return False
+    async def send_message_to_user(self, user: Dict[str, Any]):
+        """Отправка сообщения одному пользователю (ошибки обрабатывает DeliveryEngine)"""
+        await self.bot(self.templates.broadcast(user['package']).build(user['telegram_id']))
 
     async def run_broadcast(self, dry_run: bool = True):
         """Запуск рассылки"""
         print("🤖 Запуск скрипта рассылки...")
         
-        # Чтение данных из CSV
-        users = self.read_csv_data()
-        if not users:
-            print("❌ Нет данных для рассылки. Проверьте CSV файл.")
+        if self.audience is not None:
+            self.database = Database(self.config)
+        try:
+            await self._run_broadcast(dry_run)
+        finally:
+            if self.database:
+                await self.database.close()
+
+    async def enqueue_broadcast(self):
+        """Постановка рассылки по аудитории из БД в очередь бота"""
+        self.database = Database(self.config)
+        redis_client = create_redis(self.config.redis)
+        
+        try:
+            stats = await self.scan_db_recipients()
+            if stats is None or stats.total == 0:
+                print("❌ Нет данных для рассылки. Проверьте фильтры аудитории.")
+                return
+            self.display_preview(stats)
+            
+            confirmation = input("\nПоставить рассылку в очередь бота? (введите 'ДА' для подтверждения): ")
+            if confirmation.upper() != 'ДА':
+                print("❌ Рассылка отменена.")
+                return
+            
+            queue = BroadcastQueue(redis_client)
+            job = await queue.create(self.audience, stats.total)
+            await queue.enqueue(job.job_id)
+            print(f"✅ Рассылка {job.job_id} поставлена в очередь, получателей: {stats.total}")
+            print("Прогресс и управление - командами бота /broadcasts, /broadcast_pause, /broadcast_resume, /broadcast_cancel")
+        finally:
+            await redis_client.aclose()
+            await self.database.close()
+
+    async def _run_broadcast(self, dry_run: bool):
+        # Журнал доставки: новый запуск или продолжение прерванного
+        journal = BroadcastJournal(self.resume_run_id or BroadcastJournal.new_run_id())
+        completed = set()
+        if self.resume_run_id:
+            if not journal.exists():
+                print(f"❌ Журнал рассылки {self.resume_run_id} не найден ({journal.path})")
+                return
+            completed = journal.load_completed()
+        
+        # Превью без загрузки получателей в память целиком
+        stats = await self.scan(skip=completed)
+        if stats is None or (stats.total == 0 and not stats.skipped):
+            source = "фильтры аудитории" if self.audience is not None else "CSV файл"
+            print(f"❌ Нет данных для рассылки. Проверьте {source}.")
             return
         
+        if self.resume_run_id:
+            print(f"🔁 Продолжение рассылки {journal.run_id}: уже обработано {stats.skipped}, осталось {stats.total}")
+            if stats.total == 0:
+                print("✅ Всем получателям рассылка уже доставлена.")
+                return
+        
         # Показ превью
-        self.display_preview(users)
+        self.display_preview(stats)
         
         if dry_run:
             print("\n🔍 РЕЖИМ DRY RUN - сообщения НЕ будут отправлены")
@@ -236,26 +345,26 @@ class BroadcastScript:
             
             # Инициализация бота
             await self.initialize_bot()
-        
-        # Отправка сообщений
-        successful_sends = 0
-        failed_sends = 0
+            print(f"\n🆔 ID рассылки: {journal.run_id}")
+            print(f"Если отправка прервётся, продолжите её той же командой с параметром --resume {journal.run_id}")
         
         print(f"\n📤 Начинаем {'симуляцию' if dry_run else 'отправку'} сообщений...")
         
-        for i, user in enumerate(users, 1):
-            print(f"[{i}/{len(users)}] Обработка пользователя {user['telegram_id']}...")
-            
-            success = await self.send_message_to_user(user, dry_run)
-            
-            if success:
-                successful_sends += 1
-            else:
-                failed_sends += 1
-            
-            # Пауза между отправками (только для реальной отправки)
-            if not dry_run:
-                await asyncio.sleep(0.1)  # 100ms пауза между сообщениями
+        if dry_run:
+            i = 0
+            async for user in self.recipients(skip=completed):
+                i += 1
+                print(f"[{i}/{stats.total}] [DRY RUN] Отправка сообщения пользователю {user['telegram_id']} (@{user['username']})")
+            successful_sends, failed_sends = i, 0
+        else:
+            journal.open(note=f"{self.source_description} recipients={stats.total}")
+            try:
+                delivery = await self.deliver(self.recipients(skip=completed), stats.total, journal)
+            finally:
+                await journal.close()
+                await self.close_bot()
+            successful_sends, failed_sends = delivery.sent, delivery.blocked + delivery.failed
+            print(f"⏱ Время рассылки: {delivery.elapsed:.1f} с, скорость: {delivery.rate:.1f} сообщ./с, повторов: {delivery.retries}")
         
         # Итоговая статистика
         print("\n" + "="*80)
@@ -263,27 +372,93 @@ class BroadcastScript:
         print("="*80)
         print(f"✅ Успешно {'отправлено' if not dry_run else 'обработано'}: {successful_sends}")
         print(f"❌ Ошибок: {failed_sends}")
-        print(f"📊 Общий процент успеха: {(successful_sends / len(users) * 100):.1f}%")
+        print(f"📊 Общий процент успеха: {(successful_sends / stats.total * 100):.1f}%")
+
+    async def deliver(self, users: AsyncIterator[Dict[str, Any]], total: int, journal: BroadcastJournal) -> DeliveryStats:
+        """Параллельная отправка с учётом лимитов Telegram и записью результатов в журнал"""
+        engine = DeliveryEngine(rate=self.rate, concurrency=self.concurrency)
+        processed = 0
         
-        if not dry_run:
-            await self.close_bot()
+        async def on_result(user: Dict[str, Any], status: str):
+            nonlocal processed
+            processed += 1
+            await journal.record(user['telegram_id'], status)
+            if status == SENT:
+                logger.info(f"[{processed}/{total}] Сообщение отправлено пользователю {user['telegram_id']} (@{user['username']})")
+        
+        return await engine.run(users, self.send_message_to_user, on_result=on_result)
+
+
+def _parse_date(value: str) -> date:
+    """Дата в формате ГГГГ-ММ-ДД для argparse"""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"некорректная дата '{value}', ожидается ГГГГ-ММ-ДД")
+
+
+def _parse_yes_no(value: str) -> bool:
+    """Значение yes/no для argparse"""
+    if value.lower() in ('yes', 'y', 'да'):
+        return True
+    if value.lower() in ('no', 'n', 'нет'):
+        return False
+    raise argparse.ArgumentTypeError(f"ожидается yes или no, получено '{value}'")
+
+
+def build_audience(args) -> Optional[AudienceFilter]:
+    """Фильтр аудитории из аргументов командной строки (None - рассылка по CSV)"""
+    if not args.from_db:
+        return None
+    return AudienceFilter(
+        package_types=args.package,
+        participated_before=args.participated,
+        is_vsm_graduate=args.vsm_graduate,
+        registered_from=datetime.combine(args.registered_from, datetime.min.time()) if args.registered_from else None,
+        # Дата окончания включительно: до начала следующего дня
+        registered_before=datetime.combine(args.registered_to + timedelta(days=1), datetime.min.time()) if args.registered_to else None,
+    )
 
 
 async def main():
     """Главная функция скрипта"""
-    import sys
-    import argparse
-    
     # Парсинг аргументов командной строки
     parser = argparse.ArgumentParser(description='Скрипт рассылки сообщений')
     parser.add_argument('--send', action='store_true', help='Реальная отправка (по умолчанию dry-run)')
-    parser.add_argument('--csv', type=str, default='broadcast.csv', help='Путь к CSV файлу (по умолчанию broadcast.csv)')
+    parser.add_argument('--csv', type=str, default='broadcast.csv', help='Путь к CSV файлу, можно сжатый gzip (по умолчанию broadcast.csv)')
+    parser.add_argument('--concurrency', type=int, default=10, help='Количество параллельных отправителей (по умолчанию 10)')
+    parser.add_argument('--rate', type=float, default=25.0, help='Максимум сообщений в секунду (по умолчанию 25, лимит Telegram ~30)')
+    parser.add_argument('--resume', type=str, default=None, metavar='RUN_ID', help='Продолжить прерванную рассылку, пропустив уже обработанных получателей')
+    parser.add_argument('--enqueue', action='store_true', help='Поставить рассылку в очередь бота вместо отправки из скрипта (только с --from-db)')
+    
+    # Выборка аудитории из БД вместо CSV
+    audience = parser.add_argument_group('аудитория из БД')
+    audience.add_argument('--from-db', action='store_true', help='Выбрать получателей из таблицы users вместо CSV')
+    audience.add_argument('--package', nargs='+', choices=sorted(PACKAGE_IDS), default=None, help='Только выбранные пакеты участия')
+    audience.add_argument('--participated', type=_parse_yes_no, default=None, metavar='yes|no', help='Участвовал ли в МБ ранее')
+    audience.add_argument('--vsm-graduate', type=_parse_yes_no, default=None, metavar='yes|no', help='Выпускник ли ВШМ')
+    audience.add_argument('--registered-from', type=_parse_date, default=None, metavar='ГГГГ-ММ-ДД', help='Зарегистрирован не раньше этой даты')
+    audience.add_argument('--registered-to', type=_parse_date, default=None, metavar='ГГГГ-ММ-ДД', help='Зарегистрирован не позже этой даты (включительно)')
     
     args = parser.parse_args()
+    db_filters = (args.package, args.participated, args.vsm_graduate, args.registered_from, args.registered_to)
+    if not args.from_db and any(value is not None for value in db_filters):
+        parser.error('фильтры аудитории работают только вместе с --from-db')
+    if args.enqueue and (not args.from_db or args.send or args.resume):
+        parser.error('--enqueue работает только вместе с --from-db, без --send и --resume')
     
     # Создание и запуск скрипта рассылки
-    broadcast = BroadcastScript(csv_file_path=args.csv)
-    await broadcast.run_broadcast(dry_run=not args.send)
+    broadcast = BroadcastScript(
+        csv_file_path=args.csv,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        resume_run_id=args.resume,
+        audience=build_audience(args)
+    )
+    if args.enqueue:
+        await broadcast.enqueue_broadcast()
+    else:
+        await broadcast.run_broadcast(dry_run=not args.send)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,22 @@
+import argparse
 import asyncio
 import asyncpg
 from config.config import load_config
+from bot.database import format_user_cursor, parse_user_cursor
 
-async def check_users():
+# Только нужные колонки, строки читаются серверным курсором в порядке (created_at, id)
+QUERY = """
+    SELECT id, telegram_id, username, first_name, last_name, package_type,
+           participated_before, participation_year, is_vsm_graduate, graduation_year,
+           created_at, updated_at
+    FROM users
+    WHERE $1::timestamp IS NULL OR (created_at, id) > ($1::timestamp, $2::integer)
+    ORDER BY created_at, id
+    LIMIT $3
+"""
+
+
+async def check_users(limit: int = None, after: str = None):
     config = load_config()
     
     # Подключение к PostgreSQL
@@ -14,15 +28,17 @@ async def check_users():
         password=config.db.password
     )
     
-    print("📊 Все пользователи в базе данных:")
+    print("📊 Пользователи в базе данных:")
     print("-" * 80)
     
-    users = await conn.fetch("SELECT * FROM users ORDER BY created_at DESC")
+    after_created_at, after_id = parse_user_cursor(after) if after else (None, None)
+    count = 0
+    last_user = None
     
-    if not users:
-        print("🔍 Пользователи не найдены")
-    else:
-        for user in users:
+    async with conn.transaction():
+        async for user in conn.cursor(QUERY, after_created_at, after_id, limit, prefetch=500):
+            count += 1
+            last_user = user
             print(f"ID: {user['id']}")
             print(f"Telegram ID: {user['telegram_id']}")
             print(f"Username: @{user['username'] or 'не указан'}")
@@ -38,7 +54,17 @@ async def check_users():
             print(f"Обновлен: {user['updated_at']}")
             print("-" * 80)
     
+    if count == 0:
+        print("🔍 Пользователи не найдены")
+    elif limit is not None and count == limit:
+        next_cursor = format_user_cursor(last_user['created_at'], last_user['id'])
+        print(f"➡️  Следующая страница: python3 check_users.py --limit {limit} --after '{next_cursor}'")
+    
     await conn.close()
 
 if __name__ == "__main__":
-    asyncio.run(check_users())
+    parser = argparse.ArgumentParser(description="Просмотр пользователей в базе данных")
+    parser.add_argument('--limit', type=int, default=None, help='Не больше N пользователей')
+    parser.add_argument('--after', type=str, default=None, help='Курсор последней строки предыдущей страницы')
+    args = parser.parse_args()
+    asyncio.run(check_users(limit=args.limit, after=args.after))
@@ -2,6 +2,7 @@ import logging
 import os
 from environs import Env
 from dataclasses import dataclass
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -12,12 +13,45 @@ class DatabaseConfig:
     database: str
     host: str
     port: int = 5432
+    # Пул соединений (при pool_enabled=False используется NullPool)
+    pool_enabled: bool = True
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    # Серверные prepared statements psycopg: запрос подготавливается после N выполнений
+    # на соединении (None - отключено, нужно за PgBouncer в режиме transaction)
+    prepare_threshold: Optional[int] = 5
+    # CREATE TABLE IF NOT EXISTS при запуске (можно отключить, если схема ведётся миграциями)
+    create_tables: bool = True
+    echo: bool = False
 
 @dataclass
 class RedisConfig:
     password: str
     host: str
     port: int = 6379
+    db: int = 0
+    # Общий пул соединений: FSM, кэш пользователей, очередь рассылок
+    max_connections: int = 50
+    # Ожидание свободного соединения при исчерпании пула, секунды
+    pool_timeout: float = 5.0
+    # Таймауты сокета должны быть больше блокирующего XREADGROUP обработчика рассылок (5 с)
+    socket_timeout: float = 10.0
+    socket_connect_timeout: float = 5.0
+    # Проверка простаивающего соединения (PING) перед использованием, секунды
+    health_check_interval: int = 30
+    retry_on_timeout: bool = True
+
+@dataclass
+class FsmStorageConfig:
+    # Сериализация данных FSM и aiogram-dialog: msgpack (компактно) или json
+    serializer: str = "msgpack"
+    # TTL ключей состояния и данных, секунды (None - без TTL). Брошенные регистрации
+    # и стеки aiogram-dialog удаляются из Redis по истечении TTL
+    state_ttl: Optional[int] = 604800
+    data_ttl: Optional[int] = 604800
 
 @dataclass
 class Bot:
@@ -27,13 +61,105 @@ class Bot:
 class GoogleSheetsConfig:
     credentials_path: str
     spreadsheet_url: str
+    # Пакетная запись: размер пачки, интервал сброса и лимит запросов к API
+    batch_size: int = 50
+    flush_interval: float = 2.0
+    max_requests_per_minute: int = 50
+    # Период пересинхронизации индекса telegram_id -> строка, секунды
+    index_resync_interval: float = 600.0
+    # Подключение в фоне при запуске: пауза между попытками растёт
+    # от connect_retry_delay до connect_retry_max_delay, секунды
+    connect_retry_delay: float = 5.0
+    connect_retry_max_delay: float = 300.0
+    # Повтор неудачной записи: retry_attempts попыток с паузой от retry_delay
+    # до retry_max_delay секунд, затем строка уходит в dead letter (Redis)
+    retry_attempts: int = 5
+    retry_delay: float = 5.0
+    retry_max_delay: float = 300.0
+
+@dataclass
+class CacheConfig:
+    # TTL кэша статистики для /stats, секунды
+    stats_ttl: float = 30.0
+    # Кэш пользователей в Redis перед UserRepository.get_user_by_telegram_id
+    user_cache_enabled: bool = True
+    # TTL записи о пользователе и записи "пользователь не найден", секунды
+    user_ttl: int = 3600
+    user_negative_ttl: int = 60
+
+@dataclass
+class NotificationsConfig:
+    # Окно объединения уведомлений администратору в сводку, секунды
+    window: float = 10.0
+    # Максимум событий в одной сводке
+    max_batch: int = 100
+
+@dataclass
+class ParticipationConfig:
+    # Отложенная запись статусов участия: размер пачки и интервал сброса, секунды
+    batch_size: int = 200
+    flush_interval: float = 1.0
+    # Повтор записи пачки при ошибке БД: retry_attempts попыток с паузой
+    # от retry_delay до retry_max_delay секунд
+    retry_attempts: int = 5
+    retry_delay: float = 0.5
+    retry_max_delay: float = 8.0
+
+@dataclass
+class BroadcastConfig:
+    # Обработчик очереди рассылок внутри процесса бота
+    worker_enabled: bool = True
+    # Имя обработчика в группе потока (уникально для каждого процесса)
+    consumer: str = "bot"
+    # Скорость ниже лимита Telegram (~30 сообщ./с), чтобы оставался запас для ответов пользователям
+    rate: float = 20.0
+    concurrency: int = 5
+
+@dataclass
+class WebhookConfig:
+    # Режим получения обновлений: polling или webhook
+    enabled: bool = False
+    base_url: str = ""
+    path: str = "/webhook"
+    secret: str = ""
+    host: str = "0.0.0.0"
+    port: int = 8080
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url.rstrip('/')}{self.path}"
+
+@dataclass
+class ShutdownConfig:
+    # Ожидание обрабатываемых обновлений и сброса очередей при остановке, секунды
+    # (в сумме меньше TimeoutStopSec systemd, по умолчанию 90 с)
+    drain_timeout: float = 20.0
+    flush_timeout: float = 30.0
+
+@dataclass
+class MetricsConfig:
+    # HTTP эндпоинт /metrics в формате Prometheus
+    enabled: bool = True
+    host: str = "127.0.0.1"
+    port: int = 9100
 
 @dataclass
 class Config:
     bot: Bot
     db: DatabaseConfig
     redis: RedisConfig
+    fsm: FsmStorageConfig
     google_sheets: GoogleSheetsConfig
+    cache: CacheConfig
+    notifications: NotificationsConfig
+    participation: ParticipationConfig
+    broadcast: BroadcastConfig
+    webhook: WebhookConfig
+    shutdown: ShutdownConfig
+    metrics: MetricsConfig
+
+def _prepare_threshold(value: int) -> Optional[int]:
+    return value if value >= 0 else None
 
 def load_config(path: str = None) -> Config:
     # Загружаем переменные окружения
@@ -46,23 +172,111 @@ def load_config(path: str = None) -> Config:
         password=env.str("DB_PASS"),
         database=env.str("DB_NAME"),
         host=env.str("DB_HOST"),
-        port=env.int("DB_PORT", 5432)
+        port=env.int("DB_PORT", 5432),
+        pool_enabled=env.bool("DB_POOL_ENABLED", True),
+        pool_size=env.int("DB_POOL_SIZE", 5),
+        max_overflow=env.int("DB_MAX_OVERFLOW", 10),
+        pool_timeout=env.float("DB_POOL_TIMEOUT", 30.0),
+        pool_recycle=env.int("DB_POOL_RECYCLE", 1800),
+        pool_pre_ping=env.bool("DB_POOL_PRE_PING", True),
+        # Отрицательное значение отключает prepared statements
+        prepare_threshold=_prepare_threshold(env.int("DB_PREPARE_THRESHOLD", 5)),
+        create_tables=env.bool("DB_CREATE_TABLES", True),
+        echo=env.bool("DB_ECHO", False)
     )
 
     redis = RedisConfig(
         host=env.str("REDIS_HOST"),
         port=env.int("REDIS_PORT", 6379),
-        password=env.str("REDIS_PASSWORD", "")
+        password=env.str("REDIS_PASSWORD", ""),
+        db=env.int("REDIS_DB", 0),
+        max_connections=env.int("REDIS_MAX_CONNECTIONS", 50),
+        pool_timeout=env.float("REDIS_POOL_TIMEOUT", 5.0),
+        socket_timeout=env.float("REDIS_SOCKET_TIMEOUT", 10.0),
+        socket_connect_timeout=env.float("REDIS_SOCKET_CONNECT_TIMEOUT", 5.0),
+        health_check_interval=env.int("REDIS_HEALTH_CHECK_INTERVAL", 30),
+        retry_on_timeout=env.bool("REDIS_RETRY_ON_TIMEOUT", True)
     )
     
     google_sheets = GoogleSheetsConfig(
         credentials_path=env.str("GOOGLE_CREDENTIALS_PATH", "credentials.json"),
-        spreadsheet_url=env.str("GOOGLE_SPREADSHEET_URL", "")
+        spreadsheet_url=env.str("GOOGLE_SPREADSHEET_URL", ""),
+        batch_size=env.int("GOOGLE_SHEETS_BATCH_SIZE", 50),
+        flush_interval=env.float("GOOGLE_SHEETS_FLUSH_INTERVAL", 2.0),
+        max_requests_per_minute=env.int("GOOGLE_SHEETS_REQUESTS_PER_MINUTE", 50),
+        index_resync_interval=env.float("GOOGLE_SHEETS_INDEX_RESYNC_INTERVAL", 600.0),
+        connect_retry_delay=env.float("GOOGLE_SHEETS_CONNECT_RETRY_DELAY", 5.0),
+        connect_retry_max_delay=env.float("GOOGLE_SHEETS_CONNECT_RETRY_MAX_DELAY", 300.0),
+        retry_attempts=env.int("GOOGLE_SHEETS_RETRY_ATTEMPTS", 5),
+        retry_delay=env.float("GOOGLE_SHEETS_RETRY_DELAY", 5.0),
+        retry_max_delay=env.float("GOOGLE_SHEETS_RETRY_MAX_DELAY", 300.0)
+    )
+    
+    fsm = FsmStorageConfig(
+        serializer=env.str("FSM_SERIALIZER", "msgpack").lower(),
+        # 0 - хранить без TTL
+        state_ttl=env.int("FSM_STATE_TTL", 604800) or None,
+        data_ttl=env.int("FSM_DATA_TTL", 604800) or None
+    )
+    
+    cache = CacheConfig(
+        stats_ttl=env.float("STATS_CACHE_TTL", 30.0),
+        user_cache_enabled=env.bool("USER_CACHE_ENABLED", True),
+        user_ttl=env.int("USER_CACHE_TTL", 3600),
+        user_negative_ttl=env.int("USER_CACHE_NEGATIVE_TTL", 60)
+    )
+    
+    notifications = NotificationsConfig(
+        window=env.float("ADMIN_NOTIFY_WINDOW", 10.0),
+        max_batch=env.int("ADMIN_NOTIFY_MAX_BATCH", 100)
+    )
+    
+    participation = ParticipationConfig(
+        batch_size=env.int("PARTICIPATION_BATCH_SIZE", 200),
+        flush_interval=env.float("PARTICIPATION_FLUSH_INTERVAL", 1.0),
+        retry_attempts=env.int("PARTICIPATION_RETRY_ATTEMPTS", 5),
+        retry_delay=env.float("PARTICIPATION_RETRY_DELAY", 0.5),
+        retry_max_delay=env.float("PARTICIPATION_RETRY_MAX_DELAY", 8.0)
+    )
+    
+    broadcast = BroadcastConfig(
+        worker_enabled=env.bool("BROADCAST_WORKER_ENABLED", True),
+        consumer=env.str("BROADCAST_CONSUMER", "bot"),
+        rate=env.float("BROADCAST_RATE", 20.0),
+        concurrency=env.int("BROADCAST_CONCURRENCY", 5)
+    )
+    
+    webhook = WebhookConfig(
+        enabled=env.str("BOT_MODE", "polling").lower() == "webhook",
+        base_url=env.str("WEBHOOK_BASE_URL", ""),
+        path=env.str("WEBHOOK_PATH", "/webhook"),
+        secret=env.str("WEBHOOK_SECRET", ""),
+        host=env.str("WEBHOOK_HOST", "0.0.0.0"),
+        port=env.int("WEBHOOK_PORT", 8080)
+    )
+    
+    shutdown = ShutdownConfig(
+        drain_timeout=env.float("SHUTDOWN_DRAIN_TIMEOUT", 20.0),
+        flush_timeout=env.float("SHUTDOWN_FLUSH_TIMEOUT", 30.0)
+    )
+    
+    metrics = MetricsConfig(
+        enabled=env.bool("METRICS_ENABLED", True),
+        host=env.str("METRICS_HOST", "127.0.0.1"),
+        port=env.int("METRICS_PORT", 9100)
     )
     
     return Config(
         bot=bot,
         db=db,
         redis=redis,
-        google_sheets=google_sheets
+        fsm=fsm,
+        google_sheets=google_sheets,
+        cache=cache,
+        notifications=notifications,
+        participation=participation,
+        broadcast=broadcast,
+        webhook=webhook,
+        shutdown=shutdown,
+        metrics=metrics
     )
\ No newline at end of file
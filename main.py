@@ -1,19 +1,37 @@
+import time
+
+# Момент старта процесса - для замера времени импортов в разбивке запуска
+_PROCESS_STARTED = time.perf_counter()
+
 import asyncio
 import logging
+from contextlib import suppress
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.redis import RedisStorage, DefaultKeyBuilder
+from aiogram.filters import ExceptionTypeFilter
 from aiogram_dialog import setup_dialogs
-from redis.asyncio import Redis
+from aiogram_dialog.api.exceptions import UnknownIntent
 
 from config.config import load_config
-from bot.handlers import router
+from bot.admin_notifier import AdminNotifier
+from bot.handlers import ADMIN_ID, on_unknown_intent, router
 from bot.dialogs import registration_dialog
-from bot.database import Database, UserRepository
+from bot.broadcast_queue import BroadcastQueue, BroadcastWorker
+from bot.database import Database, ParticipationRepository, UserRepository
 from bot.google_sheets import GoogleSheetsService
 from bot.google_sheets_middleware import GoogleSheetsMiddleware
+from bot.lifecycle import LifecycleManager
+from bot.sheets_writer import SheetsDeadLetters, SheetsWriter
 from bot.media_manager import MediaManager
+from bot.participation_writer import ParticipationWriter
+from bot.metrics import InstrumentationMiddleware, start_metrics_server
+from bot.redis_client import create_redis
+from bot.startup import StartupError, StartupSequencer
+from bot.stats import StatsService
+from bot.storage import create_storage
+from bot.user_cache import UserCache
+from bot.webhook import run_webhook
 
 
 async def main():
@@ -23,87 +41,215 @@ async def main():
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     
-    # Загрузка конфигурации
-    config = load_config()
+    startup = StartupSequencer(started=_PROCESS_STARTED)
+    startup.record("imports", time.perf_counter() - _PROCESS_STARTED)
     
-    # Создание Redis клиента для FSM
-    if config.redis.password:
-        redis_client = Redis.from_url(f"redis://:{config.redis.password}@{config.redis.host}:{config.redis.port}/0")
-    else:
-        redis_client = Redis.from_url(f"redis://{config.redis.host}:{config.redis.port}/0")
+    # Загрузка конфигурации
+    async with startup.phase("config"):
+        config = load_config()
     
-    # Проверка подключения к Redis
-    try:
-        await redis_client.ping()
-        print(f"✅ Подключение к Redis установлено: {config.redis.host}:{config.redis.port}")
-    except Exception as e:
-        print(f"❌ Ошибка подключения к Redis: {e}")
+    if config.webhook.enabled and not (config.webhook.base_url and config.webhook.secret):
+        print("❌ Для режима webhook нужны WEBHOOK_BASE_URL и WEBHOOK_SECRET")
         return
     
-    # Создание хранилища для FSM
-    storage = RedisStorage(
-        redis=redis_client,
-        key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
-    )
+    # Общий пул Redis для FSM, кэша пользователей и очереди рассылок
+    redis_client = create_redis(config.redis)
     
-    # Создание бота и диспетчера
+    # Создание бота
     bot = Bot(
         token=config.bot.token,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
-    dp = Dispatcher(storage=storage)
     
-    # Создание и настройка базы данных
+    # Создание базы данных
     database = Database(config)
-    await database.create_tables()
-    user_repo = UserRepository(database)
     
-    # Создание Google Sheets сервиса
-    google_sheets_service = None
+    # Проверка Redis, подготовка БД и соединение с Telegram выполняются параллельно
     try:
-        if config.google_sheets.spreadsheet_url and config.google_sheets.credentials_path:
-            google_sheets_service = GoogleSheetsService(
-                config.google_sheets.credentials_path,
-                config.google_sheets.spreadsheet_url
-            )
-            print("✅ Google Sheets сервис инициализирован")
-        else:
-            print("⚠️ Конфигурация Google Sheets не найдена")
-    except Exception as e:
-        print(f"⚠️ Ошибка инициализации Google Sheets: {e}")
+        await startup.run_concurrently({
+            "redis": redis_client.ping(),
+            "database": database.warm_up(create_tables=config.db.create_tables),
+            "telegram": bot.me(),
+        })
+    except StartupError as e:
+        print(f"❌ Ошибка запуска ({e.phase}): {e.error}")
+        await bot.session.close()
+        await database.close()
+        await redis_client.aclose()
+        return
+    print(f"✅ Подключение к Redis установлено: {config.redis.host}:{config.redis.port}")
+    
+    services_started = time.perf_counter()
+    
+    # Создание хранилища для FSM и диспетчера
+    storage = create_storage(
+        redis_client,
+        serializer=config.fsm.serializer,
+        state_ttl=config.fsm.state_ttl,
+        data_ttl=config.fsm.data_ttl
+    )
+    dp = Dispatcher(storage=storage)
     
-    # Создание MediaManager
+    user_cache = None
+    if config.cache.user_cache_enabled:
+        user_cache = UserCache(
+            redis_client,
+            ttl=config.cache.user_ttl,
+            negative_ttl=config.cache.user_negative_ttl
+        )
+    user_repo = UserRepository(database, cache=user_cache)
+    stats_service = StatsService(user_repo, ttl=config.cache.stats_ttl)
+    
+    # Google Sheets подключается в фоне: OAuth и открытие таблицы не задерживают запуск.
+    # До подключения строки копятся в очереди SheetsWriter, запись начнётся после него
+    google_sheets_service = None
+    sheets_writer = None
+    if config.google_sheets.spreadsheet_url and config.google_sheets.credentials_path:
+        google_sheets_service = GoogleSheetsService(
+            config.google_sheets.credentials_path,
+            config.google_sheets.spreadsheet_url,
+            index_resync_interval=config.google_sheets.index_resync_interval,
+            connect=False
+        )
+        sheets_writer = SheetsWriter(
+            google_sheets_service,
+            batch_size=config.google_sheets.batch_size,
+            flush_interval=config.google_sheets.flush_interval,
+            max_requests_per_minute=config.google_sheets.max_requests_per_minute,
+            dead_letters=SheetsDeadLetters(redis_client),
+            retry_attempts=config.google_sheets.retry_attempts,
+            retry_delay=config.google_sheets.retry_delay,
+            retry_max_delay=config.google_sheets.retry_max_delay
+        )
+        startup.background(
+            "google_sheets",
+            lambda: asyncio.to_thread(google_sheets_service.connect),
+            on_ready=lambda _: sheets_writer.start(),
+            delay=config.google_sheets.connect_retry_delay,
+            max_delay=config.google_sheets.connect_retry_max_delay,
+            # Без файла учётных данных повторять бессмысленно
+            fatal=(FileNotFoundError,)
+        )
+    else:
+        print("⚠️ Конфигурация Google Sheets не найдена")
+    
+    # Отложенная запись ответов на кнопки рассылки
+    participation_writer = ParticipationWriter(
+        ParticipationRepository(database),
+        batch_size=config.participation.batch_size,
+        flush_interval=config.participation.flush_interval,
+        retry_attempts=config.participation.retry_attempts,
+        retry_delay=config.participation.retry_delay,
+        retry_max_delay=config.participation.retry_max_delay
+    )
+    participation_writer.start()
+    
+    # Фоновые уведомления администратору
+    admin_notifier = AdminNotifier(
+        bot,
+        ADMIN_ID,
+        window=config.notifications.window,
+        max_batch=config.notifications.max_batch
+    )
+    admin_notifier.start()
+    
+    # Очередь рассылок и её обработчик
+    broadcast_queue = BroadcastQueue(redis_client)
+    broadcast_worker = None
+    if config.broadcast.worker_enabled:
+        broadcast_worker = BroadcastWorker(
+            broadcast_queue,
+            bot,
+            user_repo,
+            consumer=config.broadcast.consumer,
+            rate=config.broadcast.rate,
+            concurrency=config.broadcast.concurrency
+        )
+        broadcast_worker.start()
+    
+    # Создание MediaManager и фоновая подготовка file_id изображений
     media_manager = MediaManager(bot)
+    media_prewarm_task = asyncio.create_task(media_manager.prewarm(["alumni1.jpg"]))
     
-    # Middleware для передачи database, user_repo, google_sheets и media_manager
+    # Middleware для передачи database, user_repo, google_sheets, sheets_writer, media_manager, admin_notifier, participation_writer и broadcast_queue
     async def services_middleware(handler, event, data):
         data["database"] = database
         data["user_repo"] = user_repo
+        data["stats_service"] = stats_service
         data["google_sheets"] = google_sheets_service
+        data["sheets_writer"] = sheets_writer
         data["media_manager"] = media_manager
+        data["admin_notifier"] = admin_notifier
+        data["participation_writer"] = participation_writer
+        data["broadcast_queue"] = broadcast_queue
         return await handler(event, data)
     
     # Регистрация middleware
+    instrumentation_middleware = InstrumentationMiddleware()
+    dp.message.middleware(instrumentation_middleware)
+    dp.callback_query.middleware(instrumentation_middleware)
     dp.message.middleware(services_middleware)
     dp.callback_query.middleware(services_middleware)
     
+    # HTTP эндпоинт с метриками
+    metrics_runner = None
+    if config.metrics.enabled:
+        metrics_runner = await start_metrics_server(config.metrics.host, config.metrics.port)
+    
     # Регистрация роутеров и диалогов
     dp.include_router(router)
     dp.include_router(registration_dialog)
     
     # Настройка aiogram-dialog
     setup_dialogs(dp)
+    # Контекст диалога мог истечь по FSM_DATA_TTL - перезапускаем регистрацию
+    dp.errors.register(on_unknown_intent, ExceptionTypeFilter(UnknownIntent))
+    
+    startup.record("services", time.perf_counter() - services_started)
+    print(startup.report())
+    print(f"🤖 Бот запущен и готов к работе! Режим: {'webhook' if config.webhook.enabled else 'polling'}")
     
-    print("🤖 Бот запущен и готов к работе!")
+    # Остановка по SIGTERM/SIGINT: дообработка событий, сброс очередей, закрытие пулов
+    lifecycle = LifecycleManager(
+        drain_timeout=config.shutdown.drain_timeout,
+        flush_timeout=config.shutdown.flush_timeout
+    )
+    dp.update.outer_middleware(lifecycle.track_updates)
+    lifecycle.add_service("startup", startup.stop)
+    lifecycle.add_service("media_prewarm", lambda: _cancel(media_prewarm_task))
+    if broadcast_worker:
+        # Незавершённая рассылка продолжится после перезапуска
+        lifecycle.add_service("broadcast_worker", broadcast_worker.stop)
+    lifecycle.add_worker(sheets_writer)
+    # Уведомления отправляются до закрытия сессии бота, статусы сохраняются до закрытия БД
+    lifecycle.add_worker(admin_notifier)
+    lifecycle.add_worker(participation_writer)
+    if metrics_runner:
+        lifecycle.add_resource("metrics", metrics_runner.cleanup)
+    lifecycle.add_resource("bot_session", bot.session.close)
+    lifecycle.add_resource("database", database.close)
+    lifecycle.add_resource("redis", redis_client.aclose)
+    lifecycle.install_signal_handlers()
     
     # Запуск бота
     try:
-        await dp.start_polling(bot)
+        if config.webhook.enabled:
+            await lifecycle.serve(run_webhook(dp, bot, config.webhook, stop_event=lifecycle.stop_requested))
+        else:
+            await bot.delete_webhook()
+            await lifecycle.serve(
+                dp.start_polling(bot, handle_signals=False, close_bot_session=False),
+                stop=dp.stop_polling
+            )
     finally:
-        await bot.session.close()
-        await database.close()
-        await redis_client.aclose()
+        logging.info(f"Статистика пула БД: {database.pool_stats()}")
+        await lifecycle.shutdown()
+
 
+async def _cancel(task: asyncio.Task):
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
 
 if __name__ == '__main__':
     asyncio.run(main())
\ No newline at end of file
@@ -2,51 +2,61 @@
 """
 Утилита для управления данными бота MB25
 """
+import argparse
 import asyncio
 import sys
+from typing import Optional
 from config.config import load_config
-from bot.database import Database, UserRepository
-from sqlalchemy import select, func
+from bot.database import Database, UserRepository, format_user_cursor, parse_user_cursor
+from bot.google_sheets import GoogleSheetsService
+from bot.redis_client import create_redis
+from bot.sheets_reconcile import reconcile_sheet
+from bot.sheets_writer import SheetsDeadLetters
+from bot.storage import memory_report
+from bot.user_cache import UserCache
+from sqlalchemy import select
 
 
-async def show_all_users():
-    """Показать всех зарегистрированных пользователей"""
+async def show_all_users(limit: Optional[int] = None, after: Optional[str] = None):
+    """Показать зарегистрированных пользователей (потоково, постранично)"""
     config = load_config()
     database = Database(config)
     user_repo = UserRepository(database)
     
     try:
-        # Получаем всех пользователей
-        session = await database.get_session()
-        try:
-            from bot.models import User
-            result = await session.execute(select(User).order_by(User.created_at.desc()))
-            users = result.scalars().all()
-            
-            if not users:
-                print("📝 Пользователи не найдены")
-                return
+        cursor = parse_user_cursor(after) if after else None
+        count = 0
+        last_row = None
+        
+        async for user in user_repo.iter_users(limit=limit, after=cursor):
+            if count == 0:
+                print("=" * 80)
+            count += 1
+            last_row = user
             
-            print(f"📊 Всего зарегистрированных пользователей: {len(users)}")
-            print("=" * 80)
-            
-            for user in users:
-                print(f"👤 ID: {user.id}")
-                print(f"   Telegram ID: {user.telegram_id}")
-                username_display = f"@{user.username}" if user.username else "Нет username"
-                print(f"   Username: {username_display}")
-                print(f"   Имя: {user.first_name} {user.last_name}")
-                print(f"   Пакет: {user.package_type}")
-                print(f"   Участвовал в МБ ранее: {'Да' if user.participated_before else 'Нет'}")
-                if user.participated_before and user.participation_year:
-                    print(f"   Год участия: {user.participation_year}")
-                print(f"   Выпускник ВШМ: {'Да' if user.is_vsm_graduate else 'Нет'}")
-                if user.is_vsm_graduate and user.graduation_year:
-                    print(f"   Год выпуска: {user.graduation_year}")
-                print(f"   Дата регистрации: {user.created_at}")
-                print("-" * 40)
-        finally:
-            await session.close()
+            print(f"👤 ID: {user.id}")
+            print(f"   Telegram ID: {user.telegram_id}")
+            username_display = f"@{user.username}" if user.username else "Нет username"
+            print(f"   Username: {username_display}")
+            print(f"   Имя: {user.first_name} {user.last_name}")
+            print(f"   Пакет: {user.package_type}")
+            print(f"   Участвовал в МБ ранее: {'Да' if user.participated_before else 'Нет'}")
+            if user.participated_before and user.participation_year:
+                print(f"   Год участия: {user.participation_year}")
+            print(f"   Выпускник ВШМ: {'Да' if user.is_vsm_graduate else 'Нет'}")
+            if user.is_vsm_graduate and user.graduation_year:
+                print(f"   Год выпуска: {user.graduation_year}")
+            print(f"   Дата регистрации: {user.created_at}")
+            print("-" * 40)
+        
+        if count == 0:
+            print("📝 Пользователи не найдены")
+            return
+        
+        print(f"📊 Показано пользователей: {count}")
+        if limit is not None and count == limit:
+            next_cursor = format_user_cursor(last_row.created_at, last_row.id)
+            print(f"➡️  Следующая страница: python3 manage_data.py users --limit {limit} --after '{next_cursor}'")
             
     except Exception as e:
         print(f"❌ Ошибка при получении пользователей: {e}")
@@ -58,56 +68,22 @@ async def show_statistics():
     """Показать статистику регистраций"""
     config = load_config()
     database = Database(config)
+    user_repo = UserRepository(database)
     
     try:
-        session = await database.get_session()
-        try:
-            from bot.models import User
-            
-            # Общая статистика
-            total_users = await session.execute(select(func.count(User.id)))
-            total_count = total_users.scalar()
-            
-            # Статистика по пакетам
-            business_count_result = await session.execute(
-                select(func.count(User.id)).where(User.package_type == 'business')
-            )
-            business_count = business_count_result.scalar()
-            
-            gala_count_result = await session.execute(
-                select(func.count(User.id)).where(User.package_type == 'gala')
-            )
-            gala_count = gala_count_result.scalar()
-            
-            full_count_result = await session.execute(
-                select(func.count(User.id)).where(User.package_type == 'full')
-            )
-            full_count = full_count_result.scalar()
-            
-            # Статистика по участию в МБ
-            participated_before_result = await session.execute(
-                select(func.count(User.id)).where(User.participated_before == True)
-            )
-            participated_before_count = participated_before_result.scalar()
-            
-            # Статистика по выпускникам ВШМ
-            vsm_graduates_result = await session.execute(
-                select(func.count(User.id)).where(User.is_vsm_graduate == True)
-            )
-            vsm_graduates_count = vsm_graduates_result.scalar()
-            
-            print("📊 СТАТИСТИКА РЕГИСТРАЦИЙ")
-            print("=" * 50)
-            print(f"Всего пользователей: {total_count}")
-            print("\n📦 По пакетам:")
-            print(f"  • Деловая программа: {business_count}")
-            print(f"  • Гала-ужин: {gala_count}")
-            print(f"  • Полный пакет: {full_count}")
-            print(f"\n🎓 Участвовали в МБ ранее: {participated_before_count}")
-            print(f"🏫 Выпускники ВШМ: {vsm_graduates_count}")
-            
-        finally:
-            await session.close()
+        stats = await user_repo.get_stats()
+        
+        print("📊 СТАТИСТИКА РЕГИСТРАЦИЙ")
+        print("=" * 50)
+        print(f"Всего пользователей: {stats['total']}")
+        print("\n📦 По пакетам:")
+        print(f"  • Деловая программа: {stats['business']}")
+        print(f"  • Гала-ужин: {stats['gala']}")
+        print(f"  • Полный пакет: {stats['full']}")
+        print(f"\n🎓 Участвовали в МБ ранее: {stats['participated_before']}")
+        print(f"🏫 Выпускники ВШМ: {stats['vsm_graduates']}")
+        print(f"\n💰 Подтвердили оплату: {stats['payment_confirmed']}")
+        print(f"❌ Отказались от участия: {stats['participation_declined']}")
             
     except Exception as e:
         print(f"❌ Ошибка при получении статистики: {e}")
@@ -115,6 +91,39 @@ async def show_statistics():
         await database.close()
 
 
+async def show_pool_stats():
+    """Проверить подключение к БД и показать статистику пула соединений"""
+    config = load_config()
+    database = Database(config)
+    
+    try:
+        async def ping():
+            session = await database.get_session()
+            try:
+                await session.execute(select(1))
+            finally:
+                await session.close()
+        
+        # Несколько параллельных запросов, чтобы пул открыл соединения
+        await asyncio.gather(*(ping() for _ in range(config.db.pool_size)))
+        
+        stats = database.pool_stats()
+        print("🔌 ПУЛ СОЕДИНЕНИЙ С БД")
+        print("=" * 50)
+        print(f"Режим: {'пул' if stats['pooled'] else 'без пула (NullPool)'}")
+        print(f"Состояние: {stats['status']}")
+        print(f"Занято соединений: {stats['checked_out']}")
+        print(f"Выдано соединений: {stats['checkouts']}")
+        print(f"Открыто соединений: {stats['connects']}")
+        print(f"Ожидание соединения: среднее {stats['wait_avg_ms']:.1f} мс, макс. {stats['wait_max_ms']:.1f} мс")
+        print(f"Подключение к БД: среднее {stats['connect_avg_ms']:.1f} мс, макс. {stats['connect_max_ms']:.1f} мс")
+        
+    except Exception as e:
+        print(f"❌ Ошибка при проверке пула: {e}")
+    finally:
+        await database.close()
+
+
 async def clear_all_users():
     """Очистить всех пользователей (для тестирования)"""
     config = load_config()
@@ -136,6 +145,8 @@ async def clear_all_users():
             print("✅ Все пользователи успешно удалены")
         finally:
             await session.close()
+        
+        await clear_user_cache(config)
             
     except Exception as e:
         print(f"❌ Ошибка при удалении пользователей: {e}")
@@ -143,13 +154,116 @@ async def clear_all_users():
         await database.close()
 
 
+async def clear_user_cache(config):
+    """Очистить кэш пользователей в Redis, чтобы бот не видел удалённых пользователей"""
+    redis_client = create_redis(config.redis)
+    
+    try:
+        deleted = await UserCache(redis_client).clear()
+        print(f"✅ Кэш пользователей очищен (ключей: {deleted})")
+    except Exception as e:
+        print(f"⚠️  Не удалось очистить кэш пользователей, записи истекут через USER_CACHE_TTL: {e}")
+    finally:
+        await redis_client.aclose()
+
+
+async def show_redis_memory():
+    """Показать память Redis по типам ключей"""
+    config = load_config()
+    redis_client = create_redis(config.redis)
+    
+    try:
+        report = await memory_report(redis_client)
+        if not report.types:
+            print("📭 В Redis нет ключей")
+            return
+        
+        print("🧠 ПАМЯТЬ REDIS ПО ТИПАМ КЛЮЧЕЙ")
+        print("=" * 80)
+        print(f"{'Тип':<18} {'Ключей':>10} {'Всего, КБ':>12} {'Среднее, Б':>12} {'Макс, Б':>10} {'Без TTL':>10}")
+        print("-" * 80)
+        for key_type, usage in sorted(report.types.items(), key=lambda item: -item[1].bytes):
+            print(
+                f"{key_type:<18} {usage.keys:>10} {usage.bytes / 1024:>12.1f} "
+                f"{usage.avg_bytes:>12.0f} {usage.max_bytes:>10} {usage.without_ttl:>10}"
+            )
+        total_keys = sum(usage.keys for usage in report.types.values())
+        total_bytes = sum(usage.bytes for usage in report.types.values())
+        print("-" * 80)
+        print(f"{'Итого':<18} {total_keys:>10} {total_bytes / 1024:>12.1f}")
+    except Exception as e:
+        print(f"❌ Ошибка при анализе памяти Redis: {e}")
+    finally:
+        await redis_client.aclose()
+
+
+async def reconcile_google_sheets(dry_run: bool = False, batch_size: int = 200):
+    """Сверить Google Sheets с БД и дописать недостающие / устаревшие строки"""
+    config = load_config()
+    if not (config.google_sheets.spreadsheet_url and config.google_sheets.credentials_path):
+        print("⚠️ Конфигурация Google Sheets не найдена")
+        return
+    
+    database = Database(config)
+    user_repo = UserRepository(database)
+    redis_client = create_redis(config.redis)
+    dead_letters = SheetsDeadLetters(redis_client)
+    
+    try:
+        sheets = GoogleSheetsService(
+            config.google_sheets.credentials_path,
+            config.google_sheets.spreadsheet_url,
+            connect=False
+        )
+        await asyncio.to_thread(sheets.connect)
+        
+        diff = await reconcile_sheet(
+            sheets,
+            user_repo,
+            dead_letters=dead_letters,
+            dry_run=dry_run,
+            batch_size=batch_size,
+            max_requests_per_minute=config.google_sheets.max_requests_per_minute
+        )
+        
+        print("🔎 СВЕРКА GOOGLE SHEETS С БД")
+        print("=" * 50)
+        print(f"Пользователей в БД: {diff.checked}")
+        print(f"Строк совпадает: {diff.in_sync}")
+        print(f"Нет в таблице: {len(diff.missing)}")
+        print(f"Устарели: {len(diff.stale)}")
+        if diff.extra:
+            print(f"⚠️  Строк без пользователя в БД: {len(diff.extra)} (не изменяются)")
+        if diff.duplicates:
+            print(f"⚠️  Повторяющиеся Telegram ID: {', '.join(map(str, sorted(set(diff.duplicates))))}")
+        if dry_run:
+            if diff.to_repair:
+                print(f"📝 Будет записано строк: {diff.to_repair} (запустите без --dry-run)")
+        else:
+            print(f"✅ Восстановлено строк: {diff.repaired} (запросов на запись: {diff.write_requests})")
+            print(f"🧹 Удалено из dead letter: {diff.dead_letters_cleared}")
+        print(f"📬 Осталось в dead letter: {await dead_letters.count()}")
+    except Exception as e:
+        print(f"❌ Ошибка при сверке Google Sheets: {e}")
+    finally:
+        await redis_client.aclose()
+        await database.close()
+
+
 def print_help():
     """Показать справку по командам"""
     print("🤖 MB25 Bot Data Manager")
     print("=" * 30)
     print("Доступные команды:")
-    print("  users     - Показать всех пользователей")
+    print("  users     - Показать пользователей (в порядке регистрации)")
+    print("              --limit N       - не больше N пользователей")
+    print("              --after CURSOR  - начать после курсора предыдущей страницы")
     print("  stats     - Показать статистику")
+    print("  pool      - Показать статистику пула соединений")
+    print("  redis-memory - Показать память Redis по типам ключей (FSM, диалоги, кэш)")
+    print("  sheets-reconcile - Сверить Google Sheets с БД и восстановить строки")
+    print("              --dry-run       - только показать расхождения")
+    print("              --batch-size N  - строк в одном запросе записи (по умолчанию 200)")
     print("  clear     - Очистить всех пользователей")
     print("  help      - Показать эту справку")
 
@@ -162,9 +276,23 @@ async def main():
     command = sys.argv[1].lower()
     
     if command == 'users':
-        await show_all_users()
+        parser = argparse.ArgumentParser(prog="manage_data.py users")
+        parser.add_argument('--limit', type=int, default=None)
+        parser.add_argument('--after', type=str, default=None)
+        args = parser.parse_args(sys.argv[2:])
+        await show_all_users(limit=args.limit, after=args.after)
     elif command == 'stats':
         await show_statistics()
+    elif command == 'pool':
+        await show_pool_stats()
+    elif command == 'redis-memory':
+        await show_redis_memory()
+    elif command == 'sheets-reconcile':
+        parser = argparse.ArgumentParser(prog="manage_data.py sheets-reconcile")
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=200)
+        args = parser.parse_args(sys.argv[2:])
+        await reconcile_google_sheets(dry_run=args.dry_run, batch_size=args.batch_size)
     elif command == 'clear':
         await clear_all_users()
     elif command == 'help':
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Простая миграция для добавления индекса (created_at, id) в таблицу users
+"""
+import asyncio
+from config.config import load_config
+from bot.database import Database
+
+
+async def add_created_at_index():
+    """Добавляет индекс ix_users_created_at_id для постраничного просмотра пользователей"""
+    config = load_config()
+    database = Database(config)
+    
+    try:
+        session = await database.get_session()
+        try:
+            # SQL для добавления индекса
+            from sqlalchemy import text
+            sql = text("CREATE INDEX IF NOT EXISTS ix_users_created_at_id ON users (created_at, id);")
+            await session.execute(sql)
+            await session.commit()
+            print("✅ Индекс ix_users_created_at_id успешно добавлен в таблицу users")
+        except Exception as e:
+            await session.rollback()
+            print(f"❌ Ошибка при добавлении индекса: {e}")
+        finally:
+            await session.close()
+    except Exception as e:
+        print(f"❌ Ошибка подключения к БД: {e}")
+    finally:
+        await database.close()
+
+
+if __name__ == "__main__":
+    print("🔄 Выполнение миграции: добавление индекса (created_at, id)...")
+    asyncio.run(add_created_at_index())
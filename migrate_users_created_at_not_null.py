@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Простая миграция: заполнение пустых users.created_at и ограничение NOT NULL
+
+Постраничный просмотр, выгрузка и сверка с Google Sheets идут по ключу
+(created_at, id): строки с NULL в created_at такое сравнение пропускает,
+а курсор для них не строится.
+"""
+import asyncio
+from config.config import load_config
+from bot.database import Database
+
+
+async def make_created_at_not_null():
+    """Заполняет пустые created_at датой обновления (или текущим временем UTC) и запрещает NULL"""
+    config = load_config()
+    database = Database(config)
+    
+    try:
+        session = await database.get_session()
+        try:
+            # SQL для заполнения пустых значений и добавления ограничения
+            from sqlalchemy import text
+            result = await session.execute(text(
+                "UPDATE users SET created_at = COALESCE(updated_at, timezone('utc', now())) "
+                "WHERE created_at IS NULL;"
+            ))
+            await session.execute(text("ALTER TABLE users ALTER COLUMN created_at SET NOT NULL;"))
+            await session.commit()
+            print(f"✅ Заполнено пустых created_at: {result.rowcount}, колонка users.created_at теперь NOT NULL")
+        except Exception as e:
+            await session.rollback()
+            print(f"❌ Ошибка при выполнении миграции: {e}")
+        finally:
+            await session.close()
+    except Exception as e:
+        print(f"❌ Ошибка подключения к БД: {e}")
+    finally:
+        await database.close()
+
+
+if __name__ == "__main__":
+    print("🔄 Выполнение миграции: users.created_at NOT NULL...")
+    asyncio.run(make_created_at_not_null())